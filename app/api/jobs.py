@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from typing import BinaryIO, Callable, Dict, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Size of the chunks used to stream uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the ingestion queue is full.
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job handler to stop a job that was cancelled.
+    """
+
+
+class Job:
+    """
+    One document ingestion job and its on-disk state.
+
+    The job directory holds the uploaded file, `job.json` with the current
+    status and one checkpoint file per finished page, so an interrupted job
+    can be resumed without redoing completed pages.
+
+    `content_hash` (SHA-256 of the uploaded bytes) identifies the document;
+    `replace` asks for earlier documents with the same filename to be replaced.
+    """
+
+    def __init__(self, job_id: str, job_dir: str, filename: str, upload_path: str, created_at: float, content_hash: Optional[str] = None, replace: bool = False):
+        self.id = job_id
+        self.dir = job_dir
+        self.filename = filename
+        self.upload_path = upload_path
+        self.created_at = created_at
+        self.content_hash = content_hash
+        self.replace = replace
+        self.updated_at = created_at
+        self.status = QUEUED
+        self.pages_total = None
+        self.pages_done = 0
+        self.failed_pages = []
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+        # Serializes writes of job.json, so an older state never replaces a newer one
+        self._save_lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "content_hash": self.content_hash,
+                "replace": self.replace,
+                "status": self.status,
+                "pages_total": self.pages_total,
+                "pages_done": self.pages_done,
+                "failed_pages": list(self.failed_pages),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+
+    def save(self):
+        with self._save_lock:
+            state = self.to_dict()
+            state["upload_path"] = self.upload_path
+            path = os.path.join(self.dir, "job.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def from_dir(cls, job_dir: str) -> "Job":
+        with open(os.path.join(job_dir, "job.json"), encoding="utf-8") as f:
+            state = json.load(f)
+        job = cls(
+            state["job_id"], job_dir, state["filename"], state["upload_path"], state["created_at"],
+            content_hash=state.get("content_hash"), replace=state.get("replace", False),
+        )
+        job.updated_at = state["updated_at"]
+        job.status = state["status"]
+        job.pages_total = state["pages_total"]
+        job.pages_done = state["pages_done"]
+        job.failed_pages = state["failed_pages"]
+        job.result = state["result"]
+        job.error = state["error"]
+        return job
+
+    def update(self, **fields):
+        """
+        Set job fields and persist the new state.
+        """
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.updated_at = time.time()
+        self.save()
+
+    def transition(self, expected: str, status: str) -> bool:
+        """
+        Move the job from status `expected` to `status`, unless another thread changed it first.
+
+        Returns:
+            bool: Whether the status was changed.
+        """
+        with self._lock:
+            if self.status != expected:
+                return False
+            self.status = status
+            self.updated_at = time.time()
+        self.save()
+        return True
+
+    def raise_if_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled.")
+
+    def _pages_dir(self) -> str:
+        return os.path.join(self.dir, "pages")
+
+    def load_checkpoints(self) -> Dict[int, dict]:
+        """
+        Return the page results saved by earlier runs of this job, by page number.
+        """
+        checkpoints = {}
+        if not os.path.isdir(self._pages_dir()):
+            return checkpoints
+        for name in os.listdir(self._pages_dir()):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self._pages_dir(), name), encoding="utf-8") as f:
+                result = json.load(f)
+            checkpoints[result["page"]] = result
+        return checkpoints
+
+    def page_done(self, result: dict):
+        """
+        Checkpoint a finished page result and advance the progress counters.
+        """
+        os.makedirs(self._pages_dir(), exist_ok=True)
+        path = os.path.join(self._pages_dir(), f"{result['page']}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            self.pages_done += 1
+            if result.get("error") is not None:
+                self.failed_pages.append({"page": result["page"], "error": result["error"]})
+            self.updated_at = time.time()
+        self.save()
+
+    def cleanup(self):
+        """
+        Remove the upload and page checkpoints once the job has finished, keeping `job.json`.
+        """
+        if os.path.exists(self.upload_path):
+            os.remove(self.upload_path)
+        shutil.rmtree(self._pages_dir(), ignore_errors=True)
+
+
+class JobQueue:
+    """
+    Bounded queue of ingestion jobs processed by a fixed pool of worker threads.
+
+    Jobs that were queued or running when the process stopped are picked up
+    again on start and resume from their page checkpoints.
+    """
+
+    def __init__(self, handler: Callable[[Job], dict], jobs_dir: str, workers: int = 2, max_queued: int = 16, retention_seconds: float = 86400):
+        """
+        Args:
+            handler (Callable[[Job], dict]): Function that processes a job and returns its result.
+            jobs_dir (str): Directory holding one sub-directory per job.
+            workers (int): Number of jobs processed concurrently.
+            max_queued (int): Maximum number of jobs waiting to start.
+            retention_seconds (float): How long finished jobs stay visible.
+        """
+        self.handler = handler
+        self.jobs_dir = jobs_dir
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        self._resume()
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True).start()
+
+    def _resume(self):
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            job_dir = os.path.join(self.jobs_dir, job_id)
+            if not os.path.exists(os.path.join(job_dir, "job.json")):
+                shutil.rmtree(job_dir, ignore_errors=True)
+                continue
+            job = Job.from_dir(job_dir)
+            self.jobs[job.id] = job
+            if job.status not in FINISHED_STATES:
+                logging.info(f"Resuming ingestion job {job.id} ({job.filename}).")
+                job.update(status=QUEUED)
+                self._queue.put(job)
+
+    def _prune(self):
+        """
+        Forget finished jobs older than the retention period.
+        """
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self.jobs.items()):
+            if job.status in FINISHED_STATES and job.updated_at < cutoff:
+                del self.jobs[job_id]
+                shutil.rmtree(job.dir, ignore_errors=True)
+
+    def _check_capacity(self):
+        # Cancelled jobs stay in the queue until a worker skips them, so count statuses instead
+        waiting = sum(1 for job in self.jobs.values() if job.status == QUEUED)
+        if waiting >= self.max_queued:
+            raise QueueFullError("The ingestion queue is full.")
+
+    def submit(self, filename: str, source: BinaryIO, replace: bool = False) -> Job:
+        """
+        Save an upload into a new job directory and queue it.
+
+        The upload is hashed while it is copied, giving the document its
+        content hash. Copying happens without holding the queue lock, so a
+        slow upload does not hold up other uploads, status requests or the
+        workers. Until the job is registered its directory has no `job.json`
+        and is removed on the next start.
+
+        Args:
+            filename (str): Original name of the uploaded file.
+            source (BinaryIO): Stream with the uploaded bytes.
+            replace (bool): Replace earlier documents with the same filename.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            QueueFullError: If `max_queued` jobs are already waiting.
+        """
+        # Refuse early, before reading the upload, when the queue is already full
+        with self._lock:
+            self._check_capacity()
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        upload_path = os.path.join(job_dir, "upload" + os.path.splitext(filename)[1].lower())
+        digest = hashlib.sha256()
+        try:
+            with open(upload_path + ".part", "wb") as f:
+                for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            os.replace(upload_path + ".part", upload_path)
+
+            with self._lock:
+                self._prune()
+                # Other uploads may have filled the queue while this one was copied
+                self._check_capacity()
+                job = Job(job_id, job_dir, filename, upload_path, time.time(), content_hash=digest.hexdigest(), replace=replace)
+                job.save()
+                self.jobs[job_id] = job
+                self._queue.put(job)
+                return job
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job. A queued job is cancelled at once; a
+        running job stops at its next page or stage boundary.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job.cancel_requested = True
+        # A worker may be starting the job right now; only one of the two wins
+        if job.transition(QUEUED, CANCELLED):
+            job.cleanup()
+        return job
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if not job.transition(QUEUED, RUNNING):
+                # Cancelled while it was waiting
+                continue
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                if job.cancel_requested:
+                    job.update(status=CANCELLED)
+                else:
+                    logging.error(f"Ingestion job {job.id} failed: {e}")
+                    job.update(status=FAILED, error=str(e))
+            else:
+                job.update(status=COMPLETED, result=result)
+            job.cleanup()
@@ -1,35 +1,400 @@
-from fastapi import FastAPI, Header, HTTPException, UploadFile, File
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Request, UploadFile, File
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from app.ocr.ocr_processor import process_image
-from app.embeddings.embedder import generate_embeddings
+from app.ocr.parallel_ocr import ocr_pages
+from app.ocr.pdf_utils import count_pdf_pages, iter_pdf_pages
+from app.ocr.region_router import route_regions
+from app.ocr.spell_correction import correct_pages
+from app.embeddings.embedder import embedding_cache, generate_embeddings, get_cache_stats, get_tokenizer, max_input_tokens
+from app.embeddings.chunker import CHUNK_TOKENS, chunk_pages
 from app.vectordb.faiss_db import FAISSVectorDB
+from app.vectordb.sharded_db import ShardedVectorDB
+from app.vectordb.metadata_store import validate_filters
 from app.rag.rag_agent import RAGAgent
+from app.rag.answer_cache import AnswerCache
+from app.rag.batcher import MicroBatcher
+from app.api.jobs import Job, JobQueue, QueueFullError
+from app.models.registry import registry
+from app.observability import metrics
+from app.observability.logs import configure_logging, excerpt
+from app.observability.profiler import profiler
+from typing import List, Optional
+import json
 import logging
+import os
 
 app = FastAPI()
 
 API_KEY = "new_secret_key"
 
+# Directory holding FAISS snapshots and the append log (empty keeps the index in memory only)
+FAISS_PERSIST_DIR = os.environ.get("FAISS_PERSIST_DIR", "data/faiss")
+FAISS_SNAPSHOT_EVERY = int(os.environ.get("FAISS_SNAPSHOT_EVERY", "10000"))
+FAISS_MMAP = os.environ.get("FAISS_MMAP", "0") == "1"
+
+# Approximate index used once the collection outgrows exact search
+FAISS_INDEX_TYPE = os.environ.get("FAISS_INDEX_TYPE", "flat")
+FAISS_MIGRATE_THRESHOLD = int(os.environ.get("FAISS_MIGRATE_THRESHOLD", "100000"))
+FAISS_EF_SEARCH = int(os.environ.get("FAISS_EF_SEARCH", "64"))
+FAISS_NPROBE = int(os.environ.get("FAISS_NPROBE", "16"))
+
+# Retrieval: "dense", "sparse" (BM25), "hybrid" (reciprocal-rank fusion) or "prefilter" (BM25 candidates, vector ranking)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+HYBRID_DENSE_WEIGHT = float(os.environ.get("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_SPARSE_WEIGHT = float(os.environ.get("HYBRID_SPARSE_WEIGHT", "1.0"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+SPARSE_PREFILTER_CANDIDATES = int(os.environ.get("SPARSE_PREFILTER_CANDIDATES", "1000"))
+
+# Multi-process serving over one FAISS_PERSIST_DIR: "standalone" (one process does everything),
+# "writer" (ingestion only, publishes snapshots) or "reader" (queries only, reloads published snapshots)
+FAISS_ROLE = os.environ.get("FAISS_ROLE", "standalone")
+FAISS_PUBLISH_SECONDS = float(os.environ.get("FAISS_PUBLISH_SECONDS", "5"))
+FAISS_REFRESH_SECONDS = float(os.environ.get("FAISS_REFRESH_SECONDS", "1"))
+if FAISS_ROLE not in ("standalone", "writer", "reader"):
+    raise ValueError(f"Unknown FAISS_ROLE '{FAISS_ROLE}'. Expected 'standalone', 'writer' or 'reader'.")
+
+# Split the collection over this many local shard processes (1 keeps it in this process)
+FAISS_SHARDS = int(os.environ.get("FAISS_SHARDS", "1"))
+
 # Initialize FAISS database
 dimension = 384  # Assuming embeddings have 384 dimensions
-faiss_db = FAISSVectorDB(dimension)
+faiss_options = dict(
+    snapshot_every=FAISS_SNAPSHOT_EVERY,
+    # Replicas map the snapshot so its pages are shared by every worker
+    mmap=FAISS_MMAP or FAISS_ROLE == "reader",
+    index_type=FAISS_INDEX_TYPE,
+    migrate_threshold=FAISS_MIGRATE_THRESHOLD,
+    ef_search=FAISS_EF_SEARCH,
+    nprobe=FAISS_NPROBE,
+    retrieval_mode=RETRIEVAL_MODE,
+    dense_weight=HYBRID_DENSE_WEIGHT,
+    sparse_weight=HYBRID_SPARSE_WEIGHT,
+    rrf_k=RRF_K,
+    prefilter_candidates=SPARSE_PREFILTER_CANDIDATES,
+    read_only=FAISS_ROLE == "reader",
+    publish_interval=FAISS_PUBLISH_SECONDS if FAISS_ROLE == "writer" else 0.0,
+    refresh_interval=FAISS_REFRESH_SECONDS,
+)
+if FAISS_SHARDS > 1:
+    faiss_db = ShardedVectorDB(dimension, FAISS_SHARDS, persist_dir=FAISS_PERSIST_DIR or None, **faiss_options)
+else:
+    faiss_db = FAISSVectorDB(dimension, persist_dir=FAISS_PERSIST_DIR or None, **faiss_options)
 
 # Initialize RAG agent
 rag_agent = RAGAgent()
 
-logging.basicConfig(level=logging.DEBUG)
+# Number of retrieved contexts per query
+TOP_K = 5
+
+# Answers to repeated or paraphrased questions, invalidated when the index changes
+answer_cache = AnswerCache(dimension)
+
+# Concurrent /query-rag/ calls arriving within QUERY_BATCH_WAIT_MS are answered together
+QUERY_BATCH_SIZE = int(os.environ.get("QUERY_BATCH_SIZE", "16"))
+QUERY_BATCH_WAIT_MS = float(os.environ.get("QUERY_BATCH_WAIT_MS", "10"))
+
+# Level and format come from LOG_LEVEL and LOG_FORMAT
+configure_logging()
+
+# Per-endpoint latency of the first request, which includes any lazy model loading
+first_request_seconds = {}
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    seconds = time.perf_counter() - start
+    # Key by route template so /jobs/{job_id} is one entry
+    route = request.scope.get("route")
+    if route is not None:
+        first_request_seconds.setdefault(route.path, seconds)
+        metrics.request_seconds.labels(request.method, route.path, str(response.status_code)).observe(seconds)
+    return response
+
+@app.on_event("startup")
+def warm_up_models():
+    # Load the preloaded models in the background; /health reports when they are ready
+    registry.warm_up(background=True)
+
+@app.on_event("shutdown")
+def save_index():
+    # Fold the append log into a snapshot so the next start loads quickly
+    faiss_db.save()
+    embedding_cache.flush()
 
 def check_api_key(x_api_key: str = Header(...)):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
 
+def check_writer():
+    if FAISS_ROLE == "reader":
+        raise HTTPException(status_code=403, detail="This server only answers queries; send documents to the index writer.")
+
 class QueryRequest(BaseModel):
     query: str
+    # e.g. {"filename": "report.pdf", "page": {"gte": 2}, "source_type": ["ocr", "handwriting"]}
+    filters: Optional[dict] = None
+    # Include the seconds spent per stage (embed, search, generate) in the response; not for /query-rag/stream
+    timings: bool = False
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    # Applied to every query
+    filters: Optional[dict] = None
+    timings: bool = False
+
+def check_filters(filters: Optional[dict]):
+    try:
+        validate_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _filter_scope(filters: Optional[dict]) -> str:
+    # Answer cache scope: the same question over different subsets has different answers
+    return json.dumps(filters, sort_keys=True) if filters else ""
+
+def _context(result) -> dict:
+    metadata, distance, score = result
+    # distance is None for results found by BM25 only
+    return {"metadata": metadata, "distance": distance, "score": score}
+
+def answer_queries(queries: List[str], filters: Optional[List[Optional[dict]]] = None) -> List[dict]:
+    """
+    Retrieve contexts and generate answers for several queries at once.
+
+    All queries are embedded in one call and searched together (vector,
+    BM25 or hybrid according to RETRIEVAL_MODE), and the answers are
+    generated in one batched pipeline call.
+
+    Args:
+        queries (List[str]): The user queries.
+        filters (List[dict], optional): Metadata filter (or None) of each query.
+
+    Returns:
+        List[dict]: One response per query with "query", "answer",
+        "retrieved_contexts", "cache" (None, "exact" or "semantic") and
+        "timings" (seconds per stage of the whole batch, and its size).
+        "answer" is None when nothing was retrieved. A query whose search
+        failed gets the exception instead, without failing the others.
+    """
+    with metrics.trace() as trace:
+        results = _answer_queries(queries, filters)
+    timings = dict(trace.summary(), batch_size=len(queries))
+    # Copies, so the responses held by the answer cache stay without timings
+    return [result if isinstance(result, Exception) else dict(result, timings=timings) for result in results]
+
+def _search_each(queries: List[str], embeddings, filters: List[Optional[dict]]) -> list:
+    """
+    Search queries one at a time, returning the exception of each query that fails.
+    """
+    retrieved = []
+    for query, embedding, query_filters in zip(queries, embeddings, filters):
+        try:
+            retrieved.append(faiss_db.search_batch([query], [embedding], n_results=TOP_K, filters=[query_filters])[0])
+        except Exception as e:
+            logging.error(f"Search failed for query {excerpt(query)}: {e}")
+            retrieved.append(e)
+    return retrieved
+
+def _answer_queries(queries: List[str], filters: Optional[List[Optional[dict]]] = None) -> List[dict]:
+    if not queries:
+        return []
+    filters = filters or [None] * len(queries)
+    scopes = [_filter_scope(f) for f in filters]
+    faiss_db.refresh()
+    version = faiss_db.version
+    embeddings = generate_embeddings(queries)
+
+    # Repeated and paraphrased questions are answered from the cache
+    results = [answer_cache.get(query, embedding, version, scope) for query, embedding, scope in zip(queries, embeddings, scopes)]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if not misses:
+        return results
+
+    try:
+        retrieved = faiss_db.search_batch(
+            [queries[i] for i in misses],
+            [embeddings[i] for i in misses],
+            n_results=TOP_K,
+            filters=[filters[i] for i in misses],
+        )
+    except Exception as e:
+        if len(misses) == 1:
+            raise
+        # Keep one malformed query from failing the ones batched with it
+        logging.warning(f"Batched search of {len(misses)} queries failed ({e}); searching them one by one.")
+        retrieved = _search_each([queries[i] for i in misses], [embeddings[i] for i in misses], [filters[i] for i in misses])
+
+    responses = {}
+    for i, contexts in zip(misses, retrieved):
+        if isinstance(contexts, Exception):
+            results[i] = contexts
+            continue
+        retrieved_contexts = [_context(ctx) for ctx in contexts]
+        responses[i] = {"query": queries[i], "answer": None, "retrieved_contexts": retrieved_contexts, "cache": None}
+
+    answerable = [r for r in responses.values() if r["retrieved_contexts"]]
+    answers = rag_agent.answer_batch(
+        [r["query"] for r in answerable],
+        [[ctx["metadata"]["text"] for ctx in r["retrieved_contexts"]] for r in answerable],
+        [[ctx["score"] for ctx in r["retrieved_contexts"]] for r in answerable],
+    )
+    for response, answer in zip(answerable, answers):
+        response["answer"] = answer
+
+    for i, response in responses.items():
+        if response["answer"] is not None:
+            answer_cache.put(response["query"], embeddings[i], version, response, scopes[i])
+        results[i] = response
+    return results
+
+def answer_filtered_queries(items: List[tuple]) -> List[dict]:
+    # Batcher items are (query, filters) pairs
+    return answer_queries([query for query, _ in items], [filters for _, filters in items])
+
+query_batcher = MicroBatcher(
+    answer_filtered_queries,
+    max_batch_size=QUERY_BATCH_SIZE,
+    max_wait_ms=QUERY_BATCH_WAIT_MS,
+)
+
+def ingest_document(job: Job) -> dict:
+    """
+    Run OCR, chunking, embedding and indexing for one ingestion job.
+
+    Pages checkpointed by an earlier run of the job are not OCR'd again.
+    A document whose content hash is already indexed is skipped entirely;
+    otherwise its chunks are upserted under that hash, replacing earlier
+    documents with the same filename when the job asks for it.
+
+    Args:
+        job (Job): The job holding the uploaded file.
+
+    Returns:
+        dict: Summary of the indexed document, with the seconds spent per stage under "timings".
+    """
+    with metrics.trace() as trace:
+        result = _index_document(job)
+    result["timings"] = trace.summary()
+    logging.info(f"Ingested {job.filename}.", extra={"job_id": job.id, **result["timings"]})
+    return result
+
+def _index_document(job: Job) -> dict:
+    doc_id = job.content_hash or job.id
+    if faiss_db.has_document(doc_id):
+        logging.debug(f"Document {doc_id} is already indexed; skipping OCR and embedding.")
+        return {"filename": job.filename, "doc_id": doc_id, "duplicate": True}
+
+    # Pages that failed in an earlier run are retried
+    completed = {page: r for page, r in job.load_checkpoints().items() if r["error"] is None}
+    job.update(pages_done=len(completed), failed_pages=[])
+
+    # Handle PDF files
+    if job.filename.lower().endswith('.pdf'):
+        logging.debug("Rasterizing PDF pages and running OCR.")
+        job.update(pages_total=count_pdf_pages(job.upload_path))
+        images = iter_pdf_pages(job.upload_path, skip_pages=completed)
+    else:
+        # Process the document with OCR
+        logging.debug("Processing image file.")
+        job.update(pages_total=1)
+        images = [None if 1 in completed else job.upload_path]
+
+    page_results = ocr_pages(
+        images,
+        completed=completed,
+        on_page=job.page_done,
+        should_stop=lambda: job.cancel_requested,
+        spell_correct=False,
+    )
+    failed_pages = [{"page": r["page"], "error": r["error"]} for r in page_results if r["error"] is not None]
+    for failed in failed_pages:
+        logging.error(f"OCR failed on page {failed['page']}: {failed['error']}")
+    if len(failed_pages) == len(page_results):
+        raise ValueError("OCR failed on every page of the document.")
+    pages = [r for r in page_results if r["error"] is None]
+    job.raise_if_cancelled()
+
+    # Recognize handwriting and figures of the whole document in batches, then merge them in reading order
+    region_seconds = route_regions(pages)
+    metrics.observe("regions", region_seconds)
+    logging.debug(f"Recognized handwritten and figure regions in {region_seconds:.2f}s.")
+    job.raise_if_cancelled()
+
+    # Spell-correct all pages together so each distinct word is looked up once
+    spell_seconds = correct_pages(pages)
+    metrics.observe("spell_correct", spell_seconds)
+    logging.debug(f"Spell-corrected {len(pages)} pages in {spell_seconds:.2f}s.")
+
+    # Split the pages into token windows that fit the embedding model
+    max_tokens = min(CHUNK_TOKENS, max_input_tokens())
+    chunks = chunk_pages(pages, tokenizer=get_tokenizer(), max_tokens=max_tokens)
+    logging.debug(f"Split document into {len(chunks)} chunks.")
+
+    embeddings = []
+    if chunks:
+        # Generate embeddings for all chunks in batches
+        logging.debug("Generating embeddings.")
+        embeddings = generate_embeddings([chunk["text"] for chunk in chunks])
+        job.raise_if_cancelled()
+
+    # Add one vector per chunk to the FAISS database, replacing the document's earlier chunks
+    logging.debug("Adding embeddings to FAISS database.")
+    metadatas = [
+        {
+            "filename": job.filename,
+            "text": chunk["text"],
+            "page": chunk["page"],
+            "bbox": chunk["bbox"],
+            "chunk_index": chunk["chunk_index"],
+            "language": chunk["language"],
+            "source_type": chunk["source_type"],
+            "uploaded_at": job.created_at,
+        }
+        for chunk in chunks
+    ]
+    with metrics.timed("index"):
+        replaced = faiss_db.upsert_document(
+            doc_id, embeddings, metadatas, replace_filter={"filename": job.filename} if job.replace else None,
+        )
+    logging.debug(f"FAISS index now contains {faiss_db.ntotal} vectors.")
+
+    return {
+        "filename": job.filename,
+        "doc_id": doc_id,
+        "duplicate": False,
+        "pages": len(page_results),
+        "chunks": len(chunks),
+        "replaced_chunks": replaced,
+        "region_seconds": region_seconds,
+        "spell_correct_seconds": spell_seconds,
+    }
+
+# Background ingestion: uploads are queued and processed by a bounded worker pool
+INGEST_JOBS_DIR = os.environ.get("INGEST_JOBS_DIR", "data/jobs")
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+INGEST_MAX_QUEUED = int(os.environ.get("INGEST_MAX_QUEUED", "16"))
+# Query replicas leave the jobs to the writer
+job_queue = None if FAISS_ROLE == "reader" else JobQueue(ingest_document, INGEST_JOBS_DIR, workers=INGEST_WORKERS, max_queued=INGEST_MAX_QUEUED)
+
+@app.post("/process-document/", status_code=202)
+def process_document(file: UploadFile = File(...), replace: bool = False, x_api_key: str = Header(...)):
+    """
+    Endpoint to queue a document for ingestion.
 
-@app.post("/process-document/")
-def process_document(file: UploadFile = File(...), x_api_key: str = Header(...)):
+    Re-uploading a document that is already indexed completes without
+    reprocessing it. With `replace=true`, documents previously uploaded
+    under the same filename (e.g. an earlier scan) are replaced.
+
+    Returns:
+        dict: The job ID and its initial status. Poll /jobs/{job_id} for progress.
+    """
     logging.debug("Received request to process document.")
     check_api_key(x_api_key)
+    check_writer()
 
     # Validate file format
     logging.debug(f"Validating file format for: {file.filename}")
@@ -37,48 +402,52 @@ def process_document(file: UploadFile = File(...), x_api_key: str = Header(...))
         logging.error("Unsupported file format.")
         raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PNG, JPG, or PDF file.")
 
-    # Save the uploaded file temporarily
-    file_path = f"/tmp/{file.filename}"
-    logging.debug(f"Saving file to: {file_path}")
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
-
     try:
-        # Handle PDF files
-        if file.filename.lower().endswith('.pdf'):
-            from app.ocr.pdf_utils import convert_pdf_to_images
-            logging.debug("Converting PDF to images.")
-            image_paths = convert_pdf_to_images(file_path)
-            extracted_texts = []
-            for image_path in image_paths:
-                logging.debug(f"Processing image: {image_path}")
-                ocr_result = process_image(image_path)
-                extracted_texts.append(ocr_result["extracted_text"])
-            extracted_text = "\n".join(extracted_texts)
-        else:
-            # Process the document with OCR
-            logging.debug("Processing image file.")
-            ocr_result = process_image(file_path)
-            extracted_text = ocr_result["extracted_text"]
-
-        logging.debug(f"Extracted text: {extracted_text}")
-
-        # Generate embeddings for the extracted text
-        logging.debug("Generating embeddings.")
-        embeddings = generate_embeddings([extracted_text])
-        logging.debug(f"Generated embeddings: {embeddings}")
+        with metrics.timed("upload_save"):
+            job = job_queue.submit(file.filename, file.file, replace=replace)
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Too many documents are queued. Please retry later.", headers={"Retry-After": "30"})
+
+    return {"message": "Document queued for processing", "job_id": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, x_api_key: str = Header(...)):
+    """
+    Endpoint to report the status and per-page progress of an ingestion job.
+    """
+    check_api_key(x_api_key)
+    check_writer()
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
 
-        # Add embeddings to the FAISS database
-        logging.debug("Adding embeddings to FAISS database.")
-        metadata = {"filename": file.filename, "text": extracted_text}
-        faiss_db.add_embeddings(embeddings, [metadata])
-        logging.debug(f"FAISS index now contains {faiss_db.index.ntotal} vectors.")
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, x_api_key: str = Header(...)):
+    """
+    Endpoint to cancel a queued or running ingestion job.
+    """
+    check_api_key(x_api_key)
+    check_writer()
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
 
-        return {"message": "Document processed successfully", "metadata": metadata}
+@app.delete("/documents/{doc_id}")
+def delete_document(doc_id: str, x_api_key: str = Header(...)):
+    """
+    Endpoint to remove a document's chunks from the index.
 
-    except Exception as e:
-        logging.error(f"Error processing document: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred while processing the document.")
+    Args:
+        doc_id (str): The document ID (content hash) reported by its ingestion job.
+    """
+    check_api_key(x_api_key)
+    check_writer()
+    deleted = faiss_db.delete_document(doc_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return {"doc_id": doc_id, "deleted_chunks": deleted}
 
 @app.post("/query-rag/")
 def query_rag(request: QueryRequest, x_api_key: str = Header(...)):
@@ -86,38 +455,188 @@ def query_rag(request: QueryRequest, x_api_key: str = Header(...)):
     Endpoint to query the RAG system, retrieve relevant contexts, and generate an answer.
 
     Args:
-        request (QueryRequest): The user query wrapped in a Pydantic model.
+        request (QueryRequest): The user query and optional metadata filters
+            (filename, doc_id, language, source_type, page, chunk_index, uploaded_at).
 
     Returns:
         dict: Response containing the generated answer and retrieved contexts.
     """
+    start = time.perf_counter()
     check_api_key(x_api_key)
+    check_filters(request.filters)
+
+    # Retrieve contexts and generate the answer, batched with concurrent queries
+    response = query_batcher.submit((request.query, request.filters))
+    timings = response.pop("timings")
+    logging.debug(
+        f"Answered query: {excerpt(request.query)}",
+        extra={"contexts": len(response["retrieved_contexts"]), "cache": response["cache"], **timings},
+    )
+
+    if not response["retrieved_contexts"]:
+        raise HTTPException(status_code=404, detail="No relevant contexts found.")
+
+    if request.timings:
+        # Stage timings are those of the micro-batch the query was answered in
+        response["timings"] = dict(timings, request_seconds=time.perf_counter() - start)
+    return response
 
-    # Log the query
-    print(f"Received query: {request.query}")
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query-rag/stream")
+def query_rag_stream(request: QueryRequest, x_api_key: str = Header(...)):
+    """
+    Endpoint to query the RAG system and stream the answer as server-sent events.
 
-    # Retrieve relevant contexts from the FAISS database
-    retrieved_contexts = faiss_db.query(request.query, top_k=5)
+    Events, in order: "contexts" with the retrieved contexts, one "token" per
+    generated piece of text ({"text": ...}), then "done" with the full answer
+    (or "error" if generation fails).
+    """
+    check_api_key(x_api_key)
+    check_filters(request.filters)
 
-    # Log retrieved contexts
-    print(f"Retrieved contexts: {retrieved_contexts}")
+    scope = _filter_scope(request.filters)
+    faiss_db.refresh()
+    version = faiss_db.version
+    embedding = generate_embeddings([request.query])[0]
+    cached = answer_cache.get(request.query, embedding, version, scope)
+    if cached is not None:
+        def cached_events():
+            yield _sse("contexts", cached["retrieved_contexts"])
+            yield _sse("token", {"text": cached["answer"]})
+            yield _sse("done", {"query": request.query, "answer": cached["answer"], "cache": cached["cache"]})
+        return StreamingResponse(cached_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    if not retrieved_contexts:
+    contexts = faiss_db.search_batch([request.query], [embedding], n_results=TOP_K, filters=[request.filters])[0]
+    if not contexts:
         raise HTTPException(status_code=404, detail="No relevant contexts found.")
+    retrieved_contexts = [_context(ctx) for ctx in contexts]
 
-    # Convert numpy.float32 to native Python float in retrieved contexts
-    retrieved_contexts = [
-        {"metadata": ctx[0], "distance": float(ctx[1])} for ctx in retrieved_contexts
-    ]
+    def events():
+        yield _sse("contexts", retrieved_contexts)
+        pieces = []
+        try:
+            for text in rag_agent.answer_stream(
+                request.query,
+                [ctx["metadata"]["text"] for ctx in retrieved_contexts],
+                [ctx["score"] for ctx in retrieved_contexts],
+            ):
+                pieces.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            logging.error(f"Streaming generation failed: {e}")
+            yield _sse("error", {"detail": str(e)})
+            return
+        answer = "".join(pieces)
+        answer_cache.put(request.query, embedding, version, {
+            "query": request.query, "answer": answer, "retrieved_contexts": retrieved_contexts, "cache": None,
+        }, scope)
+        yield _sse("done", {"query": request.query, "answer": answer, "cache": None})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    # Generate an answer using the RAG agent
-    answer = rag_agent.answer(request.query, [ctx["metadata"]["text"] for ctx in retrieved_contexts])
+@app.post("/query-rag/batch")
+def query_rag_batch(request: BatchQueryRequest, x_api_key: str = Header(...)):
+    """
+    Endpoint to answer many queries in one request, e.g. for offline evaluation.
 
-    # Log the generated answer
-    print(f"Generated answer: {answer}")
+    Args:
+        request (BatchQueryRequest): The user queries and optional metadata filters.
 
+    Returns:
+        dict: One response per query under "results", in order. Queries with
+        no relevant contexts have a null answer; a query that failed also has
+        an "error" message, without failing the rest of the batch.
+    """
+    check_api_key(x_api_key)
+    check_filters(request.filters)
+
+    results = []
+    for start in range(0, len(request.queries), QUERY_BATCH_SIZE):
+        batch = request.queries[start:start + QUERY_BATCH_SIZE]
+        results.extend(answer_queries(batch, [request.filters] * len(batch)))
+    for position, result in enumerate(results):
+        if isinstance(result, Exception):
+            # Keep the other answers; only this query is reported as failed
+            logging.error(f"Batch query failed: {result}")
+            results[position] = {"query": request.queries[position], "answer": None, "retrieved_contexts": [], "error": str(result)}
+        elif not request.timings:
+            del result["timings"]
+    return {"results": results}
+
+@app.get("/embedding-cache/stats")
+def embedding_cache_stats(x_api_key: str = Header(...)):
+    """
+    Report hit/miss rates of the embedding cache and the encode time it saved.
+    """
+    check_api_key(x_api_key)
+    return get_cache_stats()
+
+@app.get("/answer-cache/stats")
+def answer_cache_stats(x_api_key: str = Header(...)):
+    """
+    Report exact and semantic hit rates of the answer cache.
+    """
+    check_api_key(x_api_key)
+    return answer_cache.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Expose stage and request latency histograms in the Prometheus text format.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.post("/debug/profiler/start")
+def start_profiler(interval_ms: Optional[float] = None, duration_seconds: Optional[float] = None, x_api_key: str = Header(...)):
+    """
+    Start the sampling profiler in this worker, discarding the previous profile.
+
+    Args:
+        interval_ms (float, optional): Milliseconds between samples (default PROFILER_INTERVAL_MS).
+        duration_seconds (float, optional): Stop automatically after this long.
+    """
+    check_api_key(x_api_key)
+    if not profiler.start(interval=interval_ms / 1000 if interval_ms else None, duration=duration_seconds):
+        raise HTTPException(status_code=409, detail="The profiler is already running.")
+    return {"running": True, "interval_seconds": profiler.interval}
+
+@app.post("/debug/profiler/stop")
+def stop_profiler(x_api_key: str = Header(...)):
+    """
+    Stop the sampling profiler and return its report.
+    """
+    check_api_key(x_api_key)
+    profiler.stop()
+    return profiler.report()
+
+@app.get("/debug/profiler")
+def profiler_report(format: str = "json", limit: int = 30, x_api_key: str = Header(...)):
+    """
+    Report the current (or last) profile: the hottest functions as JSON, or
+    with format=collapsed the collapsed stacks for a flame graph tool.
+    """
+    check_api_key(x_api_key)
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'collapsed'.")
+    return profiler.report(limit=limit)
+
+@app.get("/health")
+def health():
+    """
+    Report readiness, model load state and startup latencies.
+    """
     return {
-        "query": request.query,
-        "answer": answer,
-        "retrieved_contexts": retrieved_contexts
-    }
\ No newline at end of file
+        "status": "ready" if registry.ready() else "warming_up",
+        "models": registry.status(),
+        "import_seconds": IMPORT_SECONDS,
+        "first_request_seconds": first_request_seconds,
+        "index": {"role": FAISS_ROLE, "shards": FAISS_SHARDS, "version": faiss_db.version},
+    }
+
+# Time spent importing this module, including everything it pulls in
+IMPORT_SECONDS = time.perf_counter() - _import_started
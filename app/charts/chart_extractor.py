@@ -1,14 +1,33 @@
-from transformers import DonutProcessor, VisionEncoderDecoderModel
+from typing import List
 from PIL import Image
+from app.models.backends import load_model, model_backend
+from app.models.registry import registry
 
 # Use Donut model for visual extraction (charts, tables)
-processor = DonutProcessor.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
-model = VisionEncoderDecoderModel.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
+DONUT_MODEL = "naver-clova-ix/donut-base-finetuned-docvqa"
 
-def extract_visual_text(image: Image.Image) -> str:
-    pixel_values = processor(image, return_tensors="pt").pixel_values
+def _load_donut(backend: str = model_backend("donut")):
+    from transformers import DonutProcessor, VisionEncoderDecoderModel
+    processor = DonutProcessor.from_pretrained(DONUT_MODEL)
+    model = load_model(DONUT_MODEL, backend, VisionEncoderDecoderModel.from_pretrained, "ORTModelForVision2Seq")
+    return processor, model
+
+registry.register("donut", _load_donut)
+
+def extract_visual_text_batch(images: List[Image.Image]) -> List[str]:
+    # One generate call for all figures; shorter outputs are padded up to the longest
+    processor, model = registry.get("donut")
+    pixel_values = processor(images, return_tensors="pt").pixel_values
     task_prompt = "<s_docvqa>"
     decoder_input_ids = processor.tokenizer(task_prompt, add_special_tokens=False, return_tensors="pt").input_ids
-    outputs = model.generate(pixel_values, decoder_input_ids=decoder_input_ids)
-    result = processor.batch_decode(outputs, skip_special_tokens=True)[0]
-    return result
\ No newline at end of file
+    decoder_input_ids = decoder_input_ids.repeat(len(images), 1)
+    outputs = model.generate(
+        pixel_values,
+        decoder_input_ids=decoder_input_ids,
+        pad_token_id=processor.tokenizer.pad_token_id,
+        eos_token_id=processor.tokenizer.eos_token_id,
+    )
+    return processor.batch_decode(outputs, skip_special_tokens=True)
+
+def extract_visual_text(image: Image.Image) -> str:
+    return extract_visual_text_batch([image])[0]
\ No newline at end of file
@@ -1,3 +1,132 @@
-def chunk_text(text: str, max_tokens: int = 256) -> list[str]:
-    import textwrap
-    return textwrap.wrap(text, max_tokens)
\ No newline at end of file
+import os
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# Default window size and overlap, in tokens
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "32"))
+
+
+def _token_counts(words: List[str], tokenizer=None) -> List[int]:
+    """
+    Count the tokens in each word. Without a tokenizer every word counts as one token.
+    """
+    if tokenizer is None or not words:
+        return [1] * len(words)
+    encoded = tokenizer(words, add_special_tokens=False)["input_ids"]
+    return [max(1, len(ids)) for ids in encoded]
+
+
+def _windows(counts: List[int], max_tokens: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Split a sequence of per-word token counts into [start, end) word windows.
+
+    Each window holds at most `max_tokens` tokens (a single longer word gets a
+    window of its own) and repeats up to `overlap` tokens of the previous one.
+    """
+    windows = []
+    start = 0
+    while start < len(counts):
+        end = start
+        total = 0
+        while end < len(counts) and (end == start or total + counts[end] <= max_tokens):
+            total += counts[end]
+            end += 1
+        windows.append((start, end))
+        if end >= len(counts):
+            break
+
+        # Step back so the next window starts with the tail of this one
+        next_start = end
+        carried = 0
+        while next_start - 1 > start and carried + counts[next_start - 1] <= overlap:
+            next_start -= 1
+            carried += counts[next_start]
+        start = next_start
+    return windows
+
+
+def _merge_boxes(boxes: List[Optional[dict]]) -> Optional[dict]:
+    boxes = [b for b in boxes if b is not None]
+    if not boxes:
+        return None
+    left = min(b["x"] for b in boxes)
+    top = min(b["y"] for b in boxes)
+    right = max(b["x"] + b["width"] for b in boxes)
+    bottom = max(b["y"] + b["height"] for b in boxes)
+    return {"x": left, "y": top, "width": right - left, "height": bottom - top}
+
+
+def _source_type(boxes: List[Optional[dict]]) -> str:
+    """
+    Return the most common source of the word boxes ("ocr" for untagged words).
+    """
+    counts = Counter((b or {}).get("source", "ocr") for b in boxes)
+    return counts.most_common(1)[0][0] if counts else "ocr"
+
+
+def _page_words(page: dict) -> Tuple[List[str], List[Optional[dict]]]:
+    """
+    Return the words of an OCR page result with the bounding box of each word.
+
+    The corrected text is used when it still lines up one-to-one with the
+    Tesseract boxes; otherwise the raw box text is used.
+    """
+    words = page.get("extracted_text", "").split()
+    boxes = page.get("bounding_boxes") or []
+    if boxes and len(words) == len(boxes):
+        return words, boxes
+    if boxes:
+        return [b["text"] for b in boxes], boxes
+    return words, [None] * len(words)
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = 0, tokenizer=None) -> List[str]:
+    """
+    Split text into overlapping windows of at most `max_tokens` tokens.
+
+    Args:
+        text (str): The text to split.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap (int): Number of tokens repeated between consecutive chunks.
+        tokenizer: Optional Hugging Face tokenizer used to count tokens. Words are counted when omitted.
+
+    Returns:
+        List[str]: The text chunks.
+    """
+    words = text.split()
+    counts = _token_counts(words, tokenizer)
+    return [" ".join(words[start:end]) for start, end in _windows(counts, max_tokens, overlap)]
+
+
+def chunk_pages(pages: List[dict], tokenizer=None, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> List[dict]:
+    """
+    Split OCR page results into token windows that keep their page and position.
+
+    Args:
+        pages (List[dict]): OCR results as returned by `process_image`, each with a "page" number.
+        tokenizer: Optional Hugging Face tokenizer used to count tokens. Words are counted when omitted.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap (int): Number of tokens repeated between consecutive chunks.
+
+    Returns:
+        List[dict]: Chunks with the keys "text", "page", "bbox" (union of the
+        word boxes, or None), "chunk_index" (position within the document),
+        "language" (OCR language of the page, or None) and "source_type"
+        ("ocr", "handwriting" or "chart", by majority of the words).
+    """
+    chunks = []
+    for page in pages:
+        words, boxes = _page_words(page)
+        language = (page.get("route") or {}).get("lang")
+        counts = _token_counts(words, tokenizer)
+        for start, end in _windows(counts, max_tokens, overlap):
+            chunks.append({
+                "text": " ".join(words[start:end]),
+                "page": page.get("page", 1),
+                "bbox": _merge_boxes(boxes[start:end]),
+                "chunk_index": len(chunks),
+                "language": language,
+                "source_type": _source_type(boxes[start:end]),
+            })
+    return chunks
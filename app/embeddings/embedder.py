@@ -1,23 +1,101 @@
-from sentence_transformers import SentenceTransformer
 from typing import List
+import os
+from app.embeddings.embedding_cache import EmbeddingCache
+from app.models.backends import model_backend, onnx_cache_path, quantize_int8, session_options
+from app.models.registry import registry
+from app.observability import metrics
 
-# Multilingual model supports Malayalam
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Inference backend of the embedding model: "eager", "int8" or "onnx"
+EMBEDDER_BACKEND = model_backend("embedder")
+
+def _load_model(backend: str = EMBEDDER_BACKEND):
+    from sentence_transformers import SentenceTransformer
+    # Multilingual model supports Malayalam
+    if backend == "onnx":
+        # Exported on first use and cached with its tokenizer and pooling config
+        path = onnx_cache_path(MODEL_NAME)
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options()}
+        if os.path.isdir(path):
+            return SentenceTransformer(path, backend="onnx", model_kwargs=model_kwargs)
+        model = SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs=model_kwargs)
+        model.save(path)
+        return model
+    model = SentenceTransformer(MODEL_NAME)
+    if backend == "int8":
+        model = quantize_int8(model)
+    return model
+
+registry.register("embedder", _load_model)
+
+def get_model():
+    """
+    Return the shared Sentence Transformer model, loading it on first use.
+    """
+    return registry.get("embedder")
+
+# Number of texts encoded per forward pass
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+
+# Embedding cache: in-memory LRU size and optional on-disk tier, which
+# several worker processes may share (writes are serialized with a file lock)
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_DIR = os.environ.get("EMBED_CACHE_DIR", "")
+EMBED_CACHE_DISK_CAPACITY = int(os.environ.get("EMBED_CACHE_DISK_CAPACITY", "1000000"))
+
+# Backends produce slightly different vectors, so each gets its own cache keys
+embedding_cache = EmbeddingCache(
+    MODEL_NAME if EMBEDDER_BACKEND == "eager" else f"{MODEL_NAME}@{EMBEDDER_BACKEND}",
+    max_entries=EMBED_CACHE_SIZE,
+    cache_dir=EMBED_CACHE_DIR or None,
+    disk_capacity=EMBED_CACHE_DISK_CAPACITY,
+)
+
+def get_tokenizer():
+    """
+    Return the tokenizer of the embedding model, for token-aware chunking.
+    """
+    return get_model().tokenizer
+
+def max_input_tokens() -> int:
+    """
+    Return the number of content tokens the embedding model reads before truncating.
+    """
+    # Leave room for the [CLS] and [SEP] special tokens
+    return get_model().max_seq_length - 2
 
 def get_embedding(text: str):
-    return model.encode([text])[0]
+    return get_model().encode([text])[0]
 
-def generate_embeddings(texts: List[str]) -> List[List[float]]:
+def generate_embeddings(texts: List[str], batch_size: int = EMBED_BATCH_SIZE, use_cache: bool = True) -> List[List[float]]:
     """
-    Generate embeddings for a list of texts using the pre-loaded Sentence Transformer model.
+    Generate embeddings for a list of texts using the shared Sentence Transformer model.
+
+    Texts already in the embedding cache are not re-encoded; the remaining
+    ones are encoded together in batches.
 
     Args:
         texts (List[str]): List of text strings to embed.
+        batch_size (int): Number of texts encoded per forward pass.
+        use_cache (bool): Whether to read and fill the embedding cache.
 
     Returns:
         List[List[float]]: List of embeddings for the input texts.
     """
-    return model.encode(texts, convert_to_numpy=True)
+    def encode(batch: List[str]):
+        return get_model().encode(batch, batch_size=batch_size, convert_to_numpy=True)
+
+    with metrics.timed("embed"):
+        if not use_cache:
+            return encode(texts)
+        return embedding_cache.encode(texts, encode)
+
+def get_cache_stats() -> dict:
+    """
+    Return hit/miss counters of the embedding cache.
+    """
+    return embedding_cache.stats()
 
 # Example usage
 if __name__ == "__main__":
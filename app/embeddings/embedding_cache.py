@@ -0,0 +1,276 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Size in bytes of a cache key (truncated SHA-256)
+KEY_BYTES = 16
+
+# Each on-disk key record is the key followed by a 64-bit sequence number
+RECORD_BYTES = KEY_BYTES + 8
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so that trivially different inputs share a cache entry.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class _DiskTier:
+    """
+    Fixed-capacity ring of float16 vectors in a memory-mapped file.
+
+    `vectors.f16` holds the vectors and `keys.bin` one record per slot with
+    the key and a sequence number, so the newest slot (and the next one to
+    overwrite) can be found again after a restart. A last record after the
+    slots holds the newest sequence number; slot `(sequence - 1) % capacity`
+    is written next.
+
+    Several processes (uvicorn workers, shard processes) may share one
+    directory. Writes take an exclusive `fcntl` lock on `cache.lock` and
+    continue the ring from the sequence number on disk; reads take a shared
+    lock and check that the slot still holds their key, since another
+    process may have overwritten it. Entries written by other processes
+    after this one opened the tier are not looked up.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int, capacity: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(cache_dir, "cache.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self.capacity = capacity
+        with self._locked(fcntl.LOCK_EX):
+            info_path = os.path.join(cache_dir, "cache.json")
+            info = {"model": model_name, "dimension": dimension, "capacity": capacity}
+            if os.path.exists(info_path):
+                with open(info_path, encoding="utf-8") as f:
+                    if json.load(f) != info:
+                        # Different model or shape: the old entries are unusable
+                        for name in ("vectors.f16", "keys.bin"):
+                            if os.path.exists(os.path.join(cache_dir, name)):
+                                os.remove(os.path.join(cache_dir, name))
+            with open(info_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(info_path + ".tmp", info_path)
+
+            vectors_path = os.path.join(cache_dir, "vectors.f16")
+            mode = "r+" if os.path.exists(vectors_path) else "w+"
+            self.vectors = np.memmap(vectors_path, dtype="float16", mode=mode, shape=(capacity, dimension))
+            self._keys_fd = os.open(os.path.join(cache_dir, "keys.bin"), os.O_RDWR | os.O_CREAT, 0o644)
+
+            self.slots = {}
+            self.slot_keys = [None] * capacity
+            last_sequence = 0
+            data = os.pread(self._keys_fd, capacity * RECORD_BYTES, 0)
+            for slot in range(len(data) // RECORD_BYTES):
+                key, sequence = self._parse(data[slot * RECORD_BYTES:(slot + 1) * RECORD_BYTES])
+                if sequence == 0:
+                    continue
+                self.slots[key] = slot
+                self.slot_keys[slot] = key
+                last_sequence = max(last_sequence, sequence)
+            # Files written before the sequence record was added have only the slots
+            self.sequence = max(last_sequence, self._read_sequence())
+
+    @contextmanager
+    def _locked(self, operation: int):
+        fcntl.flock(self._lock_fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse(record: bytes) -> Tuple[bytes, int]:
+        return record[:KEY_BYTES], int.from_bytes(record[KEY_BYTES:], "little")
+
+    def _read_sequence(self) -> int:
+        record = os.pread(self._keys_fd, RECORD_BYTES, self.capacity * RECORD_BYTES)
+        return self._parse(record)[1] if len(record) == RECORD_BYTES else 0
+
+    def _forget(self, slot: int):
+        key = self.slot_keys[slot]
+        if key is not None and self.slots.get(key) == slot:
+            del self.slots[key]
+        self.slot_keys[slot] = None
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        with self._locked(fcntl.LOCK_SH):
+            if self._parse(os.pread(self._keys_fd, RECORD_BYTES, slot * RECORD_BYTES))[0] != key:
+                # Another process reused the slot
+                self._forget(slot)
+                return None
+            return np.asarray(self.vectors[slot], dtype="float32")
+
+    def put(self, key: bytes, vector: np.ndarray):
+        if key in self.slots:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            # Other processes may have advanced the ring since this one last wrote
+            self.sequence = max(self.sequence, self._read_sequence()) + 1
+            slot = (self.sequence - 1) % self.capacity
+            self._forget(slot)
+            self.vectors[slot] = vector
+            os.pwrite(self._keys_fd, key + self.sequence.to_bytes(8, "little"), slot * RECORD_BYTES)
+            os.pwrite(self._keys_fd, bytes(KEY_BYTES) + self.sequence.to_bytes(8, "little"), self.capacity * RECORD_BYTES)
+        self.slots[key] = slot
+        self.slot_keys[slot] = key
+
+    def flush(self):
+        self.vectors.flush()
+        os.fsync(self._keys_fd)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embeddings.
+
+    Keys are a hash of the model name and the normalized text. Recent
+    vectors are kept in a bounded in-memory LRU; with `cache_dir` set, every
+    vector is also written to a memory-mapped float16 ring on disk that
+    survives restarts and can be shared by several processes.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 10000, cache_dir: Optional[str] = None, disk_capacity: int = 1000000):
+        """
+        Args:
+            model_name (str): Name of the embedding model, part of every key.
+            max_entries (int): Capacity of the in-memory LRU tier.
+            cache_dir (str, optional): Directory for the on-disk tier. Disabled when None.
+            disk_capacity (int): Number of vectors held by the on-disk tier.
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.disk_capacity = disk_capacity
+        self._memory = OrderedDict()
+        self._disk = None
+        self._lock = threading.Lock()
+        if cache_dir:
+            self._open_existing_disk_tier()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+    def _open_existing_disk_tier(self):
+        """
+        Reopen the on-disk tier left by a previous run of the same model.
+        """
+        info_path = os.path.join(self.cache_dir, "cache.json")
+        if not os.path.exists(info_path):
+            return
+        with open(info_path, encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("model") == self.model_name:
+            self._disk = _DiskTier(self.cache_dir, self.model_name, info["dimension"], self.disk_capacity)
+
+    def key(self, text: str) -> bytes:
+        digest = hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+        return digest[:KEY_BYTES]
+
+    def _get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+        if self._disk is not None:
+            vector = self._disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+        return None
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _put(self, key: bytes, vector: np.ndarray):
+        self._remember(key, vector)
+        if self.cache_dir:
+            if self._disk is None:
+                self._disk = _DiskTier(self.cache_dir, self.model_name, len(vector), self.disk_capacity)
+            self._disk.put(key, vector)
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings for `texts`, calling `encode_fn` once for the cache misses only.
+
+        Args:
+            texts (List[str]): Texts to embed.
+            encode_fn (Callable): Function that embeds a list of texts into a 2-D array.
+
+        Returns:
+            np.ndarray: One float32 row per input text, in input order.
+        """
+        keys = [self.key(text) for text in texts]
+        found = {}
+        missing = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self._get(key)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    found[key] = vector
+
+        if missing:
+            start = time.perf_counter()
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype="float32")
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.misses += len(missing)
+                self.encode_seconds += elapsed
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._put(key, vector)
+
+        return np.stack([found[key] for key in keys]) if keys else np.zeros((0, 0), dtype="float32")
+
+    def flush(self):
+        """
+        Write the on-disk tier back to its files.
+        """
+        with self._lock:
+            if self._disk is not None:
+                self._disk.flush()
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and an estimate of the encode time saved.
+
+        Saved time is the number of hits times the measured average encode time per miss.
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            seconds_per_text = self.encode_seconds / self.misses if self.misses else 0.0
+            return {
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk.slots) if self._disk is not None else 0,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "encode_seconds": self.encode_seconds,
+                "encode_seconds_saved": hits * seconds_per_text,
+            }
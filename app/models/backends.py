@@ -0,0 +1,92 @@
+import logging
+import os
+from typing import Any, Callable
+
+# Inference backends: eager fp32 PyTorch, dynamically int8-quantized PyTorch, or ONNX Runtime
+BACKENDS = ("eager", "int8", "onnx")
+
+# Backend for models without their own <NAME>_BACKEND setting (e.g. EMBEDDER_BACKEND=onnx)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "eager")
+
+# Where models exported to ONNX are cached between runs
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", "data/onnx")
+
+# ONNX Runtime intra-op threads per session (0 lets ONNX Runtime decide)
+ORT_INTRA_OP_THREADS = int(os.environ.get("ORT_INTRA_OP_THREADS", "0"))
+
+
+def model_backend(name: str) -> str:
+    """
+    Return the configured backend of a registry model, from <NAME>_BACKEND or INFERENCE_BACKEND.
+    """
+    backend = os.environ.get(f"{name.upper()}_BACKEND", INFERENCE_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' for model '{name}'. Expected one of {list(BACKENDS)}.")
+    return backend
+
+
+def onnx_cache_path(model_id: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_id.replace("/", "--"))
+
+
+def session_options():
+    """
+    ONNX Runtime session options with all graph optimizations and the configured thread count.
+    """
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ORT_INTRA_OP_THREADS:
+        options.intra_op_num_threads = ORT_INTRA_OP_THREADS
+    return options
+
+
+def quantize_int8(model):
+    """
+    Dynamically quantize the Linear layers of a PyTorch model to int8 for CPU inference.
+    """
+    import torch
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_onnx(model_id: str, ort_class: str):
+    """
+    Load a Hugging Face model as an ONNX Runtime model, exporting it on first use.
+
+    Args:
+        model_id (str): Hugging Face model id.
+        ort_class (str): Model class in `optimum.onnxruntime`, e.g. "ORTModelForSeq2SeqLM".
+
+    Returns:
+        The ONNX Runtime model, which supports `generate` / forward like the PyTorch one.
+    """
+    from optimum import onnxruntime as ort
+
+    cls = getattr(ort, ort_class)
+    path = onnx_cache_path(model_id)
+    kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options()}
+    if os.path.isdir(path):
+        return cls.from_pretrained(path, **kwargs)
+    logging.info(f"Exporting '{model_id}' to ONNX in {path}.")
+    model = cls.from_pretrained(model_id, export=True, **kwargs)
+    model.save_pretrained(path)
+    return model
+
+
+def load_model(model_id: str, backend: str, torch_loader: Callable[[str], Any], ort_class: str):
+    """
+    Load a Hugging Face model with the given backend.
+
+    Args:
+        model_id (str): Hugging Face model id.
+        backend (str): One of BACKENDS.
+        torch_loader (Callable[[str], Any]): Loads the PyTorch model, e.g. `AutoModel.from_pretrained`.
+        ort_class (str): Matching class in `optimum.onnxruntime` for the "onnx" backend.
+    """
+    if backend == "onnx":
+        return load_onnx(model_id, ort_class)
+    model = torch_loader(model_id)
+    if backend == "int8":
+        model = quantize_int8(model)
+    return model
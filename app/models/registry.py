@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Models loaded in the background at startup (comma-separated registry names)
+PRELOAD_MODELS = [name.strip() for name in os.environ.get("PRELOAD_MODELS", "embedder,generator").split(",") if name.strip()]
+
+# Seconds after which an unused, non-preloaded model is unloaded (0 keeps models loaded)
+MODEL_IDLE_TIMEOUT = float(os.environ.get("MODEL_IDLE_TIMEOUT", "0"))
+
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], Any], preload: bool, idle_timeout: float):
+        self.name = name
+        self.loader = loader
+        self.preload = preload
+        self.idle_timeout = idle_timeout
+        self.instance = None
+        self.loading = False
+        self.load_seconds = None
+        self.loads = 0
+        self.last_used = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Loads models lazily on first use and shares them across the application.
+
+    Each model is registered under a name with a loader function. Loading
+    happens once, under a per-model lock, the first time `get` is called (or
+    during `warm_up`). Models registered with an idle timeout are dropped
+    after that many seconds without use and reloaded on the next `get`.
+    """
+
+    def __init__(self, preload: Iterable[str] = (), idle_timeout: float = 0.0):
+        """
+        Args:
+            preload (Iterable[str]): Names of models that `warm_up` loads and that are never evicted.
+            idle_timeout (float): Default idle timeout for the other models (0 disables eviction).
+        """
+        self.preload = set(preload)
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def register(self, name: str, loader: Callable[[], Any], preload: Optional[bool] = None, idle_timeout: Optional[float] = None):
+        """
+        Register a model loader. Registering an existing name keeps the first registration.
+
+        Args:
+            name (str): Registry name of the model.
+            loader (Callable[[], Any]): Function that loads and returns the model.
+            preload (bool, optional): Load during warm-up. Defaults to whether `name` is in the preload list.
+            idle_timeout (float, optional): Seconds of disuse before eviction. Defaults to the registry's.
+        """
+        with self._lock:
+            if name in self._entries:
+                return
+            preload = name in self.preload if preload is None else preload
+            if idle_timeout is None:
+                idle_timeout = 0.0 if preload else self.idle_timeout
+            self._entries[name] = _Entry(name, loader, preload, idle_timeout)
+            if idle_timeout and self._reaper is None:
+                self._reaper = threading.Thread(target=self._evict_idle, name="model-reaper", daemon=True)
+                self._reaper.start()
+
+    def get(self, name: str) -> Any:
+        """
+        Return the model registered as `name`, loading it if needed.
+        """
+        entry = self._entries[name]
+        instance = entry.instance
+        if instance is None:
+            with entry.lock:
+                if entry.instance is None:
+                    entry.loading = True
+                    start = time.perf_counter()
+                    try:
+                        entry.instance = entry.loader()
+                    except Exception as e:
+                        entry.error = str(e)
+                        raise
+                    finally:
+                        entry.loading = False
+                    entry.load_seconds = time.perf_counter() - start
+                    entry.loads += 1
+                    entry.error = None
+                    logging.info(f"Loaded model '{name}' in {entry.load_seconds:.2f}s.")
+                instance = entry.instance
+        entry.last_used = time.monotonic()
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].instance is not None
+
+    def evict(self, name: str):
+        """
+        Drop the loaded instance of a model; it is reloaded on next use.
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.instance is not None:
+                entry.instance = None
+                logging.info(f"Unloaded model '{name}'.")
+
+    def _evict_idle(self):
+        while True:
+            time.sleep(max(1.0, min(e.idle_timeout for e in self._entries.values() if e.idle_timeout) / 4))
+            now = time.monotonic()
+            for entry in list(self._entries.values()):
+                if entry.idle_timeout and entry.instance is not None and entry.last_used is not None:
+                    if now - entry.last_used > entry.idle_timeout:
+                        self.evict(entry.name)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load models ahead of the first request.
+
+        Args:
+            names (Iterable[str], optional): Models to load. Defaults to all preloaded models.
+            background (bool): Load in a daemon thread instead of blocking.
+
+        Returns:
+            threading.Thread: The warm-up thread when `background` is True.
+        """
+        if names is None:
+            names = [name for name, entry in self._entries.items() if entry.preload]
+        names = list(names)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logging.error(f"Failed to load model '{name}': {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self) -> bool:
+        """
+        Whether every preloaded model is loaded.
+        """
+        return all(entry.instance is not None for entry in self._entries.values() if entry.preload)
+
+    def status(self) -> Dict[str, dict]:
+        """
+        Report load state and load time of every registered model.
+        """
+        return {
+            name: {
+                "loaded": entry.instance is not None,
+                "loading": entry.loading,
+                "preload": entry.preload,
+                "load_seconds": entry.load_seconds,
+                "loads": entry.loads,
+                "idle_timeout": entry.idle_timeout,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# Shared registry used by every module that needs a model
+registry = ModelRegistry(preload=PRELOAD_MODELS, idle_timeout=MODEL_IDLE_TIMEOUT)
@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import sys
+
+# Root log level, e.g. DEBUG, INFO or WARNING
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# "text" for human-readable lines, "json" for one JSON object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+
+# Longest excerpt of user or document text that goes into a log line
+MAX_LOGGED_CHARS = 200
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def _extras(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Plain log lines with the `extra=` fields appended as key=value pairs.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            line += " " + " ".join(f"{key}={value}" for key, value in extras.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the `extra=` fields as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extras(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Install a single stderr handler on the root logger with the given level and format.
+    """
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown LOG_FORMAT '{fmt}'. Expected 'text' or 'json'.")
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def excerpt(text: str, limit: int = MAX_LOGGED_CHARS) -> str:
+    """
+    Shorten text for a log line, noting how long the original was.
+    """
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
@@ -0,0 +1,95 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+
+# Pipeline stages timed with `timed` / `observe`. One observation is one call:
+# a page for rasterize, preprocess and tesseract, a document for regions,
+# spell_correct and index during ingestion, and a batch for embed, search and generate.
+STAGES = (
+    "upload_save", "rasterize", "preprocess", "tesseract", "spell_correct", "regions",
+    "embed", "index", "search", "generate",
+)
+
+# Histogram buckets in seconds, from sub-millisecond searches to minute-long documents
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+stage_seconds = Histogram("rag_stage_seconds", "Seconds spent per call of each pipeline stage.", ["stage"], buckets=BUCKETS)
+request_seconds = Histogram("rag_http_request_seconds", "HTTP request latency in seconds.", ["method", "route", "status"], buckets=BUCKETS)
+
+
+class Trace:
+    """
+    Stage timings of one request, query batch or ingestion job.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def summary(self) -> dict:
+        """
+        Seconds per stage as "<stage>_seconds", plus "total_seconds" since the trace started.
+        """
+        timings = {f"{stage}_seconds": seconds for stage, seconds in self.stages.items()}
+        timings["total_seconds"] = time.perf_counter() - self.started
+        return timings
+
+
+_current_trace = contextvars.ContextVar("trace", default=None)  # type: contextvars.ContextVar[Optional[Trace]]
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Collect the stages observed in this context (thread or task) into a Trace.
+    """
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def observe(stage: str, seconds: float):
+    """
+    Record one call of a stage in the histogram and in the active trace, if any.
+    """
+    stage_seconds.labels(stage).observe(seconds)
+    current = _current_trace.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Time the enclosed block as one call of `stage`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Return the metrics in the Prometheus text format, and its content type.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (several uvicorn workers), the
+    metrics of all worker processes are aggregated from that directory.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
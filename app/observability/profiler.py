@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+# Seconds between stack samples
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL_MS", "5")) / 1000
+
+# Deepest stack recorded per sample; deeper stacks keep their innermost frames
+PROFILER_MAX_DEPTH = 64
+
+# A thread whose innermost frame is in one of these files is waiting, not working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "connection.py", "socket.py")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the Python stack of every thread at a fixed interval.
+
+    Sampling runs in a background thread and costs the same whatever the
+    application is doing, so it can be switched on in a live server for a
+    while and off again. Threads blocked on a lock, queue or socket are not
+    counted. Native code (FAISS, Tesseract, PyTorch) shows up as the Python
+    frame that called it. Stacks are kept in the collapsed
+    "outer;...;inner count" format read by flame graph tools.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_depth: int = PROFILER_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, duration: Optional[float] = None) -> bool:
+        """
+        Start sampling, discarding the previous profile.
+
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to the current interval.
+            duration (float, optional): Stop automatically after this many seconds.
+
+        Returns:
+            bool: False if the profiler was already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = interval or self.interval
+            self._stacks = Counter()
+            self._samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            deadline = time.monotonic() + duration if duration else None
+            self._thread = threading.Thread(target=self._run, args=(deadline,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> bool:
+        """
+        Stop sampling and keep the profile. Returns False if the profiler was not running.
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def _sample(self, own_thread: int):
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stacks.append(tuple(reversed(stack)))
+        with self._lock:
+            self._stacks.update(stacks)
+            self._samples += 1
+
+    def _run(self, deadline: Optional[float]):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self._sample(own_thread)
+        self.stopped_at = time.time()
+
+    def _snapshot(self) -> Tuple[dict, int]:
+        with self._lock:
+            return dict(self._stacks), self._samples
+
+    def report(self, limit: int = 30) -> dict:
+        """
+        Summarize the profile: the functions seen most often on top of a stack
+        ("self") and anywhere in a stack ("total").
+
+        Returns:
+            dict: State of the profiler, sample counts, and the top `limit`
+            functions of each kind with their share of the thread samples.
+        """
+        stacks, samples = self._snapshot()
+        thread_samples = sum(stacks.values())
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for name in set(stack):
+                total_counts[name] += count
+
+        def top(counts: Counter) -> list:
+            return [
+                {"function": name, "samples": count, "fraction": count / thread_samples}
+                for name, count in counts.most_common(limit)
+            ]
+
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "samples": samples,
+            "thread_samples": thread_samples,
+            "top_self": top(self_counts),
+            "top_total": top(total_counts),
+        }
+
+    def collapsed(self) -> str:
+        """
+        Return the profile as collapsed stacks, one "outer;...;inner count" line per distinct stack.
+        """
+        stacks, _ = self._snapshot()
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+# Shared profiler, started and stopped through the API
+profiler = SamplingProfiler()
@@ -1,16 +1,48 @@
-import pytesseract
+from typing import List, Tuple
+import numpy as np
 from PIL import Image
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+from app.models.backends import load_model, model_backend
+from app.models.registry import registry
+from app.ocr.tesseract_engine import get_engine
 
 # For simple English handwritten OCR fallback
 def tesseract_ocr(image: Image.Image) -> str:
-    return pytesseract.image_to_string(image, lang="eng")
+    return get_engine().image_to_string(image, lang="eng")
 
 # For better results, use TrOCR (if GPU RAM allows)
-processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
-model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-handwritten")
+TROCR_MODEL = "microsoft/trocr-base-handwritten"
+
+def _load_trocr(backend: str = model_backend("trocr")):
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+    processor = TrOCRProcessor.from_pretrained(TROCR_MODEL)
+    model = load_model(TROCR_MODEL, backend, VisionEncoderDecoderModel.from_pretrained, "ORTModelForVision2Seq")
+    return processor, model
+
+registry.register("trocr", _load_trocr)
+
+def trocr_recognize_batch(images: List[Image.Image]) -> List[Tuple[str, float]]:
+    """
+    Read handwritten lines with TrOCR, with a confidence per line.
+
+    The confidence is the mean probability of the generated tokens, scaled
+    to 0-100 like Tesseract's word confidences.
+    """
+    # One generate call for all lines; the processor resizes every image to the same input size
+    processor, model = registry.get("trocr")
+    pixel_values = processor(images=images, return_tensors="pt").pixel_values
+    outputs = model.generate(pixel_values, output_scores=True, return_dict_in_generate=True)
+    texts = processor.batch_decode(outputs.sequences, skip_special_tokens=True)
+    # Log-probabilities of the generated tokens; padding after an early end of sequence is -inf or 0
+    log_probs = model.compute_transition_scores(outputs.sequences, outputs.scores, normalize_logits=True).numpy()
+    generated = outputs.sequences[:, -log_probs.shape[1]:].numpy() != processor.tokenizer.pad_token_id
+    confidences = []
+    for row, mask in zip(log_probs, generated):
+        probabilities = np.exp(row[mask & np.isfinite(row)])
+        confidences.append(100.0 * float(probabilities.mean()) if len(probabilities) else 0.0)
+    return list(zip(texts, confidences))
+
+def trocr_ocr_batch(images: List[Image.Image]) -> List[str]:
+    return [text for text, _ in trocr_recognize_batch(images)]
 
 def trocr_ocr(image: Image.Image) -> str:
-    pixel_values = processor(images=image, return_tensors="pt").pixel_values
-    generated_ids = model.generate(pixel_values)
-    return processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
\ No newline at end of file
+    return trocr_ocr_batch([image])[0]
\ No newline at end of file
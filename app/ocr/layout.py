@@ -0,0 +1,151 @@
+import base64
+import os
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+# Split pages into printed, handwritten and figure regions during OCR (off by default:
+# it loads TrOCR and Donut, and low confidence alone is a weak sign of handwriting)
+LAYOUT_ANALYSIS = os.environ.get("LAYOUT_ANALYSIS", "0") == "1"
+
+# Text lines with a mean Tesseract confidence below this are treated as handwriting
+HANDWRITING_MAX_CONF = float(os.environ.get("HANDWRITING_MAX_CONF", "60"))
+
+# Tesseract routes whose lines may be sent to TrOCR, which only reads English.
+# Low-confidence lines of Malayalam or mixed pages keep their Tesseract text.
+HANDWRITING_LANGS = ("eng",)
+
+# Minimum area of a figure, as a fraction of the page area
+FIGURE_MIN_AREA = float(os.environ.get("FIGURE_MIN_AREA", "0.02"))
+
+# Maximum fraction of a figure's area that may be covered by recognized words
+FIGURE_MAX_TEXT_COVERAGE = float(os.environ.get("FIGURE_MAX_TEXT_COVERAGE", "0.3"))
+
+PRINTED = "printed"
+HANDWRITTEN = "handwritten"
+FIGURE = "figure"
+
+
+def _box(x: int, y: int, width: int, height: int) -> dict:
+    return {"x": int(x), "y": int(y), "width": int(width), "height": int(height)}
+
+
+def _union(boxes: List[dict]) -> dict:
+    left = min(b["x"] for b in boxes)
+    top = min(b["y"] for b in boxes)
+    right = max(b["x"] + b["width"] for b in boxes)
+    bottom = max(b["y"] + b["height"] for b in boxes)
+    return _box(left, top, right - left, bottom - top)
+
+
+def _contains(outer: dict, inner: dict) -> bool:
+    cx = inner["x"] + inner["width"] / 2
+    cy = inner["y"] + inner["height"] / 2
+    return outer["x"] <= cx <= outer["x"] + outer["width"] and outer["y"] <= cy <= outer["y"] + outer["height"]
+
+
+def encode_crop(image: np.ndarray, box: dict) -> str:
+    """
+    Crop a region and encode it as base64 PNG, so it survives pickling and JSON page checkpoints.
+    """
+    crop = image[box["y"]:box["y"] + box["height"], box["x"]:box["x"] + box["width"]]
+    ok, png = cv2.imencode(".png", crop)
+    if not ok:
+        raise ValueError("Failed to encode region image.")
+    return base64.b64encode(png.tobytes()).decode("ascii")
+
+
+def decode_crop(encoded: str) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(base64.b64decode(encoded), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def text_lines(data: dict) -> List[Tuple[List[dict], float]]:
+    """
+    Group Tesseract words into lines, in Tesseract's reading order.
+
+    Returns:
+        List[Tuple[List[dict], float]]: The word boxes of each line and their mean confidence.
+    """
+    lines = {}
+    for i, text in enumerate(data["text"]):
+        if not text.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        box = dict(_box(data["left"][i], data["top"][i], data["width"][i], data["height"][i]), text=text)
+        lines.setdefault(key, []).append((box, float(data["conf"][i])))
+    return [([box for box, _ in words], sum(conf for _, conf in words) / len(words)) for words in lines.values()]
+
+
+def find_figures(binary: np.ndarray, word_boxes: List[dict]) -> List[dict]:
+    """
+    Find large non-text areas (charts, diagrams, photos) on a binarized page.
+
+    Dark pixels are merged into blobs; blobs that are big enough and mostly
+    not covered by recognized words are returned as figure boxes.
+    """
+    height, width = binary.shape[:2]
+    page_area = float(height * width)
+    ink = cv2.threshold(binary, 127, 255, cv2.THRESH_BINARY_INV)[1]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 100), max(3, height // 100)))
+    blobs = cv2.dilate(ink, kernel)
+    contours, _ = cv2.findContours(blobs, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    figures = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = float(w * h)
+        # Skip small blobs and scan borders that span the whole page
+        if area < FIGURE_MIN_AREA * page_area or area > 0.9 * page_area:
+            continue
+        box = _box(x, y, w, h)
+        text_area = sum(b["width"] * b["height"] for b in word_boxes if _contains(box, b))
+        if text_area / area <= FIGURE_MAX_TEXT_COVERAGE:
+            figures.append(box)
+    return figures
+
+
+def analyze_layout(image: np.ndarray, data: dict, lang: str = "eng") -> List[dict]:
+    """
+    Split an OCR'd page into printed, handwritten and figure regions in reading order.
+
+    Printed lines keep their Tesseract words. Handwritten lines and figures
+    also carry a cropped image ("image", base64 PNG) for the TrOCR and Donut
+    passes in `region_router.route_regions`; their Tesseract words remain as a
+    fallback. Lines are only treated as handwriting on pages read with an
+    English-only model (see HANDWRITING_LANGS).
+
+    Args:
+        image (np.ndarray): The preprocessed page that `data` was recognized from.
+        data (dict): Tesseract image_to_data output for the page.
+        lang (str): Tesseract language the page was recognized with.
+
+    Returns:
+        List[dict]: Regions with "type", "bbox", "words" (word boxes with their
+        text) and, for text lines, the mean Tesseract "confidence".
+    """
+    handwriting = lang in HANDWRITING_LANGS
+    lines = text_lines(data)
+    figures = find_figures(image, [box for words, _ in lines for box in words])
+
+    figure_regions = [{"type": FIGURE, "bbox": box, "words": [], "image": encode_crop(image, box)} for box in figures]
+    regions = []
+    for words, confidence in lines:
+        bbox = _union(words)
+        figure = next((f for f in figure_regions if _contains(f["bbox"], bbox)), None)
+        if figure is not None:
+            figure["words"].extend(words)
+            continue
+        # Figures are placed before the first line that starts below their top edge
+        for f in figure_regions:
+            if "placed" not in f and f["bbox"]["y"] <= bbox["y"]:
+                f["placed"] = True
+                regions.append(f)
+        if handwriting and confidence < HANDWRITING_MAX_CONF:
+            regions.append({"type": HANDWRITTEN, "bbox": bbox, "words": words, "confidence": confidence, "image": encode_crop(image, bbox)})
+        else:
+            regions.append({"type": PRINTED, "bbox": bbox, "words": words, "confidence": confidence})
+    regions.extend(f for f in figure_regions if "placed" not in f)
+    for region in regions:
+        region.pop("placed", None)
+    return regions
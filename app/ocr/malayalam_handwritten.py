@@ -1,5 +1,5 @@
-import pytesseract
 from PIL import Image
+from app.ocr.tesseract_engine import get_engine
 
 def malayalam_ocr(image: Image.Image) -> str:
-    return pytesseract.image_to_string(image, lang="mal")
\ No newline at end of file
+    return get_engine().image_to_string(image, lang="mal")
\ No newline at end of file
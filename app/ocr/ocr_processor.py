@@ -1,59 +1,81 @@
-import pytesseract
-from pytesseract import Output
 from PIL import Image
 import cv2
 import numpy as np
-from spellchecker import SpellChecker
-
-def process_image(image_path: str, lang: str = "eng+mal") -> dict:
+import os
+import time
+from typing import Union
+from app.ocr.layout import LAYOUT_ANALYSIS, analyze_layout
+from app.ocr.preprocessing import OCR_PREPROCESS_PROFILE, preprocess
+from app.ocr.spell_correction import INDIAN_NAMES_PATH, get_corrector
+from app.ocr.tesseract_engine import get_engine
+from app.ocr.script_detection import COMBINED_LANG, ROUTE_MIN_WORD_CONF, mean_word_confidence, route_language
+
+# Default OCR language; "auto" detects the script of each page and picks the model
+OCR_LANG = os.environ.get("OCR_LANG", "auto")
+
+
+def process_image(
+    image_path: Union[str, np.ndarray],
+    lang: str = OCR_LANG,
+    spell_correct: bool = True,
+    profile: str = OCR_PREPROCESS_PROFILE,
+    layout: bool = LAYOUT_ANALYSIS,
+) -> dict:
     """
     Process an image to extract text using Tesseract OCR.
 
     Args:
-        image_path (str): Path to the image file.
-        lang (str): Language(s) for OCR (default: English and Malayalam).
+        image_path (str | np.ndarray): Path to the image file, or an already
+            decoded image (grayscale or BGR array).
+        lang (str): Language(s) for OCR, or "auto" to route the page to the English,
+            Malayalam or combined model by detected script.
+        spell_correct (bool): Whether to spell-correct the text here. Pass False when
+            the caller corrects a whole document at once with `correct_pages`.
+        profile (str): Preprocessing profile ("fast", "balanced" or "handwriting-max").
+        layout (bool): Also split the page into printed, handwritten and figure
+            regions ("regions"), for `region_router.route_regions` to finish.
 
     Returns:
-        dict: Extracted text and bounding box information.
+        dict: Extracted text, bounding box information, the language route taken
+        and per-stage timings in seconds.
     """
+    start = time.perf_counter()
+
     # Load the image
-    image = cv2.imread(image_path)
+    if isinstance(image_path, np.ndarray):
+        image = image_path
+    else:
+        image = cv2.imread(image_path)
 
     # Check if the image was loaded successfully
     if image is None:
         raise ValueError(f"Failed to load image from {image_path}. Ensure the file exists and is a valid image.")
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # Preprocess the image (e.g., thresholding)
-    _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-
-    # Apply noise removal
-    denoised = cv2.fastNlMeansDenoising(gray, None, 30, 7, 21)
-
-    # Apply adaptive thresholding for better handwritten text recognition
-    thresh = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-    # Deskew the image
-    coords = np.column_stack(np.where(thresh > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-    if angle < -45:
-        angle = -(90 + angle)
+    if image.ndim == 2:
+        gray = image
     else:
-        angle = -angle
-    (h, w) = gray.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    deskewed = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-
-    # Adjust contrast
-    contrast_enhanced = cv2.convertScaleAbs(deskewed, alpha=1.5, beta=0)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    # Configure Tesseract to use a custom dictionary for Indian names
-    custom_config = "--user-words /home/intern1/files/app/ocr/indian_names.txt"
+    # Denoise, binarize and deskew according to the preprocessing profile
+    preprocessed, stage_timings = preprocess(gray, profile)
 
-    # Perform OCR with enhanced preprocessing
-    data = pytesseract.image_to_data(contrast_enhanced, lang=lang, config=custom_config, output_type=Output.DICT)
+    # Pick the language model from the page's script
+    detect_start = time.perf_counter()
+    if lang == "auto":
+        route = route_language(preprocessed)
+    else:
+        route = {"lang": lang, "script": None, "script_conf": None, "orientation": None}
+    route["fallback"] = False
+    detect_seconds = time.perf_counter() - detect_start
+
+    # Perform OCR with enhanced preprocessing, using the custom dictionary for Indian names
+    ocr_start = time.perf_counter()
+    data = get_engine().image_to_data(preprocessed, lang=route["lang"], user_words=INDIAN_NAMES_PATH)
+    if lang == "auto" and route["lang"] != COMBINED_LANG and mean_word_confidence(data) < ROUTE_MIN_WORD_CONF:
+        # Probably mixed script: redo the page with both models
+        data = get_engine().image_to_data(preprocessed, lang=COMBINED_LANG, user_words=INDIAN_NAMES_PATH)
+        route["lang"] = COMBINED_LANG
+        route["fallback"] = True
 
     # Extract text and bounding boxes
     extracted_text = " ".join(data['text']).strip()
@@ -68,26 +90,35 @@ def process_image(image_path: str, lang: str = "eng+mal") -> dict:
         for i in range(len(data['text'])) if data['text'][i].strip()
     ]
 
-    # Post-processing: Spell-checking and custom rules
-    spell = SpellChecker()
-
-    # Correct spelling errors in extracted text
-    corrected_text = " ".join([
-        spell.correction(word) if word.isalpha() and spell.correction(word) is not None else word
-        for word in extracted_text.split()
-    ])
+    ocr_seconds = time.perf_counter() - ocr_start
 
-    # Apply custom rules for common OCR misinterpretations
-    corrected_text = corrected_text.replace("\\CHELOR", "BACHELOR")
-    corrected_text = corrected_text.replace("Jniversity", "University")
+    # Find the handwritten lines and figures that need the transformer models
+    layout_start = time.perf_counter()
+    regions = analyze_layout(preprocessed, data, lang=route["lang"]) if layout else None
+    layout_seconds = time.perf_counter() - layout_start
 
-    # Update the extracted text with corrections
-    extracted_text = corrected_text
+    # Post-processing: Spell-checking and custom rules
+    spell_start = time.perf_counter()
+    if spell_correct:
+        extracted_text = get_corrector().correct_text(extracted_text)
+    spell_seconds = time.perf_counter() - spell_start
 
-    return {
+    result = {
         "extracted_text": extracted_text,
-        "bounding_boxes": bounding_boxes
+        "bounding_boxes": bounding_boxes,
+        "route": route,
+        "timings": {
+            "preprocess_seconds": detect_start - start,
+            "script_detect_seconds": detect_seconds,
+            "preprocess_stages": stage_timings,
+            "tesseract_seconds": ocr_seconds,
+            "layout_seconds": layout_seconds,
+            "spell_correct_seconds": spell_seconds,
+        },
     }
+    if regions is not None:
+        result["regions"] = regions
+    return result
 
 # Example usage
 if __name__ == "__main__":
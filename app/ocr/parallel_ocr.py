@@ -0,0 +1,211 @@
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.observability import metrics
+from app.ocr.ocr_processor import OCR_LANG, process_image
+
+# Number of OCR worker processes (defaults to one per CPU core)
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Limit each worker to a single thread so that N processes use N cores
+    instead of every Tesseract/OpenCV call fanning out over all of them.
+
+    The spell-checking dictionary is not loaded here: ingestion corrects
+    pages in the parent, so a worker loads it on its first page with
+    `spell_correct=True` and keeps it for later pages.
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def get_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Return the shared OCR process pool, creating it on first use.
+
+    Args:
+        max_workers (int, optional): Pool size. Defaults to OCR_WORKERS.
+
+    Returns:
+        ProcessPoolExecutor: The shared process pool.
+    """
+    global _executor, _executor_workers
+    workers = max_workers or OCR_WORKERS
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            logging.debug(f"Starting OCR process pool with {workers} workers.")
+            _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            _executor_workers = workers
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _failed_page(page_number: int, error: Exception) -> dict:
+    return {
+        "page": page_number,
+        "extracted_text": "",
+        "bounding_boxes": [],
+        "error": str(error) or type(error).__name__,
+    }
+
+
+def _ocr_page(page_number: int, image: Union[str, np.ndarray], lang: str, spell_correct: bool = True) -> dict:
+    """
+    OCR a single page, turning any failure into an error entry instead of raising.
+    """
+    try:
+        result = process_image(image, lang=lang, spell_correct=spell_correct)
+    except Exception as e:
+        return _failed_page(page_number, e)
+    result["page"] = page_number
+    result["error"] = None
+    return result
+
+
+def _record_timings(result: dict, spell_correct: bool):
+    """
+    Report the stage timings measured in the worker to this process's metrics.
+    """
+    timings = result.get("timings")
+    if timings is None:
+        return
+    metrics.observe("preprocess", timings["preprocess_seconds"])
+    metrics.observe("tesseract", timings["tesseract_seconds"])
+    if spell_correct:
+        metrics.observe("spell_correct", timings["spell_correct_seconds"])
+
+
+def _collect(page_number: int, future) -> Tuple[dict, bool]:
+    """
+    Wait for a page result. Returns the result and whether the pool broke.
+    """
+    try:
+        return future.result(), False
+    except BrokenProcessPool as e:
+        # A worker died (e.g. Tesseract crashed); keep the other pages
+        logging.error(f"OCR worker crashed on page {page_number}: {e}")
+        return _failed_page(page_number, e), True
+    except Exception as e:
+        logging.error(f"OCR failed on page {page_number}: {e}")
+        return _failed_page(page_number, e), False
+
+
+class OCRCancelled(Exception):
+    """
+    Raised by `ocr_pages` when its `should_stop` callback asks it to stop.
+    """
+
+
+def _done_future(result: dict) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def ocr_pages(
+    images: Iterable[Optional[Union[str, np.ndarray]]],
+    lang: str = OCR_LANG,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    completed: Optional[Dict[int, dict]] = None,
+    on_page: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    spell_correct: bool = True,
+) -> List[dict]:
+    """
+    Run OCR over several page images in parallel.
+
+    Pages are pulled from `images` lazily and at most `max_in_flight` of them
+    are queued at once, so a generator of rendered pages is never fully
+    materialized.
+
+    Args:
+        images (Iterable[str | np.ndarray | None]): Page image paths or arrays, in page order.
+            Pages found in `completed` may be None.
+        lang (str): Language(s) for OCR, or "auto" to route each page by script.
+        max_workers (int, optional): Number of worker processes. Defaults to OCR_WORKERS.
+        max_in_flight (int, optional): Maximum number of queued pages. Defaults to twice the worker count.
+        completed (Dict[int, dict], optional): Results of pages already processed, by page number.
+            These pages are not OCR'd again.
+        on_page (Callable, optional): Called with each newly computed page result, in page order.
+        should_stop (Callable, optional): Polled before each page; when it returns True
+            the queued pages are cancelled and OCRCancelled is raised.
+        spell_correct (bool): Whether each page is spell-corrected by its worker.
+
+    Returns:
+        List[dict]: One result per page, in page order. Each result has the keys
+        "page", "extracted_text", "bounding_boxes" and "error" (None on success).
+    """
+    completed = completed or {}
+    workers = max_workers or OCR_WORKERS
+    executor = get_executor(workers) if workers > 1 else None
+    in_flight = max_in_flight or 2 * workers
+    pending = deque()
+    results = []
+    broken = False
+
+    def drain_one():
+        nonlocal broken
+        page_number, future, is_new = pending.popleft()
+        result, crashed = _collect(page_number, future)
+        results.append(result)
+        broken = broken or crashed
+        if is_new:
+            _record_timings(result, spell_correct)
+            if on_page is not None:
+                on_page(result)
+
+    for i, image in enumerate(images):
+        page_number = i + 1
+        if should_stop is not None and should_stop():
+            for _, future, _ in pending:
+                future.cancel()
+            raise OCRCancelled(f"OCR stopped before page {page_number}.")
+
+        if page_number in completed:
+            pending.append((page_number, _done_future(completed[page_number]), False))
+        elif executor is None:
+            pending.append((page_number, _done_future(_ocr_page(page_number, image, lang, spell_correct)), True))
+        else:
+            try:
+                future = executor.submit(_ocr_page, page_number, image, lang, spell_correct)
+            except BrokenProcessPool:
+                # Replace a pool broken by an earlier crash and retry once
+                _reset_executor()
+                executor = get_executor(workers)
+                future = executor.submit(_ocr_page, page_number, image, lang, spell_correct)
+            pending.append((page_number, future, True))
+
+        if len(pending) >= in_flight:
+            drain_one()
+
+    while pending:
+        drain_one()
+
+    if broken:
+        _reset_executor()
+
+    return results
@@ -1,34 +1,80 @@
-from pdf2image import convert_from_bytes, convert_from_path
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_path
 from PIL import Image
-from typing import List
+from typing import Container, Iterator, List, Optional
+import numpy as np
 import os
+import time
+from app.observability import metrics
+
+# Rasterization resolution for PDF pages
+PDF_DPI = int(os.environ.get("PDF_DPI", "200"))
+
+# Number of pages rendered per pdftoppm call
+PDF_PAGE_WINDOW = int(os.environ.get("PDF_PAGE_WINDOW", "1"))
 
 def pdf_to_images(pdf_bytes: bytes) -> List[Image.Image]:
     return convert_from_bytes(pdf_bytes)
 
-def convert_pdf_to_images(pdf_path: str, output_folder: str = "/tmp") -> list:
+def count_pdf_pages(pdf_path: str) -> int:
     """
-    Convert a PDF file into images, one image per page.
+    Return the number of pages in a PDF file without rendering it.
 
     Args:
         pdf_path (str): Path to the PDF file.
-        output_folder (str): Folder to save the output images.
 
     Returns:
-        list: List of file paths to the generated images.
+        int: Number of pages.
     """
-    images = convert_from_path(pdf_path)
-    image_paths = []
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def iter_pdf_pages(
+    pdf_path: str,
+    dpi: int = PDF_DPI,
+    window: int = PDF_PAGE_WINDOW,
+    skip_pages: Container[int] = (),
+) -> Iterator[Optional[np.ndarray]]:
+    """
+    Rasterize a PDF lazily, a few pages at a time, as grayscale arrays.
+
+    Only `window` pages are held in memory at once, so peak memory does not
+    grow with the page count and no intermediate image files are written.
 
-    for i, image in enumerate(images):
-        image_path = os.path.join(output_folder, f"page_{i + 1}.png")
-        image.save(image_path, "PNG")
-        image_paths.append(image_path)
+    Args:
+        pdf_path (str): Path to the PDF file.
+        dpi (int): Rendering resolution.
+        window (int): Number of pages rendered per call.
+        skip_pages (Container[int]): 1-based page numbers that are not rendered.
+
+    Yields:
+        np.ndarray: One 2-D uint8 array per page, in page order, or None for a skipped page.
+    """
+    page_count = count_pdf_pages(pdf_path)
+    window = max(1, window)
+    for first_page in range(1, page_count + 1, window):
+        last_page = min(first_page + window - 1, page_count)
+        wanted = [p for p in range(first_page, last_page + 1) if p not in skip_pages]
+        if not wanted:
+            for _ in range(first_page, last_page + 1):
+                yield None
+            continue
 
-    return image_paths
+        start = time.perf_counter()
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=wanted[0], last_page=wanted[-1], grayscale=True)
+        # One observation per rendered page
+        for _ in images:
+            metrics.observe("rasterize", (time.perf_counter() - start) / len(images))
+        rendered = dict(zip(range(wanted[0], wanted[-1] + 1), images))
+        for page_number in range(first_page, last_page + 1):
+            image = rendered.get(page_number)
+            if image is None or page_number in skip_pages:
+                yield None
+            else:
+                yield np.asarray(image)
+        for image in images:
+            image.close()
 
 # Example usage
 if __name__ == "__main__":
     pdf_path = "/home/intern1/files/sample.pdf"
-    image_paths = convert_pdf_to_images(pdf_path)
-    print("Generated Images:", image_paths)
\ No newline at end of file
+    for page_number, image in enumerate(iter_pdf_pages(pdf_path), start=1):
+        print(f"Page {page_number}: {image.shape}")
\ No newline at end of file
@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+from typing import Callable, List, Optional
+
+from PIL import Image
+
+from app.ocr.layout import FIGURE, HANDWRITTEN, PRINTED, decode_crop
+from app.ocr.script_detection import text_script
+
+# Regions per TrOCR / Donut generate call
+TROCR_BATCH_SIZE = int(os.environ.get("TROCR_BATCH_SIZE", "16"))
+DONUT_BATCH_SIZE = int(os.environ.get("DONUT_BATCH_SIZE", "4"))
+
+# Source type recorded on the words of each region type, used for search filters
+SOURCE_TYPES = {PRINTED: "ocr", HANDWRITTEN: "handwriting", FIGURE: "chart"}
+
+
+def _run_batched(regions: List[dict], recognize: Callable[[List[Image.Image]], list], batch_size: int):
+    """
+    Run a region model over the regions' crops. `recognize` returns a text, or a (text, confidence) pair, per image.
+    """
+    for start in range(0, len(regions), batch_size):
+        batch = regions[start:start + batch_size]
+        images = [Image.fromarray(decode_crop(region["image"])).convert("RGB") for region in batch]
+        for region, output in zip(batch, recognize(images)):
+            text, confidence = output if isinstance(output, tuple) else (output, None)
+            region["model_text"] = text.strip()
+            region["model_confidence"] = confidence
+
+
+def _use_model_text(region: dict, text: str, confidence: Optional[float]) -> bool:
+    """
+    Whether a region model's output should replace the region's Tesseract words.
+
+    The Tesseract text is kept when the model returned nothing, read the
+    region in another script than Tesseract did (TrOCR and Donut only
+    produce Latin text), or is less confident than Tesseract was.
+    """
+    if not text:
+        return False
+    tesseract_text = " ".join(box["text"] for box in region["words"])
+    tesseract_script = text_script(tesseract_text)
+    if tesseract_script is not None and text_script(text) != tesseract_script:
+        return False
+    if confidence is not None and region.get("confidence") is not None and confidence < region["confidence"]:
+        return False
+    return True
+
+
+def _rebuild_page(page: dict):
+    """
+    Rebuild a page's text and word boxes from its regions in reading order.
+
+    Words produced by TrOCR or Donut have no boxes of their own, so each gets
+    the box of its region; this keeps text and boxes aligned for the chunker.
+    Every word box is tagged with the region's source type.
+    """
+    words = []
+    boxes = []
+    for region in page["regions"]:
+        text = region.pop("model_text", "")
+        confidence = region.pop("model_confidence", None)
+        region.pop("image", None)
+        if _use_model_text(region, text, confidence):
+            region["engine"] = "trocr" if region["type"] == HANDWRITTEN else "donut"
+            region_words = [dict(region["bbox"], text=word) for word in text.split()]
+        else:
+            region["engine"] = "tesseract"
+            region_words = region["words"]
+        source = SOURCE_TYPES[region["type"]]
+        words.extend(box["text"] for box in region_words)
+        boxes.extend(dict(box, source=source) for box in region_words)
+    page["extracted_text"] = " ".join(words)
+    page["bounding_boxes"] = boxes
+
+
+def route_regions(pages: List[dict]) -> float:
+    """
+    Recognize the handwritten and figure regions of a whole document and merge them back in.
+
+    Regions of the same type from all pages are batched into padded
+    generate calls (TrOCR for handwriting, Donut for figures). A region keeps
+    its Tesseract text when its model fails or when the output is not
+    trusted (see `_use_model_text`).
+    Pages are updated in place; pages without regions are left alone.
+
+    Args:
+        pages (List[dict]): Page results from `process_image`.
+
+    Returns:
+        float: Seconds spent in the region models.
+    """
+    start = time.perf_counter()
+    pages = [page for page in pages if page.get("regions")]
+    regions = [region for page in pages for region in page["regions"] if "image" in region]
+    handwritten = [region for region in regions if region["type"] == HANDWRITTEN]
+    figures = [region for region in regions if region["type"] == FIGURE]
+
+    if handwritten:
+        from app.ocr.english_handwritten import trocr_recognize_batch
+        try:
+            _run_batched(handwritten, trocr_recognize_batch, TROCR_BATCH_SIZE)
+        except Exception as e:
+            logging.error(f"TrOCR failed, keeping Tesseract text for {len(handwritten)} handwritten regions: {e}")
+    if figures:
+        from app.charts.chart_extractor import extract_visual_text_batch
+        try:
+            _run_batched(figures, extract_visual_text_batch, DONUT_BATCH_SIZE)
+        except Exception as e:
+            logging.error(f"Donut failed, keeping Tesseract text for {len(figures)} figures: {e}")
+
+    for page in pages:
+        _rebuild_page(page)
+    return time.perf_counter() - start
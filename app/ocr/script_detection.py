@@ -0,0 +1,80 @@
+import os
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.ocr.tesseract_engine import get_engine
+
+# Language used when the script cannot be detected reliably
+COMBINED_LANG = "eng+mal"
+
+# Tesseract OSD script name -> single-language model
+SCRIPT_LANGS = {
+    "Latin": "eng",
+    "Malayalam": "mal",
+}
+
+# Minimum OSD script confidence for routing a page to a single-language model
+SCRIPT_MIN_CONF = float(os.environ.get("SCRIPT_MIN_CONF", "2.0"))
+
+# Pages are downscaled to at most this many pixels on their longer side for detection
+SCRIPT_DETECT_MAX_SIDE = int(os.environ.get("SCRIPT_DETECT_MAX_SIDE", "1200"))
+
+# Mean word confidence below which a single-language result is redone with the combined model
+ROUTE_MIN_WORD_CONF = float(os.environ.get("ROUTE_MIN_WORD_CONF", "50"))
+
+
+def detect_script(image: np.ndarray) -> Optional[dict]:
+    """
+    Run Tesseract orientation and script detection on a low-resolution copy of a page.
+
+    Args:
+        image (np.ndarray): Grayscale or binary page image.
+
+    Returns:
+        dict: "script", "script_conf" and "orientation", or None when the page
+        has too little text to decide.
+    """
+    height, width = image.shape[:2]
+    scale = SCRIPT_DETECT_MAX_SIDE / float(max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    return get_engine().detect_script(image)
+
+
+def route_language(image: np.ndarray) -> dict:
+    """
+    Choose the Tesseract language model for a page.
+
+    Pages whose script is detected with enough confidence go to the
+    English-only or Malayalam-only model; everything else (mixed or unknown
+    script, too little text) goes to the combined model.
+
+    Returns:
+        dict: The chosen "lang" plus the detected "script", "script_conf" and "orientation" (None when unknown).
+    """
+    detection = detect_script(image) or {"script": None, "script_conf": None, "orientation": None}
+    lang = COMBINED_LANG
+    if detection["script"] in SCRIPT_LANGS and detection["script_conf"] >= SCRIPT_MIN_CONF:
+        lang = SCRIPT_LANGS[detection["script"]]
+    return dict(detection, lang=lang)
+
+
+def text_script(text: str) -> Optional[str]:
+    """
+    Return the script most of the letters of a text are written in ("Latin" or "Malayalam"), or None without letters.
+    """
+    latin = sum(1 for char in text if char.isalpha() and char < "\u0250")
+    malayalam = sum(1 for char in text if "\u0d00" <= char <= "\u0d7f")
+    if not latin and not malayalam:
+        return None
+    return "Malayalam" if malayalam > latin else "Latin"
+
+
+def mean_word_confidence(data: dict) -> float:
+    """
+    Mean Tesseract confidence of the recognized words in image_to_data output (0 when there are none).
+    """
+    confidences = [float(conf) for conf, text in zip(data["conf"], data["text"]) if text.strip() and float(conf) >= 0]
+    return sum(confidences) / len(confidences) if confidences else 0.0
@@ -0,0 +1,136 @@
+import os
+import threading
+from typing import Optional, Union
+
+import numpy as np
+import pytesseract
+from PIL import Image
+from pytesseract import Output
+
+# "auto" uses the in-process tesserocr binding when installed, "subprocess" always runs the tesseract CLI
+TESSERACT_ENGINE = os.environ.get("TESSERACT_ENGINE", "auto")
+
+# Columns of Tesseract's TSV output, as returned by pytesseract.image_to_data
+TSV_COLUMNS = ["level", "page_num", "block_num", "par_num", "line_num", "word_num", "left", "top", "width", "height", "conf", "text"]
+
+
+class SubprocessEngine:
+    """
+    Runs the tesseract command line once per call through pytesseract.
+    """
+
+    name = "subprocess"
+
+    def image_to_data(self, image: Union[np.ndarray, Image.Image], lang: str, user_words: Optional[str] = None) -> dict:
+        config = f"--user-words {user_words}" if user_words else ""
+        return pytesseract.image_to_data(image, lang=lang, config=config, output_type=Output.DICT)
+
+    def image_to_string(self, image: Union[np.ndarray, Image.Image], lang: str) -> str:
+        return pytesseract.image_to_string(image, lang=lang)
+
+    def detect_script(self, image: Union[np.ndarray, Image.Image]) -> Optional[dict]:
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=Output.DICT)
+        except pytesseract.TesseractError:
+            # Raised when the page has too few characters to decide
+            return None
+        return {"script": osd["script"], "script_conf": float(osd["script_conf"]), "orientation": int(osd["orientation"])}
+
+
+class TesserocrEngine:
+    """
+    Keeps long-lived Tesseract instances through the tesserocr binding.
+
+    Each thread gets its own instance per language/user-words combination,
+    so the traineddata is loaded once instead of once per page and images
+    are handed over as in-memory buffers rather than temporary files. The
+    output of `image_to_data` matches pytesseract's Output.DICT.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+
+    def _api(self, lang: str, user_words: Optional[str] = None):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        key = (lang, user_words)
+        api = apis.get(key)
+        if api is None:
+            variables = {"user_words_file": user_words} if user_words else {}
+            api = self._tesserocr.PyTessBaseAPI(lang=lang, variables=variables)
+            apis[key] = api
+        return api
+
+    @staticmethod
+    def _set_image(api, image: Union[np.ndarray, Image.Image]):
+        if isinstance(image, np.ndarray) and image.ndim == 2 and image.dtype == np.uint8:
+            image = np.ascontiguousarray(image)
+            height, width = image.shape
+            api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        else:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            api.SetImage(image)
+
+    def image_to_data(self, image: Union[np.ndarray, Image.Image], lang: str, user_words: Optional[str] = None) -> dict:
+        api = self._api(lang, user_words)
+        self._set_image(api, image)
+        api.Recognize()
+        data = {column: [] for column in TSV_COLUMNS}
+        for line in api.GetTSVText(0).splitlines():
+            fields = line.split("\t")
+            if len(fields) < len(TSV_COLUMNS) - 1:
+                continue
+            if len(fields) == len(TSV_COLUMNS) - 1:
+                fields.append("")
+            for column, value in zip(TSV_COLUMNS, fields):
+                if column == "text":
+                    data[column].append(value)
+                elif column == "conf":
+                    data[column].append(float(value))
+                else:
+                    data[column].append(int(value))
+        return data
+
+    def image_to_string(self, image: Union[np.ndarray, Image.Image], lang: str) -> str:
+        api = self._api(lang)
+        self._set_image(api, image)
+        return api.GetUTF8Text()
+
+    def detect_script(self, image: Union[np.ndarray, Image.Image]) -> Optional[dict]:
+        api = getattr(self._local, "osd_api", None)
+        if api is None:
+            api = self._local.osd_api = self._tesserocr.PyTessBaseAPI(lang="osd", psm=self._tesserocr.PSM.OSD_ONLY)
+        self._set_image(api, image)
+        osd = api.DetectOrientationScript()
+        if not osd:
+            return None
+        return {"script": osd["script_name"], "script_conf": float(osd["script_conf"]), "orientation": int(osd["orient_deg"])}
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Return the process-wide OCR engine, preferring tesserocr when it is available.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = None
+                if TESSERACT_ENGINE != "subprocess":
+                    try:
+                        engine = TesserocrEngine()
+                    except ImportError:
+                        if TESSERACT_ENGINE == "tesserocr":
+                            raise
+                _engine = engine or SubprocessEngine()
+    return _engine
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from app.embeddings.embedding_cache import normalize_text
+
+# Maximum number of cached answers
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "1000"))
+
+# Seconds after which a cached answer is recomputed (0 keeps answers until evicted)
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+
+# Minimum cosine similarity for a paraphrased query to reuse an answer (above 1 disables the semantic tier)
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Nearest past queries checked for one in the same scope
+SEMANTIC_NEIGHBOURS = 8
+
+
+class _Entry:
+    __slots__ = ("id", "key", "scope", "response", "created")
+
+    def __init__(self, entry_id: int, key: str, scope: str, response: dict, created: float):
+        self.id = entry_id
+        self.key = key
+        self.scope = scope
+        self.response = response
+        self.created = created
+
+
+class AnswerCache:
+    """
+    Cache of RAG responses in front of retrieval and generation.
+
+    Lookups first try the normalized query text (exact tier), then the
+    nearest past query embedding in a small inner-product FAISS index
+    (semantic tier) when its cosine similarity reaches `similarity`.
+    Every entry belongs to the vector store version it was computed
+    against; a lookup or insert with a newer version drops all entries,
+    and answers computed against an older version are not stored.
+    Entries are evicted least-recently-used beyond `max_entries` and
+    expire after `ttl` seconds. A scope (e.g. the search filters) keeps
+    answers to the same question over different subsets apart.
+    """
+
+    def __init__(self, dimension: int, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL, similarity: float = ANSWER_CACHE_SIMILARITY):
+        """
+        Args:
+            dimension (int): Dimension of the query embeddings.
+            max_entries (int): Maximum number of cached answers.
+            ttl (float): Seconds an answer stays valid (0 disables expiry).
+            similarity (float): Minimum cosine similarity for a semantic hit.
+        """
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.version = None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_id = {}
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _check_version(self, version: int) -> bool:
+        """
+        Drop every entry when the vector store has moved on. Returns False for an outdated `version`.
+        """
+        if self.version is not None and version < self.version:
+            return False
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._by_id.clear()
+            self._index.reset()
+            self.version = version
+        return True
+
+    def _remove(self, entry: _Entry):
+        del self._entries[entry.key]
+        del self._by_id[entry.id]
+        self._index.remove_ids(np.array([entry.id], dtype="int64"))
+
+    def _expired(self, entry: _Entry) -> bool:
+        return bool(self.ttl) and time.monotonic() - entry.created > self.ttl
+
+    def _nearest(self, embedding, scope: str) -> Optional[_Entry]:
+        if self.similarity > 1 or self._index.ntotal == 0:
+            return None
+        scores, ids = self._index.search(self._unit(embedding), min(SEMANTIC_NEIGHBOURS, self._index.ntotal))
+        for score, entry_id in zip(scores[0], ids[0]):
+            if entry_id < 0 or score < self.similarity:
+                break
+            entry = self._by_id.get(int(entry_id))
+            if entry is not None and entry.scope == scope:
+                return entry
+        return None
+
+    def get(self, query: str, embedding, version: int, scope: str = "") -> Optional[dict]:
+        """
+        Return the cached response for a query, or None.
+
+        Args:
+            query (str): The user query.
+            embedding: The query embedding.
+            version (int): Current version of the vector store.
+            scope (str): Only entries stored with the same scope can match.
+
+        Returns:
+            dict: A copy of the cached response with "cache" set to "exact" or "semantic".
+        """
+        with self._lock:
+            if not self._check_version(version):
+                self.misses += 1
+                return None
+            entry = self._entries.get(f"{scope}\0{normalize_text(query)}")
+            tier = "exact"
+            if entry is None:
+                entry = self._nearest(embedding, scope)
+                tier = "semantic"
+            if entry is not None and self._expired(entry):
+                self._remove(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            if tier == "exact":
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+            return dict(entry.response, query=query, cache=tier)
+
+    def put(self, query: str, embedding, version: int, response: dict, scope: str = ""):
+        """
+        Cache the response to a query computed against vector store `version`.
+        """
+        with self._lock:
+            if not self._check_version(version):
+                return
+            key = f"{scope}\0{normalize_text(query)}"
+            if key in self._entries:
+                self._remove(self._entries[key])
+            entry = _Entry(self._next_id, key, scope, response, time.monotonic())
+            self._next_id += 1
+            self._entries[key] = entry
+            self._by_id[entry.id] = entry
+            self._index.add_with_ids(self._unit(embedding), np.array([entry.id], dtype="int64"))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries.values())))
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters per tier.
+        """
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "version": self.version,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls.
+
+    Callers block in `submit` while a background thread collects the items
+    that arrive within `max_wait_ms` of the first one (up to
+    `max_batch_size`), runs `process_batch` once on all of them, and hands
+    each caller its own result. If the batched call raises, its items are
+    retried one by one, so a bad item fails only its own caller.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        """
+        Args:
+            process_batch (Callable): Function mapping a list of items to a list of
+                results in the same order. A result that is an Exception is raised
+                to its caller only.
+            max_batch_size (int): Maximum number of items per batch.
+            max_wait_ms (float): How long to wait for more items after the first one arrives.
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result.
+
+        Args:
+            item: The item to process.
+
+        Returns:
+            The result produced for this item.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch: list):
+        items = [item for item, _ in batch]
+        try:
+            results = self.process_batch(items)
+        except Exception as e:
+            if len(batch) > 1:
+                logging.warning(f"Batch of {len(items)} items failed ({e}); retrying them one by one.")
+                for entry in batch:
+                    self._process([entry])
+                return
+            logging.error(f"Batch item failed: {e}")
+            results = [e]
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _run(self):
+        while True:
+            self._process(self._collect())
@@ -1,39 +1,227 @@
-from transformers import pipeline
 import logging
-from typing import List
+import os
+import queue
+import re
+import threading
+from typing import Iterator, List, Optional
+from app.models.backends import load_model, model_backend
+from app.models.registry import registry
+from app.observability import metrics
 
-logging.basicConfig(level=logging.DEBUG)
+# Tokens kept free for the prompt template and the question when packing contexts
+QUESTION_RESERVE_TOKENS = int(os.environ.get("QUESTION_RESERVE_TOKENS", "64"))
+
+# Tokens generated per answer
+MAX_NEW_TOKENS = int(os.environ.get("MAX_NEW_TOKENS", "256"))
+
+# Seconds a streamed answer may wait for its next token before giving up
+STREAM_TIMEOUT = float(os.environ.get("STREAM_TIMEOUT", "120"))
+
+# Overlapping chunks sharing at least this many boundary words are merged
+MIN_OVERLAP_WORDS = 3
+
+PROMPT_TEMPLATE = "Context: {context}\n\nQuestion: {query}\nAnswer:"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+def _overlap(left: List[str], right: List[str]) -> int:
+    """
+    Return the number of words at the end of `left` that repeat at the start of `right`.
+    """
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_WORDS - 1, -1):
+        if left[-size:] == right[:size]:
+            return size
+    return 0
+
+def _load_generator(model_name: str, backend: str = "eager"):
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    if backend == "eager":
+        return pipeline("text2text-generation", model=model_name, device=-1)
+    model = load_model(model_name, backend, AutoModelForSeq2SeqLM.from_pretrained, "ORTModelForSeq2SeqLM")
+    return pipeline("text2text-generation", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
 
 class RAGAgent:
-    def __init__(self, model_name="google/flan-t5-base"):
-        self.generator = pipeline("text2text-generation", model=model_name, device=-1)
-        self.max_length = 512  # Maximum sequence length supported by the model
+    def __init__(self, model_name="google/flan-t5-base", registry_name="generator", backend: Optional[str] = None):
+        # The pipeline is loaded on first use and shared through the model registry
+        self.registry_name = registry_name
+        self.backend = backend or model_backend(registry_name)
+        registry.register(registry_name, lambda: _load_generator(model_name, self.backend))
+        self.max_length = 512  # Maximum number of input tokens supported by the model
+
+    @property
+    def generator(self):
+        return registry.get(self.registry_name)
+
+    @property
+    def tokenizer(self):
+        return self.generator.tokenizer
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the model tokens of each text, without special tokens.
+        """
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
 
-    def truncate_context(self, context: str) -> str:
+    def truncate_context(self, context: str, max_tokens: Optional[int] = None) -> str:
         """
-        Truncate the context to fit within the model's maximum sequence length.
+        Truncate the context to at most `max_tokens` model tokens, at a sentence boundary where possible.
 
         Args:
             context (str): The input context string.
+            max_tokens (int, optional): Token budget. Defaults to the model's maximum input length.
 
         Returns:
             str: The truncated context.
         """
-        tokens = context.split()
-        if len(tokens) > self.max_length:
-            return " ".join(tokens[:self.max_length])
-        return context
-
-    def answer(self, query: str, retrieved_contexts: List[str]) -> str:
-        context = "\n".join(retrieved_contexts)
-        truncated_context = self.truncate_context(context)
-        logging.debug(f"Truncated context: {truncated_context}")
-        prompt = f"Context: {truncated_context}\n\nQuestion: {query}\nAnswer:"
-        logging.debug(f"Generated prompt: {prompt}")
-        result = self.generator(prompt, max_new_tokens=256)
-        logging.debug(f"Generation result: {result}")
+        max_tokens = self.max_length if max_tokens is None else max_tokens
+        if self.count_tokens([context])[0] <= max_tokens:
+            return context
+        sentences = [s for s in _SENTENCE_END.split(context) if s.strip()]
+        kept = []
+        used = 0
+        for sentence, tokens in zip(sentences, self.count_tokens(sentences)):
+            if used + tokens + 1 > max_tokens:
+                break
+            kept.append(sentence)
+            used += tokens + 1
+        if kept:
+            return " ".join(kept)
+        # Not even the first sentence fits: cut it at the token limit
+        ids = self.tokenizer(context, add_special_tokens=False)["input_ids"][:max_tokens]
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+    def context_budget(self, query: str) -> int:
+        """
+        Return the number of tokens left for contexts once the question and template are in.
+        """
+        template_tokens = self.count_tokens([PROMPT_TEMPLATE.format(context="", query=query)])[0]
+        # One token for the end-of-sequence marker
+        return max(0, self.max_length - max(template_tokens, QUESTION_RESERVE_TOKENS) - 1)
+
+    def pack_context(self, query: str, retrieved_contexts: List[str], scores: Optional[List[float]] = None) -> List[str]:
+        """
+        Pick the contexts that go into the prompt.
+
+        Contexts are taken best-first into the token budget left by the
+        question. Duplicates are dropped, the words a context shares with
+        an already packed neighbouring chunk are removed, and a context that
+        does not fit whole is trimmed at a sentence boundary.
+
+        Args:
+            query (str): The user query.
+            retrieved_contexts (List[str]): The retrieved context texts.
+            scores (List[float], optional): Relevance of each context, higher is better.
+                Defaults to the retrieval order.
+
+        Returns:
+            List[str]: The packed contexts, best first.
+        """
+        order = range(len(retrieved_contexts))
+        if scores is not None:
+            order = sorted(order, key=lambda i: scores[i], reverse=True)
+
+        candidates: List[List[str]] = []
+        for i in order:
+            words = retrieved_contexts[i].split()
+            for kept in candidates:
+                if not words:
+                    break
+                if f" {' '.join(words)} " in f" {' '.join(kept)} ":
+                    words = []
+                    break
+                words = words[_overlap(kept, words):]
+                if words:
+                    cut = _overlap(words, kept)
+                    words = words[:len(words) - cut]
+            if words:
+                candidates.append(words)
+
+        budget = self.context_budget(query)
+        texts = [" ".join(words) for words in candidates]
+        selected = []
+        for text, tokens in zip(texts, self.count_tokens(texts)):
+            # Contexts are joined with a newline, which costs about one token
+            if budget <= 1:
+                break
+            if tokens + 1 > budget:
+                text = self.truncate_context(text, budget - 1)
+                tokens = self.count_tokens([text])[0]
+                if not text.strip() or tokens + 1 > budget:
+                    continue
+            selected.append(text)
+            budget -= tokens + 1
+        return selected
+
+    def build_prompt(self, query: str, retrieved_contexts: List[str], scores: Optional[List[float]] = None) -> str:
+        packed = self.pack_context(query, retrieved_contexts, scores)
+        logging.debug(f"Packed {len(packed)} of {len(retrieved_contexts)} contexts.")
+        return PROMPT_TEMPLATE.format(context="\n".join(packed), query=query)
+
+    def answer(self, query: str, retrieved_contexts: List[str], scores: Optional[List[float]] = None) -> str:
+        prompt = self.build_prompt(query, retrieved_contexts, scores)
+        with metrics.timed("generate"):
+            result = self.generator(prompt, max_new_tokens=MAX_NEW_TOKENS)
         return result[0]["generated_text"]
 
+    def answer_stream(self, query: str, retrieved_contexts: List[str], scores: Optional[List[float]] = None) -> Iterator[str]:
+        """
+        Generate an answer and yield its text piece by piece as tokens are produced.
+        """
+        from transformers import TextIteratorStreamer
+
+        prompt = self.build_prompt(query, retrieved_contexts, scores)
+        model = self.generator.model
+        tokenizer = self.tokenizer
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=self.max_length)
+        # skip_prompt drops the decoder start token, which the streamer receives first
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=STREAM_TIMEOUT)
+        errors = []
+
+        def generate():
+            try:
+                model.generate(**inputs, max_new_tokens=MAX_NEW_TOKENS, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # Without the end signal the consumer would wait for tokens that never come
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        with metrics.timed("generate"):
+            thread.start()
+            try:
+                for text in streamer:
+                    if text:
+                        yield text
+            except queue.Empty:
+                raise TimeoutError(f"No token was generated within {STREAM_TIMEOUT:g} seconds.") from None
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def answer_batch(self, queries: List[str], retrieved_contexts: List[List[str]], scores: Optional[List[List[float]]] = None) -> List[str]:
+        """
+        Answer several queries with batched generation calls.
+
+        Args:
+            queries (List[str]): The user queries.
+            retrieved_contexts (List[List[str]]): The retrieved contexts of each query.
+            scores (List[List[float]], optional): Relevance of each context, higher is better.
+
+        Returns:
+            List[str]: One answer per query, in order.
+        """
+        if not queries:
+            return []
+        scores = scores or [None] * len(queries)
+        prompts = [self.build_prompt(q, c, s) for q, c, s in zip(queries, retrieved_contexts, scores)]
+        with metrics.timed("generate"):
+            results = self.generator(prompts, max_new_tokens=MAX_NEW_TOKENS, batch_size=len(prompts))
+        # The pipeline returns one dict per prompt, or a one-element list per prompt
+        return [(r[0] if isinstance(r, list) else r)["generated_text"] for r in results]
+
 if __name__ == "__main__":
     agent = RAGAgent()
     query = "What is the capital of France?"
@@ -1,56 +1,192 @@
-import streamlit as st
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
 import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Define the API endpoints and API key
-process_url = "http://127.0.0.1:8001/process-document/"
-query_url = "http://127.0.0.1:8001/query-rag/"
-api_key = "new_secret_key"
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:8001")
+process_url = f"{API_URL}/process-document/"
+query_url = f"{API_URL}/query-rag/"
+jobs_url = f"{API_URL}/jobs"
+api_key = os.environ.get("API_KEY", "new_secret_key")
+
+# Seconds between ingestion status polls while a document is being processed
+POLL_SECONDS = 2
+
+# Seconds to wait for an upload to be accepted and for an answer
+UPLOAD_TIMEOUT = 120
+QUERY_TIMEOUT = 120
+
+# Recent answers kept per browser session, and how long they stay valid
+QUERY_CACHE_SIZE = 50
+QUERY_CACHE_TTL = 300
+
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Return the HTTP session shared by every rerun and browser session, so connections to the API are reused.
+    """
+    session = requests.Session()
+    # Retry only idempotent status polls; uploads and queries are sent once
+    retries = Retry(total=3, backoff_factor=0.5, allowed_methods=["GET"], status_forcelist=[502, 503, 504])
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries))
+    session.headers["x-api-key"] = api_key
+    return session
+
+
+# Uploaded documents by content hash, and recent answers by normalized query
+if "documents" not in st.session_state:
+    st.session_state.documents = {}
+if "answers" not in st.session_state:
+    st.session_state.answers = OrderedDict()
+
+
+def upload_once(uploaded_file):
+    """
+    Send a file to /process-document/ unless this session already sent the same content.
+    """
+    content = uploaded_file.getvalue()
+    content_hash = hashlib.sha256(content).hexdigest()
+    if content_hash in st.session_state.documents:
+        return
+    document = {"filename": uploaded_file.name, "job_id": None, "status": None, "pages_done": 0, "pages_total": None, "error": None}
+    try:
+        response = get_session().post(process_url, files={"file": (uploaded_file.name, content, uploaded_file.type)}, timeout=UPLOAD_TIMEOUT)
+    except requests.RequestException as e:
+        # Not retried: a timed-out upload may still have been queued by the API
+        document.update(status="failed", error=str(e))
+        st.session_state.documents[content_hash] = document
+        return
+    if response.status_code in (200, 202):
+        document.update(job_id=response.json()["job_id"], status="queued")
+    else:
+        document.update(status="failed", error=f"{response.status_code} - {response.text}")
+    st.session_state.documents[content_hash] = document
+
+
+def poll_jobs() -> bool:
+    """
+    Refresh the status of unfinished ingestion jobs. Returns True when one of them finished.
+    """
+    finished = False
+    for document in st.session_state.documents.values():
+        if document["status"] in FINISHED_STATES or document["job_id"] is None:
+            continue
+        try:
+            response = get_session().get(f"{jobs_url}/{document['job_id']}", timeout=10)
+        except requests.RequestException as e:
+            document["error"] = str(e)
+            continue
+        if response.status_code == 404:
+            # The API no longer knows the job, e.g. after its jobs directory was cleared
+            document.update(status="failed", error="The ingestion job was not found.")
+            continue
+        if response.status_code != 200:
+            document["error"] = f"{response.status_code} - {response.text}"
+            continue
+        job = response.json()
+        document.update(status=job["status"], pages_done=job["pages_done"], pages_total=job["pages_total"], error=job["error"])
+        finished = finished or job["status"] == "completed"
+    return finished
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def ingestion_status():
+    """
+    Show the progress of each uploaded document. Reruns on its own, without reloading the page.
+    """
+    if poll_jobs():
+        # Newly indexed documents can change the answers
+        st.session_state.answers.clear()
+    for document in st.session_state.documents.values():
+        name = document["filename"]
+        if document["status"] == "completed":
+            st.success(f"{name}: ready for questions.")
+        elif document["status"] in ("failed", "cancelled"):
+            st.error(f"{name}: {document['status']}. {document['error'] or ''}")
+        elif document["pages_total"]:
+            st.progress(document["pages_done"] / document["pages_total"], text=f"{name}: {document['pages_done']} of {document['pages_total']} pages processed")
+        else:
+            st.info(f"{name}: {document['status'] or 'uploading'}...")
+
+
+def ask(query: str) -> dict:
+    """
+    Query /query-rag/, answering repeated questions from the session's recent results.
+
+    Returns:
+        dict: {"status_code" (None if the API could not be reached), "result" or "error", "cached"}.
+    """
+    key = " ".join(query.lower().split())
+    answers = st.session_state.answers
+    cached = answers.get(key)
+    if cached is not None and time.monotonic() - cached["time"] < QUERY_CACHE_TTL:
+        answers.move_to_end(key)
+        return dict(cached["response"], cached=True)
+
+    try:
+        response = get_session().post(query_url, json={"query": query}, timeout=QUERY_TIMEOUT)
+    except requests.RequestException as e:
+        return {"status_code": None, "error": str(e), "cached": False}
+    if response.status_code != 200:
+        return {"status_code": response.status_code, "error": response.text, "cached": False}
+    result = {"status_code": 200, "result": response.json(), "cached": False}
+    answers[key] = {"response": result, "time": time.monotonic()}
+    while len(answers) > QUERY_CACHE_SIZE:
+        answers.popitem(last=False)
+    return result
+
 
 st.title("Document Chat Interface")
 
-# File uploader for document processing
+# File uploader for document processing; each file is sent once per session, not on every rerun
 uploaded_file = st.file_uploader("Upload a document (PDF, PNG, JPG):")
 if uploaded_file:
-    with st.spinner("Processing document..."):
-        files = {"file": uploaded_file}
-        headers = {"x-api-key": api_key}
-        response = requests.post(process_url, headers=headers, files=files)
-
-        if response.status_code == 200:
-            st.success("Document processed successfully!")
-            st.write("You can now ask questions about the document.")
-        else:
-            st.error(f"Error: {response.status_code} - {response.text}")
+    upload_once(uploaded_file)
+if st.session_state.documents:
+    ingestion_status()
 
 # Input for user query
-query = st.text_input("Ask a question about your document:")
+with st.form("query_form"):
+    query = st.text_input("Ask a question about your document:")
+    submitted = st.form_submit_button("Submit Query")
 
-if st.button("Submit Query"):
+if submitted:
     if query:
         with st.spinner("Fetching answer..."):
-            # Send the POST request to the /query-rag/ endpoint
-            headers = {"x-api-key": api_key, "Content-Type": "application/json"}
-            data = {"query": query}
-            response = requests.post(query_url, headers=headers, json=data)
-
-            # Display the response
-            if response.status_code == 200:
-                result = response.json()
-                st.success("Answer:")
-                st.write(result.get("answer", "No answer found."))
-
-                st.subheader("Retrieved Contexts:")
-                retrieved_contexts = result.get("retrieved_contexts", [])
-                if retrieved_contexts:
-                    for context in retrieved_contexts:
-                        metadata = context.get("metadata", {})
-                        st.write(f"**Text:** {metadata.get('text', 'No text available.')}")
-                        st.write(f"**Filename:** {metadata.get('filename', 'Unknown')}")
-                        st.write(f"**Distance:** {context.get('distance', 'N/A')}")
-                        st.write("---")
-                else:
-                    st.warning("No relevant contexts were retrieved.")
+            response = ask(query)
+
+        # Display the response
+        if response["status_code"] == 200:
+            result = response["result"]
+            st.success("Answer (from recent results):" if response["cached"] else "Answer:")
+            st.write(result.get("answer") or "No answer found.")
+
+            st.subheader("Retrieved Contexts:")
+            retrieved_contexts = result.get("retrieved_contexts", [])
+            if retrieved_contexts:
+                for context in retrieved_contexts:
+                    metadata = context.get("metadata", {})
+                    distance = context.get("distance")
+                    st.write(f"**Text:** {metadata.get('text', 'No text available.')}")
+                    st.write(f"**Filename:** {metadata.get('filename', 'Unknown')}")
+                    # Results found by keyword search alone have no vector distance
+                    st.write(f"**Distance:** {'N/A' if distance is None else f'{distance:.4f}'}")
+                    st.write("---")
             else:
-                st.error(f"Error: {response.status_code} - {response.text}")
+                st.warning("No relevant contexts were retrieved.")
+        elif response["status_code"] is None:
+            st.error(f"Error: the API did not answer. {response['error']}")
+        else:
+            st.error(f"Error: {response['status_code']} - {response['error']}")
     else:
-        st.warning("Please enter a query.")
\ No newline at end of file
+        st.warning("Please enter a query.")
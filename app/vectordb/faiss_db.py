@@ -1,35 +1,731 @@
 import faiss
+import json
+import logging
 import numpy as np
-from typing import List, Tuple
+import os
+import pickle
+import threading
+import time
+from typing import Any, List, Optional, Tuple
 from app.embeddings.embedder import generate_embeddings
+from app.observability import metrics
+from app.vectordb import faiss_index
+from app.vectordb.metadata_store import MetadataStore
+from app.vectordb.sparse_index import SparseIndex, reciprocal_rank_fusion
+
+# File names used inside the persistence directory
+MANIFEST_FILE = "manifest.json"
+LOG_VECTORS_FILE = "log.vectors"
+LOG_METADATA_FILE = "log.jsonl"
+LOG_DELETES_FILE = "log.deletes"
+
+# Retrieval modes of `search_batch`: dense only, BM25 only, both fused with
+# reciprocal-rank fusion, or dense search restricted to the best BM25 candidates
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid", "prefilter")
+
+# Candidates taken from each retriever per requested result before fusion
+HYBRID_CANDIDATE_FACTOR = 4
+
+# Filtered searches matching at most this many vectors are ranked exactly instead of through the index
+FILTER_EXACT_MAX = int(os.environ.get("FILTER_EXACT_MAX", "50000"))
+
+# Fraction of deleted vectors at which a background compaction rebuilds the index
+COMPACT_RATIO = float(os.environ.get("COMPACT_RATIO", "0.2"))
+
+def _resident_memory_mb() -> float:
+    """
+    Return the current resident set size of this process in MiB.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS, but the best that is portable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def fuse_candidates(
+    dense: List[Tuple[Any, float]],
+    sparse: List[Tuple[Any, float]],
+    n_results: int,
+    dense_weight: float = 1.0,
+    sparse_weight: float = 1.0,
+    rrf_k: int = 60,
+) -> List[Tuple[Any, Optional[float], float]]:
+    """
+    Fuse a vector ranking and a BM25 ranking with weighted reciprocal-rank fusion.
+
+    Args:
+        dense (List[Tuple[Any, float]]): (key, distance) pairs, nearest first.
+        sparse (List[Tuple[Any, float]]): (key, BM25 score) pairs, best first.
+        n_results (int): Number of results to keep.
+
+    Returns:
+        List[Tuple[Any, Optional[float], float]]: (key, distance or None, fused score), best first.
+    """
+    distance_of = dict(dense)
+    fused = reciprocal_rank_fusion(
+        [[key for key, _ in dense], [key for key, _ in sparse]],
+        [dense_weight, sparse_weight],
+        k=rrf_k,
+    )[:n_results]
+    return [(key, distance_of.get(key), score) for key, score in fused]
 
 class FAISSVectorDB:
-    def __init__(self, dimension: int):
+    def __init__(
+        self,
+        dimension: int,
+        persist_dir: Optional[str] = None,
+        snapshot_every: int = 10000,
+        mmap: bool = False,
+        index_type: str = "flat",
+        migrate_threshold: Optional[int] = None,
+        nlist: int = 0,
+        hnsw_m: int = 32,
+        pq_m: int = 48,
+        ef_search: int = 64,
+        nprobe: int = 16,
+        retrieval_mode: str = "dense",
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+        rrf_k: int = 60,
+        prefilter_candidates: int = 1000,
+        compact_ratio: float = COMPACT_RATIO,
+        read_only: bool = False,
+        publish_interval: float = 0.0,
+        refresh_interval: float = 1.0,
+    ):
         """
         Initialize a FAISS vector database.
 
+        When `persist_dir` is set, the index is loaded from it and every
+        addition is appended to a write-ahead log there, so the corpus
+        survives restarts. A full snapshot is written every `snapshot_every`
+        added vectors and whenever `save` is called.
+
+        Vectors are kept in an exact flat index until the collection reaches
+        `migrate_threshold` vectors (and enough to train IVF codebooks), then
+        moved to an approximate index of type `index_type`.
+
+        A BM25 inverted index over the chunk texts is kept alongside the
+        vectors for keyword and hybrid retrieval (see `search_batch`).
+
+        Every chunk gets a stable `chunk_id` in its metadata, and chunks
+        belong to a document through their "doc_id". Deleting or replacing a
+        document tombstones its chunks, which are excluded from searches
+        right away and removed from the index by a background compaction
+        once they make up `compact_ratio` of the collection.
+
+        Several processes can share one persistence directory: a single
+        writer publishes a snapshot every `publish_interval` seconds while it
+        has unsaved changes, and `read_only` replicas memory-map the latest
+        snapshot (sharing its pages between processes) and reload it when a
+        newer generation is published, checking at most every
+        `refresh_interval` seconds.
+
         Args:
             dimension (int): The dimensionality of the vectors.
+            persist_dir (str, optional): Directory holding snapshots and the append log.
+            snapshot_every (int): Number of added vectors between automatic snapshots (0 disables them).
+            mmap (bool): Memory-map the snapshot on load instead of reading it into RAM.
+            index_type (str): Target index type: "flat", "hnsw", "ivf_flat" or "ivf_pq".
+            migrate_threshold (int, optional): Collection size at which the flat index is
+                replaced by `index_type`. Defaults to 0 for HNSW and to the training minimum for IVF.
+            nlist (int): Number of IVF cells (0 picks about sqrt(n) at migration time).
+            hnsw_m (int): Number of HNSW neighbours per node.
+            pq_m (int): Number of PQ sub-quantizers; must divide `dimension`.
+            ef_search (int): HNSW search breadth.
+            nprobe (int): Number of IVF cells visited per query.
+            retrieval_mode (str): Default mode of `search_batch`: "dense", "sparse", "hybrid" or "prefilter".
+            dense_weight (float): Weight of the vector ranking in reciprocal-rank fusion.
+            sparse_weight (float): Weight of the BM25 ranking in reciprocal-rank fusion.
+            rrf_k (int): Rank offset of reciprocal-rank fusion.
+            prefilter_candidates (int): Number of BM25 candidates searched by the "prefilter" mode.
+            compact_ratio (float): Fraction of deleted vectors that starts a compaction (0 disables it).
+            read_only (bool): Serve the published snapshot of another process without writing to it.
+            publish_interval (float): Seconds between snapshots of unsaved changes (0 disables it).
+            refresh_interval (float): Minimum seconds between checks for a newer snapshot (read-only only).
         """
+        if index_type not in faiss_index.INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}'. Expected one of {faiss_index.INDEX_TYPES}.")
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'. Expected one of {RETRIEVAL_MODES}.")
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
-        self.metadata = []  # To store metadata corresponding to vectors
+        self.index_type = index_type
+        self.migrate_threshold = migrate_threshold if migrate_threshold is not None else 0
+        self.nlist = nlist
+        self.hnsw_m = hnsw_m
+        self.pq_m = pq_m
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.retrieval_mode = retrieval_mode
+        self.dense_weight = dense_weight
+        self.sparse_weight = sparse_weight
+        self.rrf_k = rrf_k
+        self.prefilter_candidates = prefilter_candidates
+        self.compact_ratio = compact_ratio
+        self.read_only = read_only
+        self.refresh_interval = refresh_interval
+
+        # Start exact, unless an HNSW graph can be built from the first vector
+        if index_type == "hnsw" and self.migrate_threshold == 0:
+            self.active_index_type = "hnsw"
+        else:
+            self.active_index_type = "flat"
+        self.index = faiss_index.build_index(self.active_index_type, dimension, hnsw_m=hnsw_m)
+        self.set_search_params(ef_search, nprobe)
+
+        self.persist_dir = persist_dir
+        self.metadata = MetadataStore(persist_dir, read_only=read_only)  # To store metadata corresponding to vectors
+        self.sparse = SparseIndex()  # BM25 postings of the chunk texts, numbered like the vectors
+        self.snapshot_every = snapshot_every
+        self.mmap = mmap
+        self.generation = 0
+        # Bumped on every change to the indexed vectors, so caches can tell stale results apart
+        self.version = 0
+        self._snapshot_files = []
+        # Files of the generation before the current one, kept for replicas still loading it
+        self._previous_snapshot_files = []
+        self._saved_version = 0
+        self._last_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+        self.load_stats = None
+        self._mapped = False
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self._compaction = None
+
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+            self.load()
+            if publish_interval and not read_only:
+                threading.Thread(target=self._publish_loop, args=(publish_interval,), name="faiss-publisher", daemon=True).start()
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Number of vectors in the index, including deleted ones not yet compacted.
+        """
+        return self.index.ntotal
+
+    def set_search_params(self, ef_search: Optional[int] = None, nprobe: Optional[int] = None):
+        """
+        Set the HNSW efSearch and/or IVF nprobe used by subsequent queries.
+
+        Args:
+            ef_search (int, optional): HNSW search breadth.
+            nprobe (int, optional): Number of IVF cells visited per query.
+        """
+        if ef_search is not None:
+            self.ef_search = ef_search
+        if nprobe is not None:
+            self.nprobe = nprobe
+        faiss_index.set_search_params(self.index, ef_search=self.ef_search, nprobe=self.nprobe)
+
+    def _maybe_migrate(self):
+        """
+        Replace the flat index with the target ANN index once the collection is large enough.
+        """
+        if self.active_index_type == self.index_type:
+            return
+        ntotal = self.index.ntotal
+        nlist = self.nlist or faiss_index.default_nlist(ntotal)
+        required = max(self.migrate_threshold, faiss_index.training_minimum(self.index_type, nlist), 1)
+        if ntotal < required:
+            return
+
+        start = time.perf_counter()
+        vectors = faiss_index.all_vectors(self.index)
+        index = faiss_index.build_index(self.index_type, self.dimension, nlist=nlist, hnsw_m=self.hnsw_m, pq_m=self.pq_m)
+        faiss_index.train_index(index, vectors)
+        index.add(vectors)
+        self.index = index
+        self.active_index_type = self.index_type
+        self._mapped = False
+        self.set_search_params()
+        logging.info(f"Migrated FAISS index to {self.index_type} with {ntotal} vectors in {time.perf_counter() - start:.2f}s.")
+
+        if self.persist_dir:
+            self.save()
+
+    def recall_report(self, queries: List[List[float]], k: int = 10, base_vectors: Optional[np.ndarray] = None) -> List[dict]:
+        """
+        Report recall@k and latency of the current index for a range of search settings.
+
+        Args:
+            queries (List[List[float]]): Query vectors.
+            k (int): Number of neighbours compared.
+            base_vectors (np.ndarray, optional): Exact stored vectors in insertion order.
+                Reconstructed from the index when omitted, which is approximate for IVF-PQ.
+
+        Returns:
+            List[dict]: One row per setting, see `faiss_index.recall_report`.
+        """
+        with self._lock:
+            if base_vectors is None:
+                base_vectors = faiss_index.all_vectors(self.index)
+            try:
+                return faiss_index.recall_report(self.index, base_vectors, np.array(queries, dtype="float32"), k=k)
+            finally:
+                self.set_search_params()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("This vector store is a read-only replica; send changes to the index writer.")
+
+    def _ensure_writable(self):
+        """
+        Load a memory-mapped index into RAM before it is modified.
+
+        The mapped index is the current snapshot file unchanged, so that file
+        is read again without mapping; `faiss.clone_index` cannot copy the
+        on-disk inverted lists of a mapped IVF index.
+        """
+        if self._mapped:
+            self.index = faiss.read_index(self._path(self._snapshot_files[0]))
+            self._mapped = False
+            self.set_search_params()
 
-    def add_embeddings(self, embeddings: List[List[float]], metadatas: List[dict]):
+    def add_embeddings(self, embeddings: List[List[float]], metadatas: List[dict]) -> List[int]:
         """
         Add embeddings and their metadata to the FAISS index.
 
         Args:
             embeddings (List[List[float]]): List of embedding vectors.
             metadatas (List[dict]): List of metadata dictionaries corresponding to each embedding.
+
+        Returns:
+            List[int]: The chunk IDs assigned to the embeddings.
         """
-        print(f"Adding {len(embeddings)} embeddings to FAISS index.")
-        print(f"Embeddings shape: {np.array(embeddings).shape}")
         vectors = np.array(embeddings).astype('float32')
-        self.index.add(vectors)
-        print(f"FAISS index now contains {self.index.ntotal} vectors.")
-        self.metadata.extend(metadatas)
-        print(f"Metadata size: {len(self.metadata)}")
+        with self._lock:
+            self._check_writable()
+            self._ensure_writable()
+            first_id = self.index.ntotal
+            first_chunk_id = self.metadata.next_chunk_id
+            metadatas = [dict(metadata, chunk_id=first_chunk_id + i) for i, metadata in enumerate(metadatas)]
+            self.index.add(vectors)
+            self.metadata.extend(metadatas)
+            self.sparse.extend(metadata.get("text", "") for metadata in metadatas)
+            self.version += 1
+            logging.debug(f"Added {len(vectors)} embeddings; the FAISS index now contains {self.index.ntotal} vectors.")
+
+            if self.persist_dir:
+                self._append_log(vectors, metadatas, first_id)
+                self._unsaved += len(vectors)
+                if self.snapshot_every and self._unsaved >= self.snapshot_every:
+                    self.save()
+
+            self._maybe_migrate()
+            return [metadata["chunk_id"] for metadata in metadatas]
+
+    def has_document(self, doc_id: str) -> bool:
+        """
+        Return True if a document with this ID has chunks in the index.
+        """
+        return len(self.metadata.select({"doc_id": doc_id})) > 0
+
+    def _delete_rows(self, rows: np.ndarray):
+        """
+        Tombstone rows and log the deletion of their chunk IDs.
+        """
+        if not len(rows):
+            return
+        chunk_ids = [self.metadata.chunk_id_col[row] for row in rows]
+        self.metadata.mark_deleted(rows)
+        if self.persist_dir:
+            with open(self._path(LOG_DELETES_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"chunk_ids": chunk_ids}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.version += 1
+
+    def delete_matching(self, filters: dict) -> int:
+        """
+        Delete every chunk matching a filter expression (see `metadata_store.validate_filters`).
+
+        Returns:
+            int: Number of chunks deleted.
+        """
+        with self._lock:
+            self._check_writable()
+            rows = self.metadata.select(filters)
+            self._delete_rows(rows)
+            self._schedule_compaction()
+            return len(rows)
+
+    def delete_document(self, doc_id: str) -> int:
+        """
+        Delete every chunk of a document.
+
+        Returns:
+            int: Number of chunks deleted.
+        """
+        return self.delete_matching({"doc_id": doc_id})
+
+    def upsert_document(self, doc_id: str, embeddings: List[List[float]], metadatas: List[dict], replace_filter: Optional[dict] = None) -> int:
+        """
+        Add a document's chunks, replacing any chunks it had before.
+
+        The old chunks are tombstoned and the new ones appended in one step
+        under the index lock, so searches never see both or neither.
+
+        Args:
+            doc_id (str): ID of the document, stored as "doc_id" on every chunk.
+            embeddings (List[List[float]]): One embedding per chunk.
+            metadatas (List[dict]): One metadata dict per chunk.
+            replace_filter (dict, optional): Also replace the chunks matching this filter,
+                e.g. {"filename": "scan.pdf"} for an earlier scan of the document.
+
+        Returns:
+            int: Number of chunks replaced.
+        """
+        with self._lock:
+            self._check_writable()
+            rows = self.metadata.select({"doc_id": doc_id})
+            if replace_filter:
+                rows = np.union1d(rows, self.metadata.select(replace_filter))
+            self._delete_rows(rows)
+            if len(embeddings):
+                self.add_embeddings(embeddings, [dict(metadata, doc_id=doc_id) for metadata in metadatas])
+            self._schedule_compaction()
+            return len(rows)
+
+    def _schedule_compaction(self):
+        """
+        Start a background compaction once enough vectors are deleted, unless one is running.
+        """
+        deleted = self.metadata.deleted_count
+        if not self.compact_ratio or not deleted or deleted < self.compact_ratio * len(self.metadata):
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(target=self.compact, name="faiss-compaction", daemon=True)
+        self._compaction.start()
+
+    def compact(self) -> bool:
+        """
+        Remove deleted vectors from the index, metadata and BM25 postings.
+
+        The kept vectors are re-added to an emptied copy of the index (so
+        trained IVF/PQ codebooks are reused) without holding the lock;
+        the new index is then swapped in, rows are renumbered and a
+        snapshot is saved. If the store changes during the rebuild, the
+        compaction is abandoned and tried again after the next delete.
+
+        Returns:
+            bool: False if the compaction was abandoned.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._check_writable()
+            if not self.metadata.deleted_count:
+                return True
+            version = self.version
+            self._ensure_writable()
+            keep = np.flatnonzero(np.frombuffer(self.metadata.deleted, dtype=np.uint8) == 0)
+            vectors = faiss_index.all_vectors(self.index)[keep]
+            index = faiss.clone_index(self.index)
+        index.reset()
+        if len(vectors):
+            index.add(vectors)
+        del vectors
+
+        with self._lock:
+            if self.version != version:
+                logging.info("FAISS compaction abandoned: the index changed during the rebuild.")
+                return False
+            removed = self.metadata.deleted_count
+            self.index = index
+            self._mapped = False
+            self.set_search_params()
+            self.metadata.compact(keep)
+            self.sparse.compact(keep)
+            if self.persist_dir:
+                self.save()
+        logging.info(f"Compacted FAISS index: removed {removed} deleted vectors in {time.perf_counter() - start:.2f}s.")
+        return True
+
+    def _append_log(self, vectors: np.ndarray, metadatas: List[dict], first_id: int):
+        """
+        Durably append new vectors and their metadata to the write-ahead log.
+        """
+        self.metadata.sync()
+        with open(self._path(LOG_VECTORS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._path(LOG_METADATA_FILE), "a", encoding="utf-8") as f:
+            for offset, metadata in enumerate(metadatas):
+                f.write(json.dumps({"id": first_id + offset, "metadata": metadata}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_log(self) -> int:
+        """
+        Re-apply log entries that are newer than the loaded snapshot.
+
+        A torn final record (vector or metadata) from a crash is ignored.
+
+        Returns:
+            int: Number of vectors replayed.
+        """
+        vectors_path = self._path(LOG_VECTORS_FILE)
+        metadata_path = self._path(LOG_METADATA_FILE)
+        if not os.path.exists(vectors_path) or not os.path.exists(metadata_path):
+            return 0
+
+        row_bytes = 4 * self.dimension
+        rows = os.path.getsize(vectors_path) // row_bytes
+        vectors = np.fromfile(vectors_path, dtype="float32", count=rows * self.dimension).reshape(rows, self.dimension)
+
+        entries = []
+        with open(metadata_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+
+        count = min(rows, len(entries))
+        pending = [k for k in range(count) if entries[k]["id"] >= self.index.ntotal]
+        if not pending:
+            return 0
+
+        self._ensure_writable()
+        self.index.add(vectors[pending])
+        self.metadata.extend(entries[k]["metadata"] for k in pending)
+        self.sparse.extend(entries[k]["metadata"].get("text", "") for k in pending)
+        self._unsaved += len(pending)
+        return len(pending)
+
+    def _truncate_texts(self, manifest: Optional[dict]):
+        """
+        Cut the text blob back to its size at the snapshot, before the log is replayed.
+
+        Texts of logged chunks were already appended to the blob before the
+        restart; replay appends them again, so they would otherwise be
+        stored once more on every restart. Older snapshots that did not
+        record the blob size are left as they are.
+        """
+        if manifest is None or manifest["metadata"].endswith(".json"):
+            # Every text is (re)appended from the log or the JSON metadata
+            size = 0
+        else:
+            size = manifest.get("text_bytes")
+        if size is not None:
+            self.metadata.truncate_texts(size)
+
+    def _replay_deletes(self) -> int:
+        """
+        Re-apply deletions logged since the loaded snapshot. Returns the number of chunks deleted.
+        """
+        path = self._path(LOG_DELETES_FILE)
+        if not os.path.exists(path):
+            return 0
+        chunk_ids = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    chunk_ids.extend(json.loads(line)["chunk_ids"])
+                except json.JSONDecodeError:
+                    break
+        rows = self.metadata.rows_of_chunk_ids(chunk_ids)
+        self.metadata.mark_deleted(rows)
+        return len(rows)
+
+    def save(self):
+        """
+        Write a full snapshot of the index and metadata and truncate the append log.
+
+        Snapshot files are written under a new generation number and the
+        manifest is switched over atomically, so a crash never leaves a
+        half-written snapshot in use. The previous generation is kept until
+        the next save for read-only replicas that are still loading it.
+        Does nothing on a read-only replica.
+        """
+        if not self.persist_dir or self.read_only:
+            return
+        with self._lock:
+            generation = self.generation + 1
+            index_file = f"index-{generation}.faiss"
+            metadata_file = f"metadata-{generation}.pkl"
+            sparse_file = f"sparse-{generation}.pkl"
+            faiss.write_index(self.index, self._path(index_file))
+            self.metadata.sync()
+            with open(self._path(metadata_file), "wb") as f:
+                pickle.dump(self.metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(self._path(sparse_file), "wb") as f:
+                pickle.dump(self.sparse, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            manifest = {
+                "generation": generation,
+                "index": index_file,
+                "metadata": metadata_file,
+                "sparse": sparse_file,
+                "ntotal": self.index.ntotal,
+                "text_bytes": self.metadata.text_bytes,
+                "index_type": self.active_index_type,
+                "version": self.version,
+            }
+            with open(self._path(MANIFEST_FILE + ".tmp"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self._path(MANIFEST_FILE + ".tmp"), self._path(MANIFEST_FILE))
+
+            # Entries up to ntotal are now in the snapshot
+            open(self._path(LOG_VECTORS_FILE), "wb").close()
+            open(self._path(LOG_METADATA_FILE), "w").close()
+            open(self._path(LOG_DELETES_FILE), "w").close()
+
+            for name in self._previous_snapshot_files:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._previous_snapshot_files = self._snapshot_files
+            self._snapshot_files = [index_file, metadata_file, sparse_file]
+            self.generation = generation
+            self._unsaved = 0
+            self._saved_version = self.version
+            logging.info(f"Saved FAISS snapshot generation {generation} with {self.index.ntotal} vectors.")
+
+    def _publish_loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            if self.version != self._saved_version:
+                try:
+                    self.save()
+                except Exception as e:
+                    logging.error(f"Publishing a FAISS snapshot failed: {e}")
+
+    def _read_manifest(self) -> Optional[dict]:
+        path = self._path(MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_snapshot(self, manifest: dict) -> Tuple[faiss.Index, MetadataStore, SparseIndex]:
+        """
+        Read the index, metadata and BM25 postings of a snapshot without installing them.
+        """
+        flags = faiss.IO_FLAG_MMAP if self.mmap else 0
+        if self.read_only:
+            flags |= faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(self._path(manifest["index"]), flags)
+        metadata = self._load_metadata(manifest["metadata"])
+        sparse = SparseIndex()
+        if manifest.get("sparse"):
+            with open(self._path(manifest["sparse"]), "rb") as f:
+                sparse = pickle.load(f)
+        else:
+            # Snapshot from before the BM25 index: build it from the stored texts
+            sparse.extend(metadata.text(row) or "" for row in range(len(metadata)))
+        return index, metadata, sparse
+
+    def _install_snapshot(self, manifest: dict, index: faiss.Index, metadata: MetadataStore, sparse: SparseIndex):
+        old_metadata = self.metadata
+        self.index = index
+        self.metadata = metadata
+        self.sparse = sparse
+        old_metadata.close()
+        self._mapped = self.mmap
+        self._snapshot_files = [manifest["index"], manifest["metadata"]] + ([manifest["sparse"]] if manifest.get("sparse") else [])
+        self.generation = manifest["generation"]
+        self.active_index_type = manifest.get("index_type", "flat")
+        self.set_search_params()
+        if self.read_only:
+            # Replicas change only when a new generation is published
+            self.version = self.generation
+
+    def load(self):
+        """
+        Load the latest snapshot from the persistence directory and replay the append log.
+
+        Read-only replicas load the snapshot alone; the log belongs to the writer.
+        Load time and resident memory afterwards are recorded in `load_stats`.
+        """
+        start = time.perf_counter()
+        replayed = deleted = 0
+        with self._lock:
+            manifest = self._read_manifest()
+            if not self.read_only:
+                self._truncate_texts(manifest)
+            if manifest is not None:
+                self._install_snapshot(manifest, *self._read_snapshot(manifest))
+            if not self.read_only:
+                replayed = self._replay_log()
+                deleted = self._replay_deletes()
+                self._maybe_migrate()
+            self._saved_version = self.version
+
+        self.load_stats = {
+            "load_seconds": time.perf_counter() - start,
+            "resident_memory_mb": _resident_memory_mb(),
+            "vectors": self.index.ntotal,
+            "replayed_from_log": replayed,
+            "deleted_from_log": deleted,
+            "mmap": self._mapped,
+        }
+        logging.info(f"Loaded FAISS index: {self.load_stats}")
+
+    def refresh(self) -> bool:
+        """
+        Reload the published snapshot if the writer has saved a newer generation.
+
+        Only read-only replicas refresh, at most once every `refresh_interval`
+        seconds. The new snapshot is read before taking the lock, so searches
+        keep using the old one until it is swapped in.
+
+        Returns:
+            bool: True if a newer snapshot was loaded.
+        """
+        if not self.read_only or not self.persist_dir:
+            return False
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_refresh = time.monotonic()
+            for _ in range(3):
+                try:
+                    manifest = self._read_manifest()
+                    if manifest is None or manifest["generation"] == self.generation:
+                        return False
+                    snapshot = self._read_snapshot(manifest)
+                    break
+                except FileNotFoundError:
+                    # The writer replaced the snapshot while it was being read
+                    continue
+            else:
+                return False
+            with self._lock:
+                self._install_snapshot(manifest, *snapshot)
+            logging.info(f"Reloaded FAISS snapshot generation {self.generation} with {self.index.ntotal} vectors.")
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _load_metadata(self, name: str) -> MetadataStore:
+        """
+        Load a metadata snapshot, converting the older JSON list format if needed.
+        """
+        if name.endswith(".json"):
+            with open(self._path(name), encoding="utf-8") as f:
+                rows = json.load(f)
+            # Texts are re-appended, so start a fresh store over the blob (in memory on a replica)
+            store = MetadataStore(None if self.read_only else self.persist_dir)
+            store.extend(rows)
+            return store
+        with open(self._path(name), "rb") as f:
+            store = pickle.load(f)
+        store.attach(self.persist_dir, read_only=self.read_only)
+        return store
 
     def query_embeddings(self, query_embedding: List[float], n_results: int = 5) -> List[Tuple[dict, float]]:
         """
@@ -42,26 +738,181 @@ class FAISSVectorDB:
         Returns:
             List[Tuple[dict, float]]: List of tuples containing metadata and distances for the most similar embeddings.
         """
-        query_vector = np.array([query_embedding]).astype('float32')
-        distances, indices = self.index.search(query_vector, n_results)
+        return self.query_embeddings_batch([query_embedding], n_results=n_results)[0]
 
-        # Log indices and distances for debugging
-        print("Indices:", indices)
-        print("Distances:", distances)
+    def query_embeddings_batch(self, query_embeddings: List[List[float]], n_results: int = 5) -> List[List[Tuple[dict, float]]]:
+        """
+        Query the FAISS index with several embeddings in a single search call.
 
-        # Ensure indices and distances are valid
-        if len(indices) == 0 or len(indices[0]) == 0:
-            return []
-        if len(distances) == 0 or len(distances[0]) == 0:
-            return []
+        Args:
+            query_embeddings (List[List[float]]): The embedding vectors to query.
+            n_results (int): Number of similar results to retrieve per query.
 
-        # Filter results to ensure valid metadata indices
-        results = [
-            (self.metadata[i], distances[0][j])
-            for j, i in enumerate(indices[0])
-            if i < len(self.metadata)
+        Returns:
+            List[List[Tuple[dict, float]]]: For each query, tuples of metadata and distance.
+        """
+        query_vectors = np.array(query_embeddings).astype('float32')
+        self.refresh()
+        with metrics.timed("search"), self._lock:
+            excluded = self.metadata.deleted_rows() if self.metadata.deleted_count else None
+            hits = self._dense_search(query_vectors, n_results, excluded=excluded)
+            return [[(self.metadata[i], distance) for i, distance in query_hits] for query_hits in hits]
+
+    def _dense_search(self, vectors: np.ndarray, k: int, allowed: Optional[np.ndarray] = None, excluded: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Vector search returning (id, distance) lists, optionally restricted to the ids in `allowed`.
+
+        Small allowed sets on flat and HNSW indexes are ranked exactly from
+        their reconstructed vectors, so the cost follows the subset size;
+        larger ones are pushed into the index search as an ID selector.
+        Without `allowed`, the ids in `excluded` (deleted vectors) are skipped.
+        """
+        if allowed is None and excluded is not None:
+            params = faiss_index.restricted_search_params(self.index, excluded, self.ef_search, self.nprobe, exclude=True)
+            distances, indices = self.index.search(vectors, k, params=params)
+        elif allowed is None:
+            distances, indices = self.index.search(vectors, k)
+        elif len(allowed) == 0:
+            return [[] for _ in vectors]
+        elif len(allowed) <= FILTER_EXACT_MAX and faiss.try_extract_index_ivf(self.index) is None:
+            subset = self.index.reconstruct_batch(allowed)
+            # Squared L2 distances, as returned by the index
+            all_distances = (
+                (vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ subset.T + (subset ** 2).sum(axis=1)[None, :]
+            )
+            top = np.argsort(all_distances, axis=1, kind="stable")[:, :k]
+            indices = allowed[top]
+            distances = np.take_along_axis(all_distances, top, axis=1)
+        else:
+            params = faiss_index.restricted_search_params(self.index, allowed, self.ef_search, self.nprobe)
+            distances, indices = self.index.search(vectors, k, params=params)
+        return [
+            [(int(i), float(d)) for i, d in zip(indices[q], distances[q]) if 0 <= i < len(self.metadata)]
+            for q in range(len(vectors))
         ]
-        return results
+
+    def _candidates(
+        self,
+        queries: List[str],
+        vectors: np.ndarray,
+        n_results: int,
+        mode: str,
+        filters: List[Optional[dict]],
+    ) -> Tuple[List[List[Tuple[int, float]]], List[List[Tuple[int, float]]]]:
+        """
+        Run the retrievers of `mode` for each query. The caller holds the lock.
+
+        Returns:
+            Tuple: Per query, dense (row, distance) hits and BM25 (row, score) hits.
+        """
+        candidates = n_results * HYBRID_CANDIDATE_FACTOR if mode == "hybrid" else n_results
+        dense = [[] for _ in queries]
+        sparse = [[] for _ in queries]
+        if self.index.ntotal == 0 or not queries:
+            return dense, sparse
+        allowed = [self.metadata.select(f) if f else None for f in filters]
+        # Deleted rows to skip; filtered rows already leave them out
+        deleted = self.metadata.deleted_rows() if self.metadata.deleted_count else None
+        excluded = [deleted if f is None else None for f in allowed]
+        if mode in ("dense", "hybrid"):
+            # Unfiltered queries share one search call
+            unfiltered = [q for q in range(len(queries)) if allowed[q] is None]
+            if unfiltered:
+                for q, hits in zip(unfiltered, self._dense_search(vectors[unfiltered], candidates, excluded=deleted)):
+                    dense[q] = hits
+            for q in range(len(queries)):
+                if allowed[q] is not None:
+                    dense[q] = self._dense_search(vectors[q:q + 1], candidates, allowed[q])[0]
+        if mode in ("sparse", "hybrid"):
+            sparse = [self.sparse.search(query, candidates, allowed[q], excluded[q]) for q, query in enumerate(queries)]
+        if mode == "prefilter":
+            for q, query in enumerate(queries):
+                ids = np.array(sorted(doc_id for doc_id, _ in self.sparse.search(query, self.prefilter_candidates, allowed[q], excluded[q])), dtype=np.int64)
+                # Without any matching term, fall back to the filter alone
+                dense[q] = self._dense_search(vectors[q:q + 1], n_results, ids if len(ids) else allowed[q], excluded[q])[0]
+        return dense, sparse
+
+    def _check_mode(self, mode: Optional[str]) -> str:
+        mode = mode or self.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Expected one of {RETRIEVAL_MODES}.")
+        return mode
+
+    def search_candidates(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        filters: Optional[List[Optional[dict]]] = None,
+    ) -> List[Tuple[List[Tuple[dict, float]], List[Tuple[dict, float]]]]:
+        """
+        Return the unfused dense and BM25 candidates of each query, with their metadata.
+
+        This is the per-shard half of a scatter-gather search: candidates
+        from several stores are merged by distance and BM25 score and then
+        fused with `fuse_candidates`. Arguments are as for `search_batch`.
+
+        Returns:
+            List[Tuple]: Per query, (metadata, distance) pairs nearest first and
+            (metadata, BM25 score) pairs best first.
+        """
+        mode = self._check_mode(mode)
+        vectors = np.array(query_embeddings).astype('float32')
+        self.refresh()
+        with self._lock:
+            dense, sparse = self._candidates(queries, vectors, n_results, mode, filters or [None] * len(queries))
+            return [
+                ([(self.metadata[i], d) for i, d in dense_hits], [(self.metadata[i], score) for i, score in sparse_hits])
+                for dense_hits, sparse_hits in zip(dense, sparse)
+            ]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        filters: Optional[List[Optional[dict]]] = None,
+    ) -> List[List[Tuple[dict, Optional[float], float]]]:
+        """
+        Retrieve contexts for several queries with dense, BM25 or hybrid retrieval.
+
+        "hybrid" fuses the vector and BM25 rankings with weighted
+        reciprocal-rank fusion. "prefilter" takes the best BM25 candidates and
+        ranks only those by vector distance, falling back to a plain vector
+        search when no query term is indexed.
+
+        Filters (see `metadata_store.validate_filters`) are resolved to the
+        matching rows first and applied inside both searches, so a filtered
+        query returns up to `n_results` matching results without over-fetching.
+
+        Args:
+            queries (List[str]): The query strings (used by BM25).
+            query_embeddings (List[List[float]]): The query embeddings, one per query.
+            n_results (int): Number of results per query.
+            mode (str, optional): Retrieval mode. Defaults to `retrieval_mode`.
+            filters (List[dict], optional): A filter expression (or None) per query.
+
+        Returns:
+            List[List[Tuple[dict, Optional[float], float]]]: For each query, tuples of
+            metadata, vector distance (None when the result came from BM25 only) and
+            fused score (higher is better), best first.
+        """
+        mode = self._check_mode(mode)
+        vectors = np.array(query_embeddings).astype('float32')
+        self.refresh()
+        with metrics.timed("search"), self._lock:
+            dense, sparse = self._candidates(queries, vectors, n_results, mode, filters or [None] * len(queries))
+            return [
+                [
+                    (self.metadata[i], distance, score)
+                    for i, distance, score in fuse_candidates(
+                        dense[q], sparse[q], n_results, self.dense_weight, self.sparse_weight, self.rrf_k,
+                    )
+                ]
+                for q in range(len(queries))
+            ]
 
     def query(self, query: str, top_k: int = 5) -> List[dict]:
         """
@@ -74,23 +925,15 @@ class FAISSVectorDB:
         Returns:
             List[dict]: List of metadata dictionaries for the most similar embeddings.
         """
-        # Check if the FAISS index is empty
+        # Pick up a newer published snapshot, then check if the FAISS index is empty
+        self.refresh()
         if self.index.ntotal == 0:
-            print("FAISS index is empty. No embeddings to query.")
+            logging.debug("FAISS index is empty. No embeddings to query.")
             return []
 
-        # Log the number of vectors in the FAISS index
-        print(f"FAISS index contains {self.index.ntotal} vectors.")
-
-        # Log metadata for debugging
-        print("Stored metadata:", self.metadata)
-
         # Generate embedding for the query string
         query_embedding = generate_embeddings([query])[0]
 
-        # Log the query embedding
-        print("Query embedding:", query_embedding)
-
         # Retrieve the most similar embeddings
         results = self.query_embeddings(query_embedding, n_results=top_k)
 
@@ -99,6 +942,23 @@ class FAISSVectorDB:
 
         return valid_results
 
+    def query_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[dict, float]]]:
+        """
+        Retrieve contexts for several query strings with one embedding call and one search.
+
+        Args:
+            queries (List[str]): The query strings.
+            top_k (int): Number of top results to retrieve per query.
+
+        Returns:
+            List[List[Tuple[dict, float]]]: For each query, tuples of metadata and distance.
+        """
+        self.refresh()
+        if self.index.ntotal == 0 or not queries:
+            return [[] for _ in queries]
+        query_embeddings = generate_embeddings(queries)
+        return self.query_embeddings_batch(query_embeddings, n_results=top_k)
+
 # Example usage
 if __name__ == "__main__":
     # Initialize FAISS database
@@ -0,0 +1,186 @@
+import faiss
+import math
+import numpy as np
+import time
+from typing import Dict, List, Optional
+
+# Supported index types
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# FAISS warns when a k-means codebook is trained on fewer points than this per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+# Maximum number of vectors used to train IVF/PQ codebooks
+MAX_TRAINING_VECTORS = 256 * 1024
+
+
+def default_nlist(ntotal: int) -> int:
+    """
+    Pick a number of IVF cells for a corpus of `ntotal` vectors (about sqrt(n)).
+    """
+    return max(1, int(math.sqrt(ntotal)))
+
+
+def training_minimum(index_type: str, nlist: int, pq_nbits: int = 8) -> int:
+    """
+    Return the number of vectors needed before an index of this type can be trained.
+    """
+    if index_type == "ivf_flat":
+        return MIN_POINTS_PER_CENTROID * nlist
+    if index_type == "ivf_pq":
+        return MIN_POINTS_PER_CENTROID * max(nlist, 2 ** pq_nbits)
+    return 0
+
+
+def build_index(index_type: str, dimension: int, nlist: int = 0, hnsw_m: int = 32, pq_m: int = 48, pq_nbits: int = 8) -> faiss.Index:
+    """
+    Create an empty (untrained) FAISS index of the given type.
+
+    Args:
+        index_type (str): One of "flat", "hnsw", "ivf_flat" or "ivf_pq".
+        dimension (int): The dimensionality of the vectors.
+        nlist (int): Number of IVF cells (IVF types only).
+        hnsw_m (int): Number of HNSW neighbours per node.
+        pq_m (int): Number of PQ sub-quantizers; must divide `dimension`.
+        pq_nbits (int): Bits per PQ code.
+
+    Returns:
+        faiss.Index: The new index.
+    """
+    if index_type == "flat":
+        description = "Flat"
+    elif index_type == "hnsw":
+        description = f"HNSW{hnsw_m}"
+    elif index_type == "ivf_flat":
+        description = f"IVF{nlist},Flat"
+    elif index_type == "ivf_pq":
+        if dimension % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the dimension {dimension}.")
+        description = f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+    return faiss.index_factory(dimension, description, faiss.METRIC_L2)
+
+
+def _hnsw(index: faiss.Index):
+    """
+    Return the HNSW graph of an index (looking through wrappers), or None.
+    """
+    index = faiss.downcast_index(index)
+    if hasattr(index, "hnsw"):
+        return index.hnsw
+    inner = getattr(index, "index", None)
+    return _hnsw(inner) if inner is not None else None
+
+
+def set_search_params(index: faiss.Index, ef_search: Optional[int] = None, nprobe: Optional[int] = None):
+    """
+    Apply search-time parameters to whichever index type supports them.
+    """
+    if ef_search is not None:
+        hnsw = _hnsw(index)
+        if hnsw is not None:
+            hnsw.efSearch = ef_search
+    if nprobe is not None:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = nprobe
+
+
+def restricted_search_params(index: faiss.Index, ids: np.ndarray, ef_search: Optional[int] = None, nprobe: Optional[int] = None, exclude: bool = False):
+    """
+    Build search parameters that only consider the vectors with the given ids
+    (or, with `exclude`, every vector except those).
+
+    The index's own efSearch / nprobe are carried over, since passing
+    parameters to `search` overrides them.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype="int64"))
+    if exclude:
+        # IDSelectorNot keeps a reference to the batch selector
+        selector = faiss.IDSelectorNot(selector)
+    if faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or 1)
+    if _hnsw(index) is not None:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or 16)
+    return faiss.SearchParameters(sel=selector)
+
+
+def all_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    Reconstruct every stored vector. Exact for flat, HNSW and IVF-Flat; approximate for PQ.
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray, seed: int = 1234):
+    """
+    Train an index on (a random sample of) `vectors` if it needs training.
+    """
+    if index.is_trained:
+        return
+    if len(vectors) > MAX_TRAINING_VECTORS:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[rng.choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)]
+    index.train(np.ascontiguousarray(vectors, dtype="float32"))
+
+
+def recall_report(
+    index: faiss.Index,
+    base_vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    ef_search_values: List[int] = (16, 32, 64, 128, 256),
+    nprobe_values: List[int] = (1, 4, 16, 64, 256),
+) -> List[Dict]:
+    """
+    Measure recall@k and latency of an index against exact search.
+
+    Ground truth comes from a flat index over `base_vectors`, which must hold
+    the same vectors, in the same order, as `index`. Every applicable value
+    of efSearch (HNSW) or nprobe (IVF) is tried in turn.
+
+    Args:
+        index (faiss.Index): The index under test.
+        base_vectors (np.ndarray): The exact vectors stored in `index`.
+        queries (np.ndarray): Query vectors.
+        k (int): Number of neighbours compared.
+        ef_search_values (List[int]): efSearch settings to try for HNSW indexes.
+        nprobe_values (List[int]): nprobe settings to try for IVF indexes.
+
+    Returns:
+        List[Dict]: One row per setting with "params", "recall_at_k",
+        "latency_ms_per_query" and "qps".
+    """
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    exact = faiss.IndexFlatL2(index.d)
+    exact.add(np.ascontiguousarray(base_vectors, dtype="float32"))
+    _, truth = exact.search(queries, k)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        settings = [{"nprobe": n} for n in nprobe_values if n <= ivf.nlist]
+    elif _hnsw(index) is not None:
+        settings = [{"ef_search": ef} for ef in ef_search_values]
+    else:
+        settings = [{}]
+
+    rows = []
+    for params in settings:
+        set_search_params(index, **params)
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        elapsed = time.perf_counter() - start
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        rows.append({
+            "params": params,
+            "recall_at_k": hits / float(len(queries) * k),
+            "latency_ms_per_query": 1000 * elapsed / len(queries),
+            "qps": len(queries) / elapsed if elapsed > 0 else float("inf"),
+        })
+    return rows
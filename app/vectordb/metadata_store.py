@@ -0,0 +1,473 @@
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Name of the append-only text blob inside the persistence directory
+TEXT_BLOB_FILE = "texts.bin"
+
+# Value stored in integer columns when a field is absent
+MISSING = -1
+
+# Fields that can be used in search filters. Categorical fields match one value
+# or a list of values; numeric fields also take {"gt", "gte", "lt", "lte"} ranges.
+CATEGORICAL_FIELDS = ("filename", "doc_id", "language", "source_type")
+NUMERIC_FIELDS = ("page", "chunk_index", "uploaded_at")
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+def _is_number(value) -> bool:
+    # bool is an int subclass, but True is not a page number
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_filters(filters: Optional[dict]):
+    """
+    Raise ValueError if a filter expression uses unknown fields or operators,
+    or values of the wrong type: strings for categorical fields, numbers
+    (not booleans or null) for numeric fields.
+
+    Example: {"filename": "report.pdf", "page": {"gte": 2, "lte": 5}, "source_type": ["ocr", "handwriting"]}
+    """
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("Filters must be an object of field conditions.")
+    for field, condition in (filters or {}).items():
+        if field not in CATEGORICAL_FIELDS and field not in NUMERIC_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}'. Expected one of {CATEGORICAL_FIELDS + NUMERIC_FIELDS}.")
+        if isinstance(condition, dict):
+            if field not in NUMERIC_FIELDS:
+                raise ValueError(f"Range filters are only supported on {NUMERIC_FIELDS}, not '{field}'.")
+            unknown = set(condition) - set(RANGE_OPERATORS)
+            if not condition or unknown:
+                raise ValueError(f"Range filter on '{field}' must use the operators {RANGE_OPERATORS}.")
+            values = list(condition.values())
+        else:
+            values = condition if isinstance(condition, list) else [condition]
+        if field in NUMERIC_FIELDS and not all(_is_number(value) for value in values):
+            raise ValueError(f"Filter values for '{field}' must be numbers.")
+        if field in CATEGORICAL_FIELDS and not all(isinstance(value, str) for value in values):
+            raise ValueError(f"Filter values for '{field}' must be strings.")
+
+
+class _StringTable:
+    """
+    Interns repeated strings (filenames, document IDs) as small integers.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def lookup(self, string_id: int) -> Optional[str]:
+        return None if string_id == MISSING else self.values[string_id]
+
+    def find(self, value: str) -> int:
+        return self._ids.get(value, MISSING)
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self._ids = {value: i for i, value in enumerate(values)}
+
+
+class MetadataStore:
+    """
+    Columnar metadata for the vectors of a FAISSVectorDB.
+
+    Each vector costs a few dozen bytes of typed arrays: filenames and
+    document IDs are interned, and chunk text lives in an append-only blob
+    (a file when `persist_dir` is set, otherwise an in-memory buffer) that is
+    only read for the rows actually returned by a query. Keys outside the
+    fixed columns are kept in a sparse side table.
+
+    Rows are read back as plain dicts, so `store[i]` can be used wherever a
+    list of metadata dicts was used before.
+
+    Every row also carries a stable, increasing `chunk_id`. A row's position
+    changes when deleted rows are compacted away; its chunk ID does not.
+    Deleted rows are tombstoned until then and never match `select`.
+    """
+
+    def __init__(self, persist_dir: Optional[str] = None, read_only: bool = False):
+        self.filenames = _StringTable()
+        self.doc_ids = _StringTable()
+        self.languages = _StringTable()
+        self.source_types = _StringTable()
+        self.chunk_id_col = array("q")
+        self.next_chunk_id = 0
+        self.filename_col = array("i")
+        self.doc_id_col = array("i")
+        self.language_col = array("i")
+        self.source_type_col = array("i")
+        self.uploaded_at_col = array("d")
+        self.page_col = array("i")
+        self.chunk_index_col = array("i")
+        self.bbox_col = array("i")  # x, y, width, height per row
+        self.text_offset_col = array("q")
+        self.text_length_col = array("i")
+        self.extras: Dict[int, dict] = {}
+        self.deleted = bytearray()  # 1 for tombstoned rows
+        self.deleted_count = 0
+        # Rows of each value of the categorical columns, so filters cost O(matching rows)
+        self._postings: Dict[str, Dict[int, array]] = {field: {} for field in CATEGORICAL_FIELDS}
+        self._buffer = bytearray()
+        self._blob_size = 0
+        self._fd = None
+        self._lock = threading.Lock()
+        self.attach(persist_dir, read_only)
+
+    def attach(self, persist_dir: Optional[str], read_only: bool = False):
+        """
+        Open (or create) the text blob file in `persist_dir`. With None, text is kept in memory.
+
+        A read-only store only reads texts that another process appended.
+        """
+        self.persist_dir = persist_dir
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+            mode = os.O_RDONLY if read_only else os.O_RDWR | os.O_APPEND
+            self._fd = os.open(os.path.join(persist_dir, TEXT_BLOB_FILE), mode | os.O_CREAT, 0o644)
+            self._blob_size = os.fstat(self._fd).st_size
+        else:
+            self._blob_size = len(self._buffer)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __len__(self) -> int:
+        return len(self.filename_col)
+
+    @property
+    def text_bytes(self) -> int:
+        """
+        Size of the text blob in bytes.
+        """
+        return self._blob_size
+
+    def __repr__(self) -> str:
+        return f"MetadataStore(rows={len(self)}, filenames={len(self.filenames.values)}, text_bytes={self._blob_size})"
+
+    def _append_text(self, text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        offset = self._blob_size
+        if self._fd is not None:
+            os.write(self._fd, data)
+        else:
+            self._buffer.extend(data)
+        self._blob_size += len(data)
+        return offset, len(data)
+
+    def sync(self):
+        """
+        Flush the text blob to disk.
+        """
+        if self._fd is not None:
+            os.fsync(self._fd)
+
+    def truncate_texts(self, size: int):
+        """
+        Drop the text blob past `size` bytes, e.g. texts appended after the last snapshot.
+        """
+        if size >= self._blob_size:
+            return
+        if self._fd is not None:
+            os.ftruncate(self._fd, size)
+        else:
+            del self._buffer[size:]
+        self._blob_size = size
+
+    def append(self, metadata: dict):
+        """
+        Append one metadata row.
+
+        Args:
+            metadata (dict): Row with any of "chunk_id", "filename", "doc_id",
+                "language", "source_type", "uploaded_at", "text", "page",
+                "chunk_index" and "bbox"; other keys are stored as extras.
+                Without a "chunk_id" the next free one is assigned.
+        """
+        with self._lock:
+            row = len(self)
+            chunk_id = metadata.get("chunk_id")
+            chunk_id = self.next_chunk_id if chunk_id is None else int(chunk_id)
+            self.chunk_id_col.append(chunk_id)
+            self.next_chunk_id = max(self.next_chunk_id, chunk_id + 1)
+            self.deleted.append(0)
+            for field, table, column in self._categorical():
+                value_id = table.intern(metadata.get(field))
+                column.append(value_id)
+                if value_id != MISSING:
+                    self._postings[field].setdefault(value_id, array("q")).append(row)
+            uploaded_at = metadata.get("uploaded_at")
+            self.uploaded_at_col.append(MISSING if uploaded_at is None else float(uploaded_at))
+            self.page_col.append(_int_or_missing(metadata.get("page")))
+            self.chunk_index_col.append(_int_or_missing(metadata.get("chunk_index")))
+            bbox = metadata.get("bbox")
+            if bbox:
+                self.bbox_col.extend([bbox["x"], bbox["y"], bbox["width"], bbox["height"]])
+            else:
+                self.bbox_col.extend([MISSING] * 4)
+
+            text = metadata.get("text")
+            if text is None:
+                self.text_offset_col.append(MISSING)
+                self.text_length_col.append(0)
+            else:
+                offset, length = self._append_text(text)
+                self.text_offset_col.append(offset)
+                self.text_length_col.append(length)
+
+            extra = {k: v for k, v in metadata.items() if k not in _COLUMNS}
+            if extra:
+                self.extras[row] = extra
+
+    def extend(self, metadatas: Iterable[dict]):
+        for metadata in metadatas:
+            self.append(metadata)
+
+    def text(self, row: int) -> Optional[str]:
+        """
+        Read the text of one row from the blob.
+        """
+        offset = self.text_offset_col[row]
+        if offset == MISSING:
+            return None
+        length = self.text_length_col[row]
+        if self._fd is not None:
+            data = os.pread(self._fd, length, offset)
+        else:
+            data = bytes(self._buffer[offset:offset + length])
+        return data.decode("utf-8")
+
+    def get(self, row: int, with_text: bool = True) -> dict:
+        """
+        Rebuild the metadata dict of one row.
+
+        Args:
+            row (int): Row number (the vector's position in the index).
+            with_text (bool): Whether to read the text from the blob.
+
+        Returns:
+            dict: The metadata of the row.
+        """
+        metadata = {"chunk_id": self.chunk_id_col[row]}
+        for field, table, column in self._categorical():
+            value = table.lookup(column[row])
+            if value is not None:
+                metadata[field] = value
+        if self.uploaded_at_col[row] != MISSING:
+            metadata["uploaded_at"] = self.uploaded_at_col[row]
+        if self.page_col[row] != MISSING:
+            metadata["page"] = self.page_col[row]
+        if self.chunk_index_col[row] != MISSING:
+            metadata["chunk_index"] = self.chunk_index_col[row]
+        x, y, width, height = self.bbox_col[4 * row:4 * row + 4]
+        if x != MISSING:
+            metadata["bbox"] = {"x": x, "y": y, "width": width, "height": height}
+        if with_text and self.text_offset_col[row] != MISSING:
+            metadata["text"] = self.text(row)
+        metadata.update(self.extras.get(row, {}))
+        return metadata
+
+    def _categorical(self):
+        return (
+            ("filename", self.filenames, self.filename_col),
+            ("doc_id", self.doc_ids, self.doc_id_col),
+            ("language", self.languages, self.language_col),
+            ("source_type", self.source_types, self.source_type_col),
+        )
+
+    def select(self, filters: Optional[dict]) -> np.ndarray:
+        """
+        Return the sorted row numbers matching a filter expression (see `validate_filters`).
+
+        Categorical conditions are answered from per-value row lists; numeric
+        conditions are then checked on those rows only, or on the whole
+        column when no categorical condition is given. Deleted rows are
+        never returned.
+        """
+        validate_filters(filters)
+        filters = filters or {}
+        rows = None
+        with self._lock:
+            for field, table, _ in self._categorical():
+                if field not in filters:
+                    continue
+                values = filters[field] if isinstance(filters[field], list) else [filters[field]]
+                lists = [self._postings[field].get(table.find(str(value))) for value in values]
+                lists = [np.array(rows_of_value, dtype=np.int64) for rows_of_value in lists if rows_of_value]
+                matched = np.unique(np.concatenate(lists)) if lists else np.zeros(0, dtype=np.int64)
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+            columns = {"page": (self.page_col, np.int32), "chunk_index": (self.chunk_index_col, np.int32), "uploaded_at": (self.uploaded_at_col, np.float64)}
+            for field in NUMERIC_FIELDS:
+                if field not in filters:
+                    continue
+                column, dtype = columns[field]
+                values = np.frombuffer(column, dtype=dtype)
+                if rows is not None:
+                    values = values[rows]
+                mask = _numeric_mask(values, filters[field])
+                rows = np.flatnonzero(mask) if rows is None else rows[mask]
+                del values
+
+            if rows is None:
+                rows = np.arange(len(self), dtype=np.int64)
+            if self.deleted_count:
+                rows = rows[np.frombuffer(self.deleted, dtype=np.uint8)[rows] == 0]
+        return rows.astype(np.int64)
+
+    def rows_of_chunk_ids(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        """
+        Return the current rows of the given chunk IDs, skipping unknown IDs.
+        """
+        with self._lock:
+            ids = np.frombuffer(self.chunk_id_col, dtype=np.int64)
+            wanted = np.asarray(list(chunk_ids), dtype=np.int64)
+            # Chunk IDs only grow, so the column is sorted
+            rows = np.searchsorted(ids, wanted)
+            known = rows < len(ids)
+            rows, wanted = rows[known], wanted[known]
+            rows = rows[ids[rows] == wanted]
+            del ids
+        return np.unique(rows).astype(np.int64)
+
+    def mark_deleted(self, rows: Iterable[int]):
+        """
+        Tombstone rows. They stay in place until `compact` removes them.
+        """
+        with self._lock:
+            for row in rows:
+                if not self.deleted[row]:
+                    self.deleted[row] = 1
+                    self.deleted_count += 1
+
+    def deleted_rows(self) -> np.ndarray:
+        """
+        Return the sorted rows of tombstoned entries.
+        """
+        return np.flatnonzero(np.frombuffer(self.deleted, dtype=np.uint8)).astype(np.int64)
+
+    def compact(self, keep: np.ndarray):
+        """
+        Keep only the given rows (sorted), renumbering them from 0.
+
+        Texts stay where they are in the blob; the bytes of removed rows are
+        not reclaimed.
+        """
+        keep = np.asarray(keep, dtype=np.int64)
+        with self._lock:
+            for name in ("chunk_id_col", "filename_col", "doc_id_col", "language_col", "source_type_col",
+                         "uploaded_at_col", "page_col", "chunk_index_col", "text_offset_col", "text_length_col"):
+                column = getattr(self, name)
+                values = np.frombuffer(column, dtype=_NUMPY_TYPES[column.typecode])[keep]
+                setattr(self, name, array(column.typecode, values.tobytes()))
+                del values
+            bbox = np.frombuffer(self.bbox_col, dtype=np.int32).reshape(-1, 4)[keep]
+            self.bbox_col = array("i", bbox.tobytes())
+            del bbox
+            new_rows = {int(old): new for new, old in enumerate(keep)}
+            self.extras = {new_rows[row]: extra for row, extra in self.extras.items() if row in new_rows}
+            self.deleted = bytearray(len(keep))
+            self.deleted_count = 0
+            self._rebuild_postings()
+
+    def _rebuild_postings(self):
+        rows = len(self.filename_col)
+        self._postings = {}
+        for field, _, column in self._categorical():
+            values = np.frombuffer(column, dtype=np.int32)
+            order = np.argsort(values, kind="stable")
+            sorted_values = values[order]
+            del values
+            starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]]) if rows else []
+            postings = {}
+            for start, end in zip(starts, list(starts[1:]) + [rows]):
+                if sorted_values[start] != MISSING:
+                    postings[int(sorted_values[start])] = array("q", order[start:end].astype(np.int64).tobytes())
+            self._postings[field] = postings
+
+    def __getitem__(self, row: int) -> dict:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self.get(row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.get(row)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_fd"] = None
+        state["_lock"] = None
+        # Rebuilt from the columns on load
+        state["_postings"] = None
+        if self._fd is not None:
+            # The blob stays on disk; only the columns are pickled
+            state["_buffer"] = bytearray()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._fd = None
+        rows = len(self.filename_col)
+        # Snapshots written before the language, source type and upload time columns existed
+        for name in ("languages", "source_types"):
+            if name not in state:
+                setattr(self, name, _StringTable())
+        for name, typecode in (("language_col", "i"), ("source_type_col", "i"), ("uploaded_at_col", "d")):
+            if name not in state:
+                setattr(self, name, array(typecode, [MISSING]) * rows)
+        # ... and before chunk IDs and deletes: rows keep their position as ID
+        if "chunk_id_col" not in state:
+            self.chunk_id_col = array("q", range(rows))
+            self.next_chunk_id = rows
+            self.deleted = bytearray(rows)
+            self.deleted_count = 0
+        self._rebuild_postings()
+
+
+def _numeric_mask(values: np.ndarray, condition) -> np.ndarray:
+    if isinstance(condition, dict):
+        mask = np.ones(len(values), dtype=bool)
+        if "gt" in condition:
+            mask &= values > condition["gt"]
+        if "gte" in condition:
+            mask &= values >= condition["gte"]
+        if "lt" in condition:
+            mask &= values < condition["lt"]
+        if "lte" in condition:
+            mask &= values <= condition["lte"]
+        return mask
+    if isinstance(condition, list):
+        return np.isin(values, condition)
+    return values == condition
+
+
+_COLUMNS = {"chunk_id", "filename", "doc_id", "language", "source_type", "uploaded_at", "text", "page", "chunk_index", "bbox"}
+
+
+_NUMPY_TYPES = {"i": np.int32, "q": np.int64, "d": np.float64}
+
+
+def _int_or_missing(value) -> int:
+    return MISSING if value is None else int(value)
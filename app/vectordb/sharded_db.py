@@ -0,0 +1,298 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.observability import metrics
+from app.vectordb.faiss_db import HYBRID_CANDIDATE_FACTOR, fuse_candidates
+
+
+def _serve_shard(conn, dimension: int, persist_dir: Optional[str], options: dict):
+    """
+    Shard process: own one FAISSVectorDB and answer (method, args, kwargs) requests until closed.
+    """
+    from app.vectordb.faiss_db import FAISSVectorDB
+
+    db = FAISSVectorDB(dimension, persist_dir=persist_dir, **options)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args, kwargs = request
+        try:
+            attribute = getattr(db, method)
+            conn.send(("ok", attribute(*args, **kwargs) if callable(attribute) else attribute))
+        except Exception as e:
+            conn.send(("error", e))
+    db.metadata.close()
+    conn.close()
+
+
+class ShardedVectorDB:
+    """
+    A collection split over several FAISSVectorDB shards, each served by its own local process.
+
+    Documents are assigned to a shard by a hash of their doc_id, so all
+    chunks of a document live together and can be replaced or deleted on one
+    shard. Searches are scattered to every shard at once; each returns its
+    own dense and BM25 candidates, which are merged into global top-k lists
+    (by distance and by BM25 score) and fused here, so the result matches a
+    single index up to the shard-local BM25 statistics.
+
+    Each shard persists to `persist_dir/shard-<i>`, so a sharded writer and
+    sharded read-only replicas can share the same directories. The
+    methods mirror those of FAISSVectorDB used by the API, except that
+    chunk IDs are only unique within a shard: `add_embeddings` returns
+    (shard, chunk ID) pairs and search results carry their "shard".
+    """
+
+    def __init__(self, dimension: int, shards: int, persist_dir: Optional[str] = None, **options):
+        """
+        Args:
+            dimension (int): The dimensionality of the vectors.
+            shards (int): Number of shard processes.
+            persist_dir (str, optional): Directory holding one sub-directory per shard.
+            **options: Keyword arguments of FAISSVectorDB applied to every shard.
+        """
+        if shards < 1:
+            raise ValueError("A sharded vector store needs at least one shard.")
+        self.dimension = dimension
+        self.persist_dir = persist_dir
+        self.read_only = options.get("read_only", False)
+        self.version = 0
+        self._connections = []
+        self._processes = []
+        self._locks = []
+        self._next_shard = 0
+
+        # Fork is unsafe with the threads FAISS and the API already run
+        context = multiprocessing.get_context("spawn")
+        for shard in range(shards):
+            shard_dir = os.path.join(persist_dir, f"shard-{shard}") if persist_dir else None
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve_shard, args=(child, dimension, shard_dir, options), name=f"faiss-shard-{shard}", daemon=True,
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+            self._locks.append(threading.Lock())
+        atexit.register(self.close)
+
+        # Fusion and refresh settings, resolved by the shards from the same options
+        self.retrieval_mode, self.dense_weight, self.sparse_weight, self.rrf_k, self.refresh_interval = (
+            self._call(0, name) for name in ("retrieval_mode", "dense_weight", "sparse_weight", "rrf_k", "refresh_interval")
+        )
+        self._last_refresh = 0.0
+        self.refresh()
+
+    @property
+    def shards(self) -> int:
+        return len(self._connections)
+
+    def shard_of(self, doc_id: str) -> int:
+        """
+        Return the shard holding a document.
+        """
+        return zlib.crc32(doc_id.encode("utf-8")) % self.shards
+
+    @staticmethod
+    def _unwrap(response) -> Any:
+        status, value = response
+        if status == "error":
+            raise value
+        return value
+
+    def _call(self, shard: int, method: str, *args, **kwargs) -> Any:
+        with self._locks[shard]:
+            self._connections[shard].send((method, args, kwargs))
+            return self._unwrap(self._connections[shard].recv())
+
+    def _scatter(self, method: str, *args, shards: Optional[List[int]] = None, **kwargs) -> List[Any]:
+        """
+        Send the same request to several shards (default: all) and gather the responses in shard order.
+        """
+        shards = list(range(self.shards)) if shards is None else shards
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._connections[shard].send((method, args, kwargs))
+            responses = [self._connections[shard].recv() for shard in shards]
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+        return [self._unwrap(response) for response in responses]
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Number of vectors over all shards, including deleted ones not yet compacted.
+        """
+        return sum(self._scatter("ntotal"))
+
+    def refresh(self) -> bool:
+        """
+        Let read-only shards reload newer snapshots; `version` then follows theirs.
+
+        Called before every query, so like FAISSVectorDB.refresh it asks the
+        shards at most once every `refresh_interval` seconds, and never on a
+        writer, whose shards do not refresh. Most queries therefore send no
+        extra requests to the shards.
+        """
+        if not self.read_only:
+            return False
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return False
+        self._last_refresh = time.monotonic()
+        reloaded = any(self._scatter("refresh"))
+        # Shards also reload on their own while searching, so read the versions either way
+        self.version = sum(self._scatter("version"))
+        return reloaded
+
+    def add_embeddings(self, embeddings: List[List[float]], metadatas: List[dict]) -> List[Tuple[int, int]]:
+        """
+        Add embeddings, placing chunks with a "doc_id" on their document's shard and spreading the rest.
+
+        Returns:
+            List[Tuple[int, int]]: (shard, chunk ID) of each embedding. Unlike
+            FAISSVectorDB, which returns plain chunk IDs, each shard numbers its
+            chunks on its own, so the shard is needed to identify a chunk.
+        """
+        groups = {}
+        for position, metadata in enumerate(metadatas):
+            if metadata.get("doc_id") is not None:
+                shard = self.shard_of(metadata["doc_id"])
+            else:
+                shard = self._next_shard
+                self._next_shard = (self._next_shard + 1) % self.shards
+            groups.setdefault(shard, []).append(position)
+        vectors = np.asarray(embeddings, dtype="float32")
+        ids = [None] * len(metadatas)
+        for shard, positions in groups.items():
+            chunk_ids = self._call(shard, "add_embeddings", vectors[positions], [metadatas[p] for p in positions])
+            for position, chunk_id in zip(positions, chunk_ids):
+                ids[position] = (shard, chunk_id)
+        self.version += 1
+        return ids
+
+    def has_document(self, doc_id: str) -> bool:
+        return self._call(self.shard_of(doc_id), "has_document", doc_id)
+
+    def delete_matching(self, filters: dict) -> int:
+        deleted = sum(self._scatter("delete_matching", filters))
+        self.version += 1
+        return deleted
+
+    def delete_document(self, doc_id: str) -> int:
+        deleted = self._call(self.shard_of(doc_id), "delete_document", doc_id)
+        self.version += 1
+        return deleted
+
+    def upsert_document(self, doc_id: str, embeddings: List[List[float]], metadatas: List[dict], replace_filter: Optional[dict] = None) -> int:
+        """
+        Upsert a document on its shard. Chunks matching `replace_filter` are
+        also deleted from the other shards; unlike on a single store, that
+        deletion is not atomic with the upsert.
+        """
+        shard = self.shard_of(doc_id)
+        replaced = 0
+        if replace_filter:
+            others = [other for other in range(self.shards) if other != shard]
+            replaced += sum(self._scatter("delete_matching", replace_filter, shards=others))
+        replaced += self._call(shard, "upsert_document", doc_id, embeddings, metadatas, replace_filter)
+        self.version += 1
+        return replaced
+
+    def search_batch(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        filters: Optional[List[Optional[dict]]] = None,
+    ) -> List[List[Tuple[dict, Optional[float], float]]]:
+        """
+        Scatter a batch of queries to every shard and merge their candidates (see FAISSVectorDB.search_batch).
+
+        Every result's metadata carries the "shard" it came from.
+        """
+        mode = mode or self.retrieval_mode
+        candidates = n_results * HYBRID_CANDIDATE_FACTOR if mode == "hybrid" else n_results
+        vectors = np.asarray(query_embeddings, dtype="float32")
+        # Merging is cheap next to the shard searches, which are what "search" measures here
+        with metrics.timed("search"):
+            per_shard = self._scatter("search_candidates", queries, vectors, n_results, mode, filters)
+
+        results = []
+        for q in range(len(queries)):
+            metadata_of = {}
+            dense = []
+            sparse = []
+            for shard, shard_results in enumerate(per_shard):
+                dense_hits, sparse_hits = shard_results[q]
+                for metadata, distance in dense_hits:
+                    key = (shard, metadata["chunk_id"])
+                    metadata_of[key] = dict(metadata, shard=shard)
+                    dense.append((key, distance))
+                for metadata, score in sparse_hits:
+                    key = (shard, metadata["chunk_id"])
+                    metadata_of[key] = dict(metadata, shard=shard)
+                    sparse.append((key, score))
+            dense = sorted(dense, key=lambda hit: hit[1])[:candidates]
+            sparse = sorted(sparse, key=lambda hit: hit[1], reverse=True)[:candidates]
+            fused = fuse_candidates(dense, sparse, n_results, self.dense_weight, self.sparse_weight, self.rrf_k)
+            results.append([(metadata_of[key], distance, score) for key, distance, score in fused])
+        return results
+
+    def query_embeddings_batch(self, query_embeddings: List[List[float]], n_results: int = 5) -> List[List[Tuple[dict, float]]]:
+        """
+        Nearest chunks of each embedding over all shards, as (metadata, distance).
+        """
+        results = self.search_batch([""] * len(query_embeddings), query_embeddings, n_results=n_results, mode="dense")
+        return [[(metadata, distance) for metadata, distance, _ in query_results] for query_results in results]
+
+    def query_embeddings(self, query_embedding: List[float], n_results: int = 5) -> List[Tuple[dict, float]]:
+        return self.query_embeddings_batch([query_embedding], n_results=n_results)[0]
+
+    def query_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[dict, float]]]:
+        from app.embeddings.embedder import generate_embeddings
+        if not queries:
+            return []
+        return self.query_embeddings_batch(generate_embeddings(queries), n_results=top_k)
+
+    def query(self, query: str, top_k: int = 5) -> List[Tuple[dict, float]]:
+        """
+        Retrieve the `top_k` chunks nearest to a query string over all shards.
+        """
+        return self.query_batch([query], top_k=top_k)[0]
+
+    def compact(self) -> bool:
+        return all(self._scatter("compact"))
+
+    def save(self):
+        self._scatter("save")
+
+    def close(self):
+        """
+        Stop the shard processes. Unsaved changes stay in each shard's append log.
+        """
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for process in self._processes:
+            process.join(timeout=10)
+        self._processes = []
+        self._connections = []
@@ -0,0 +1,165 @@
+import math
+import re
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Word characters plus the whole Malayalam block, listed explicitly
+# because its vowel signs and virama are marks, not word characters
+_TOKEN = re.compile(r"[\w\u0D00-\u0D7F]+")
+
+# Zero-width (non-)joiners only change how Malayalam is rendered
+_JOINERS = dict.fromkeys(map(ord, "\u200c\u200d"))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms for BM25.
+
+    Identifiers such as roll numbers and course codes ("21BCS045") stay one
+    term; Malayalam words are kept whole, including vowel signs and chillu forms.
+    """
+    text = unicodedata.normalize("NFC", text).translate(_JOINERS).lower()
+    return _TOKEN.findall(text)
+
+
+class SparseIndex:
+    """
+    Append-only BM25 inverted index over the chunks of the vector store.
+
+    Documents are numbered like the FAISS vectors, so a document id is also
+    a FAISS id. Each term's postings are two parallel arrays of document ids
+    and term frequencies; since ids only grow, new documents are appended
+    to the end of each list and the lists stay sorted. Deleted documents
+    are excluded at search time until `compact` renumbers the index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.terms: Dict[str, int] = {}
+        self.doc_ids: List[array] = []
+        self.frequencies: List[array] = []
+        self.doc_lengths = array("I")
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, text: str):
+        """
+        Index the next document (its id is the current length of the index).
+        """
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(text or "")
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, count in counts.items():
+            term_id = self.terms.get(term)
+            if term_id is None:
+                term_id = self.terms[term] = len(self.doc_ids)
+                self.doc_ids.append(array("I"))
+                self.frequencies.append(array("H"))
+            self.doc_ids[term_id].append(doc_id)
+            self.frequencies[term_id].append(min(count, 0xFFFF))
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+
+    def extend(self, texts: Iterable[str]):
+        for text in texts:
+            self.add(text)
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None, excluded: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Return the `k` best-scoring documents for a query.
+
+        Args:
+            query (str): The query text.
+            k (int): Number of documents to return.
+            allowed (np.ndarray, optional): Sorted ids of the only documents that may be returned.
+            excluded (np.ndarray, optional): Sorted ids of documents that must not be returned.
+
+        Returns:
+            List[Tuple[int, float]]: (document id, BM25 score), best first.
+        """
+        n = len(self.doc_lengths)
+        term_ids = {self.terms[t] for t in tokenize(query) if t in self.terms}
+        if not n or not term_ids or k <= 0:
+            return []
+
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        average_length = self.total_length / n or 1.0
+        docs = []
+        contributions = []
+        for term_id in term_ids:
+            ids = np.frombuffer(self.doc_ids[term_id], dtype=np.uint32)
+            tf = np.frombuffer(self.frequencies[term_id], dtype=np.uint16).astype(np.float32)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            if allowed is not None:
+                keep = np.isin(ids, allowed, assume_unique=True)
+                ids = ids[keep]
+                tf = tf[keep]
+            if excluded is not None:
+                keep = np.isin(ids, excluded, assume_unique=True, invert=True)
+                ids = ids[keep]
+                tf = tf[keep]
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average_length)
+            docs.append(ids)
+            contributions.append(idf * tf * (self.k1 + 1) / (tf + norm))
+
+        if not sum(len(ids) for ids in docs):
+            return []
+        unique, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        if len(unique) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(unique))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(unique[i]), float(scores[i])) for i in top]
+
+    def compact(self, keep: np.ndarray):
+        """
+        Keep only the given documents (sorted ids), renumbering them from 0 like the vectors.
+        """
+        n = len(self.doc_lengths)
+        kept = np.zeros(n, dtype=bool)
+        kept[keep] = True
+        new_ids = np.cumsum(kept, dtype=np.int64) - 1
+
+        terms: Dict[str, int] = {}
+        doc_ids: List[array] = []
+        frequencies: List[array] = []
+        for term, term_id in self.terms.items():
+            ids = np.frombuffer(self.doc_ids[term_id], dtype=np.uint32)
+            mask = kept[ids]
+            if mask.any():
+                terms[term] = len(doc_ids)
+                doc_ids.append(array("I", new_ids[ids[mask]].astype(np.uint32).tobytes()))
+                frequencies.append(array("H", np.frombuffer(self.frequencies[term_id], dtype=np.uint16)[mask].tobytes()))
+            del ids
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)[kept]
+        self.terms = terms
+        self.doc_ids = doc_ids
+        self.frequencies = frequencies
+        self.doc_lengths = array("I", lengths.tobytes())
+        self.total_length = int(lengths.sum())
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], weights: List[float], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked lists of document ids with weighted reciprocal-rank fusion.
+
+    Each list contributes weight / (k + rank) to the documents it ranks (rank starts at 1).
+
+    Returns:
+        List[Tuple[int, float]]: (document id, fused score), best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,157 @@
+"""
+Compare inference backends (eager fp32, int8, ONNX Runtime) for each model.
+
+For every model and backend this loads the model, runs the same inputs
+through it and reports load time, per-call latency, throughput, the
+resident memory the model added and how far its outputs drift from eager
+fp32: mean/min cosine similarity of embeddings, and the fraction of
+answers or recognized texts that match the eager output exactly.
+
+Handwriting (TrOCR) and chart (Donut) models need sample images; they are
+skipped unless --images is given.
+
+Usage:
+    python -m benchmarks.inference_backends --models embedder generator --output backends.json
+    python -m benchmarks.inference_backends --models trocr donut --images samples/
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from app.models.backends import BACKENDS
+from app.vectordb.faiss_db import _resident_memory_mb
+
+SAMPLE_TEXTS = [
+    "France is a country in Europe.",
+    "Paris is the capital city of France.",
+    "The invoice total is due within thirty days of receipt.",
+    "കേരളം ഇന്ത്യയുടെ തെക്കുപടിഞ്ഞാറൻ തീരത്തുള്ള ഒരു സംസ്ഥാനമാണ്.",
+    "The applicant holds a Bachelor of Science degree from the University of Kerala.",
+    "Quarterly revenue grew by twelve percent compared to the previous year.",
+    "Tesseract is an open source optical character recognition engine.",
+    "The meeting was rescheduled to Monday morning at nine o'clock.",
+]
+
+SAMPLE_QUESTIONS = [
+    ("What is the capital of France?", SAMPLE_TEXTS[:2]),
+    ("When is the invoice due?", [SAMPLE_TEXTS[2]]),
+    ("Which degree does the applicant hold?", [SAMPLE_TEXTS[4]]),
+    ("How much did revenue grow?", [SAMPLE_TEXTS[5]]),
+]
+
+
+def _load(model: str, backend: str):
+    """
+    Load a model with a backend and return a function that runs a list of inputs through it.
+    """
+    if model == "embedder":
+        from app.embeddings.embedder import _load_model
+        encoder = _load_model(backend)
+        return lambda texts: encoder.encode(texts, convert_to_numpy=True)
+    if model == "generator":
+        from app.rag.rag_agent import RAGAgent
+        agent = RAGAgent(registry_name=f"benchmark-generator-{backend}", backend=backend)
+        agent.generator  # load now so it counts towards load time
+        return lambda questions: agent.answer_batch([q for q, _ in questions], [c for _, c in questions])
+    if model == "trocr":
+        from app.ocr.english_handwritten import _load_trocr
+        processor, vision_model = _load_trocr(backend)
+    else:
+        from app.charts.chart_extractor import _load_donut
+        processor, vision_model = _load_donut(backend)
+
+    def recognize(images: List[Image.Image]) -> List[str]:
+        pixel_values = processor(images=images, return_tensors="pt").pixel_values
+        return processor.batch_decode(vision_model.generate(pixel_values), skip_special_tokens=True)
+    return recognize
+
+
+def _drift(model: str, outputs, reference) -> dict:
+    if model == "embedder":
+        a = np.asarray(outputs, dtype=np.float32)
+        b = np.asarray(reference, dtype=np.float32)
+        cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+        return {"mean_cosine": float(cosine.mean()), "min_cosine": float(cosine.min())}
+    matches = [out.strip() == ref.strip() for out, ref in zip(outputs, reference)]
+    return {"exact_match": sum(matches) / len(matches)}
+
+
+def run_model(model: str, inputs: list, backends: List[str], repeats: int) -> List[dict]:
+    """
+    Benchmark one model on every backend. The first backend's outputs are the drift reference.
+    """
+    rows = []
+    reference = None
+    for backend in backends:
+        gc.collect()
+        memory_before = _resident_memory_mb()
+        start = time.perf_counter()
+        infer: Callable = _load(model, backend)
+        load_seconds = time.perf_counter() - start
+
+        outputs = infer(inputs)  # warm-up
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = infer(inputs)
+            latencies.append(time.perf_counter() - start)
+        if reference is None:
+            reference = outputs
+
+        rows.append({
+            "model": model,
+            "backend": backend,
+            "load_seconds": load_seconds,
+            "batch_size": len(inputs),
+            "latency_seconds": statistics.median(latencies),
+            "items_per_second": len(inputs) / statistics.median(latencies),
+            "memory_mb": _resident_memory_mb() - memory_before,
+            "drift": _drift(model, outputs, reference),
+        })
+        del infer
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["embedder", "generator"], choices=["embedder", "generator", "trocr", "donut"])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS), help="The first one is the drift reference")
+    parser.add_argument("--images", help="Directory of sample images for the trocr and donut models")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per backend")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    images = []
+    if args.images:
+        for pattern in ("*.png", "*.jpg", "*.jpeg"):
+            images.extend(Image.open(path).convert("RGB") for path in sorted(glob.glob(os.path.join(args.images, pattern))))
+
+    inputs: Dict[str, list] = {"embedder": SAMPLE_TEXTS, "generator": SAMPLE_QUESTIONS, "trocr": images, "donut": images}
+    rows = []
+    for model in args.models:
+        if not inputs[model]:
+            print(f"Skipping {model}: no sample images (use --images).")
+            continue
+        rows.extend(run_model(model, inputs[model], args.backends, args.repeats))
+
+    print(f"{'model':<11}{'backend':<8}{'load s':>8}{'latency s':>11}{'items/s':>9}{'MiB':>8}  drift")
+    for row in rows:
+        drift = ", ".join(f"{name}={value:.4f}" for name, value in row["drift"].items())
+        print(f"{row['model']:<11}{row['backend']:<8}{row['load_seconds']:>8.1f}{row['latency_seconds']:>11.3f}"
+              f"{row['items_per_second']:>9.1f}{row['memory_mb']:>8.0f}  {drift}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Exercise multi-process serving with local processes and synthetic vectors.
+
+Two checks, no models needed:
+
+1. Writer / replicas: this process writes to a persistence directory and
+   publishes snapshots, while --readers read-only replica processes serve
+   the memory-mapped snapshot. Reports how long each write takes to become
+   visible to every replica and whether replica results match the writer's.
+2. Sharding: the same vectors go into a single flat index and into a
+   ShardedVectorDB with --shards shard processes. Reports whether the
+   scatter-gather top-k matches the single index, and the latency of both.
+
+Usage:
+    python -m benchmarks.multiprocess_serving --readers 3 --shards 4 --vectors 20000 --output serving.json
+"""
+import argparse
+import json
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.vectordb.faiss_db import FAISSVectorDB
+from app.vectordb.sharded_db import ShardedVectorDB
+
+DIMENSION = 64
+
+
+def _synthetic(count: int, start: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((count, DIMENSION), dtype=np.float32)
+    metadatas = [{"doc_id": f"doc-{(start + i) // 10}", "text": f"chunk {start + i} term{(start + i) % 97}"} for i in range(count)]
+    return vectors, metadatas
+
+
+def _replica(persist_dir: str, requests, responses):
+    """
+    Read-only replica process: answer (expected_ntotal, queries, k) requests once that many vectors are visible.
+    """
+    db = FAISSVectorDB(DIMENSION, persist_dir=persist_dir, mmap=True, read_only=True, refresh_interval=0.01)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        expected, queries, k = request
+        start = time.perf_counter()
+        while db.ntotal < expected:
+            db.refresh()
+            time.sleep(0.005)
+        visible_seconds = time.perf_counter() - start
+        hits = db.query_embeddings_batch(queries, n_results=k)
+        responses.put((visible_seconds, [[m["text"] for m, _ in query_hits] for query_hits in hits]))
+
+
+def check_replicas(readers: int, vectors: int, batches: int, k: int) -> dict:
+    persist_dir = tempfile.mkdtemp(prefix="faiss-serving-")
+    writer = FAISSVectorDB(DIMENSION, persist_dir=persist_dir, publish_interval=0.05)
+    context = multiprocessing.get_context("spawn")
+    requests = [context.Queue() for _ in range(readers)]
+    responses = context.Queue()
+    processes = [context.Process(target=_replica, args=(persist_dir, requests[i], responses), daemon=True) for i in range(readers)]
+    for process in processes:
+        process.start()
+
+    queries = np.random.default_rng(7).random((8, DIMENSION), dtype=np.float32)
+    per_batch = vectors // batches
+    visible = []
+    matches = []
+    for batch in range(batches):
+        batch_vectors, metadatas = _synthetic(per_batch, batch * per_batch, seed=batch)
+        writer.add_embeddings(batch_vectors, metadatas)
+        expected = [[m["text"] for m, _ in hits] for hits in writer.query_embeddings_batch(queries, n_results=k)]
+        for queue in requests:
+            queue.put((writer.ntotal, queries, k))
+        for _ in range(readers):
+            seconds, texts = responses.get()
+            visible.append(seconds)
+            matches.append(texts == expected)
+
+    for queue in requests:
+        queue.put(None)
+    for process in processes:
+        process.join()
+    return {
+        "readers": readers,
+        "vectors": writer.ntotal,
+        "median_visible_seconds": statistics.median(visible),
+        "max_visible_seconds": max(visible),
+        "replicas_match_writer": all(matches),
+    }
+
+
+def check_shards(shards: int, vectors: int, k: int, repeats: int) -> dict:
+    data, metadatas = _synthetic(vectors, 0, seed=1)
+    queries = np.random.default_rng(7).random((32, DIMENSION), dtype=np.float32)
+
+    single = FAISSVectorDB(DIMENSION)
+    single.add_embeddings(data, metadatas)
+    sharded = ShardedVectorDB(DIMENSION, shards)
+    try:
+        sharded.add_embeddings(data, metadatas)
+        rows = {}
+        for name, db in (("single", single), ("sharded", sharded)):
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                hits = db.query_embeddings_batch(queries, n_results=k)
+                latencies.append(time.perf_counter() - start)
+            rows[name] = {"texts": [[m["text"] for m, _ in query_hits] for query_hits in hits], "latency_seconds": statistics.median(latencies)}
+        return {
+            "shards": shards,
+            "vectors": sharded.ntotal,
+            "single_latency_seconds": rows["single"]["latency_seconds"],
+            "sharded_latency_seconds": rows["sharded"]["latency_seconds"],
+            "topk_matches_single_index": rows["single"]["texts"] == rows["sharded"]["texts"],
+        }
+    finally:
+        sharded.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=2, help="Read-only replica processes")
+    parser.add_argument("--shards", type=int, default=3, help="Shard processes")
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--batches", type=int, default=5, help="Writes observed by the replicas")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed searches per store")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "replicas": check_replicas(args.readers, args.vectors, args.batches, args.k),
+        "shards": check_shards(args.shards, args.vectors, args.k, args.repeats),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare OCR accuracy and time per page across preprocessing profiles.
+
+The sample directory holds page images (PNG/JPG) with the expected text of
+each page in a .txt file of the same name, e.g. page1.png and page1.txt.
+
+Usage:
+    python -m benchmarks.preprocessing_profiles samples/ --output profiles.json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from app.ocr.ocr_processor import process_image
+from app.ocr.preprocessing import PROFILES
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Levenshtein distance between two strings.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(expected: str, actual: str) -> float:
+    """
+    Edit distance between whitespace-normalized texts, divided by the expected length.
+    """
+    expected = " ".join(expected.split())
+    actual = " ".join(actual.split())
+    return edit_distance(expected, actual) / max(1, len(expected))
+
+
+def load_samples(sample_dir: str) -> List[Dict[str, str]]:
+    samples = []
+    for pattern in ("*.png", "*.jpg", "*.jpeg"):
+        for image_path in sorted(glob.glob(os.path.join(sample_dir, pattern))):
+            text_path = os.path.splitext(image_path)[0] + ".txt"
+            if os.path.exists(text_path):
+                with open(text_path, encoding="utf-8") as f:
+                    samples.append({"image": image_path, "text": f.read()})
+    return samples
+
+
+def run(samples: List[Dict[str, str]], profiles: List[str], lang: str = "auto", spell_correct: bool = False) -> List[dict]:
+    """
+    OCR every sample with every profile.
+
+    Returns:
+        List[dict]: One row per profile with mean character error rate, mean
+        seconds per page and mean seconds per preprocessing stage.
+    """
+    rows = []
+    for profile in profiles:
+        errors = []
+        page_seconds = []
+        stage_seconds: Dict[str, List[float]] = {}
+        for sample in samples:
+            start = time.perf_counter()
+            result = process_image(sample["image"], lang=lang, spell_correct=spell_correct, profile=profile)
+            page_seconds.append(time.perf_counter() - start)
+            errors.append(character_error_rate(sample["text"], result["extracted_text"]))
+            for stage, seconds in result["timings"]["preprocess_stages"].items():
+                stage_seconds.setdefault(stage, []).append(seconds)
+        rows.append({
+            "profile": profile,
+            "pages": len(samples),
+            "character_error_rate": statistics.mean(errors),
+            "seconds_per_page": statistics.mean(page_seconds),
+            "stage_seconds": {stage: statistics.mean(values) for stage, values in stage_seconds.items()},
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sample_dir", help="Directory of page images with matching .txt ground truth")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), help="Profiles to compare")
+    parser.add_argument("--lang", default="auto", help="Tesseract languages, or auto to route by script")
+    parser.add_argument("--spell-correct", action="store_true", help="Include spell correction in the measurement")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    samples = load_samples(args.sample_dir)
+    if not samples:
+        parser.error(f"No image/.txt pairs found in {args.sample_dir}")
+
+    rows = run(samples, args.profiles, lang=args.lang, spell_correct=args.spell_correct)
+    print(f"{'profile':<18}{'CER':>8}{'s/page':>10}  stages")
+    for row in rows:
+        stages = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in row["stage_seconds"].items())
+        print(f"{row['profile']:<18}{row['character_error_rate']:>8.3f}{row['seconds_per_page']:>10.2f}  {stages}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Stand-in models for benchmarking without network access or model downloads.
+
+`install_stub_models()` registers a hashing embedder and an extractive
+generator under the registry names "embedder" and "generator". The
+registry keeps the first registration of a name, so it must run before
+`app.embeddings.embedder` or `app.api.main` is imported. Retrieval,
+batching, caching and HTTP costs are then measured with negligible model
+time; `seconds_per_prompt` adds a fixed generation delay to mimic a real
+model's share of the latency.
+"""
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import List, Union
+
+import numpy as np
+
+from app.models.registry import registry
+
+# Output dimension of the real embedder (paraphrase-multilingual-MiniLM-L12-v2)
+STUB_DIMENSION = 384
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class StubTokenizer:
+    """
+    Whitespace tokenizer with a growing vocabulary, enough for chunking, packing and truncation.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def _id(self, word: str) -> int:
+        word_id = self._ids.get(word)
+        if word_id is None:
+            with self._lock:
+                word_id = self._ids.setdefault(word, len(self._words))
+                if word_id == len(self._words):
+                    self._words.append(word)
+        return word_id
+
+    def __call__(self, texts: Union[str, List[str]], add_special_tokens: bool = True, **kwargs) -> dict:
+        single = isinstance(texts, str)
+        ids = [[self._id(word) for word in text.split()] for text in ([texts] if single else texts)]
+        return {"input_ids": ids[0] if single else ids}
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True) -> str:
+        return " ".join(self._words[i] for i in ids)
+
+
+class StubEmbedder:
+    """
+    Feature-hashing bag of words with the SentenceTransformer `encode` interface.
+
+    Texts sharing words get similar unit vectors, so retrieval behaves
+    sensibly on synthetic corpora.
+    """
+
+    def __init__(self, dimension: int = STUB_DIMENSION, max_seq_length: int = 128):
+        self.dimension = dimension
+        self.max_seq_length = max_seq_length
+        self.tokenizer = StubTokenizer()
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower())[:self.max_seq_length]:
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class StubGenerator:
+    """
+    Extractive stand-in for the text2text-generation pipeline: answers with the first context sentence.
+    """
+
+    def __init__(self, seconds_per_prompt: float = 0.0):
+        self.seconds_per_prompt = seconds_per_prompt
+        self.tokenizer = StubTokenizer()
+
+    def _generate(self, prompt: str) -> str:
+        context = prompt.split("Context:", 1)[-1].split("\n\nQuestion:", 1)[0].strip()
+        return re.split(r"(?<=[.!?।])\s+|\n+", context, maxsplit=1)[0]
+
+    def __call__(self, prompts: Union[str, List[str]], **kwargs):
+        single = isinstance(prompts, str)
+        prompts = [prompts] if single else prompts
+        if self.seconds_per_prompt:
+            time.sleep(self.seconds_per_prompt * len(prompts))
+        results = [[{"generated_text": self._generate(prompt)}] for prompt in prompts]
+        return results[0] if single else results
+
+
+def install_stub_models(seconds_per_prompt: float = 0.0):
+    """
+    Register the stub embedder and generator in the shared model registry.
+
+    Raises:
+        RuntimeError: If a real model loader was registered first.
+    """
+    for module in ("app.embeddings.embedder", "app.rag.rag_agent"):
+        if module in sys.modules:
+            raise RuntimeError(f"Install the stub models before importing {module}.")
+    registry.register("embedder", StubEmbedder)
+    registry.register("generator", lambda: StubGenerator(seconds_per_prompt))
@@ -0,0 +1,338 @@
+"""
+Offline end-to-end benchmark suite for the ingestion and query paths.
+
+Stages (all by default, or pick with --stages):
+
+- ocr: pages/sec and character error rate of `process_image` on synthetic
+  English, Malayalam, skewed and chart pages (needs Tesseract).
+- embedding: chunks/sec of `generate_embeddings` on synthetic chunks,
+  without the embedding cache.
+- recall: build time, recall@k and search latency of every FAISS index
+  type on synthetic corpora of each --vector-sizes (10k, 100k and 1M by default).
+- query: latency percentiles and QPS of POST /query-rag/ at each
+  --concurrency level, against an in-process server over a synthetic
+  corpus or, with --url, against a running deployment.
+
+With --models stub (the default) the embedder and generator are replaced
+by the stand-ins in `benchmarks.stubs`, so nothing is downloaded and the
+numbers isolate the pipeline around the models. Results are written as
+JSON; --baseline prints the relative change of every number against an
+earlier results file.
+
+Usage:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --stages recall query --vector-sizes 10000 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import generate_pages, synthetic_chunks, synthetic_queries, synthetic_vectors
+
+STAGES = ("ocr", "embedding", "recall", "query")
+
+# Dimension of the embedder, and of the synthetic corpora
+DIMENSION = 384
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    milliseconds = 1000 * np.asarray(latencies)
+    return {f"p{p}_ms": float(np.percentile(milliseconds, p)) for p in (50, 90, 95, 99)}
+
+
+def run_ocr(pages: int, seed: int) -> dict:
+    """
+    OCR synthetic pages one by one and report throughput and accuracy per page kind.
+    """
+    try:
+        from app.ocr.ocr_processor import process_image
+        from benchmarks.preprocessing_profiles import character_error_rate
+        process_image(np.full((64, 64), 255, dtype=np.uint8), spell_correct=False)
+    except Exception as e:
+        return {"skipped": f"OCR unavailable: {e}"}
+
+    samples = generate_pages(pages, seed=seed)
+    by_kind = {}
+    start = time.perf_counter()
+    for sample in samples:
+        page_start = time.perf_counter()
+        result = process_image(np.asarray(sample["image"]), spell_correct=False)
+        seconds = time.perf_counter() - page_start
+        row = by_kind.setdefault(sample["kind"], {"pages": 0, "seconds": 0.0, "cer": []})
+        row["pages"] += 1
+        row["seconds"] += seconds
+        row["cer"].append(character_error_rate(sample["text"], result["text"]))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "pages": len(samples),
+        "pages_per_second": _rate(len(samples), elapsed),
+        "by_kind": {
+            kind: {
+                "pages": row["pages"],
+                "pages_per_second": _rate(row["pages"], row["seconds"]),
+                "mean_cer": float(np.mean(row["cer"])),
+            }
+            for kind, row in by_kind.items()
+        },
+    }
+
+
+def run_embedding(chunks: int, batch_sizes: List[int], seed: int) -> dict:
+    """
+    Embed synthetic chunks with each batch size, bypassing the embedding cache.
+    """
+    from app.embeddings.embedder import generate_embeddings
+
+    texts = synthetic_chunks(chunks, seed=seed)
+    # Load the model outside the timed runs
+    generate_embeddings(texts[:1], use_cache=False)
+    results = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        generate_embeddings(texts, batch_size=batch_size, use_cache=False)
+        elapsed = time.perf_counter() - start
+        results[f"batch_{batch_size}"] = {"chunks": len(texts), "seconds": elapsed, "chunks_per_second": _rate(len(texts), elapsed)}
+    return results
+
+
+def run_recall(sizes: List[int], index_types: List[str], queries: int, k: int, seed: int) -> dict:
+    """
+    Build each index type over synthetic corpora and measure recall@k against exact search.
+    """
+    from app.vectordb.faiss_index import build_index, default_nlist, recall_report, train_index
+
+    results = {}
+    for size in sizes:
+        vectors = synthetic_vectors(size, DIMENSION, seed=seed)
+        query_vectors = synthetic_queries(vectors, queries, seed=seed + 1)
+        per_type = {}
+        for index_type in index_types:
+            start = time.perf_counter()
+            index = build_index(index_type, DIMENSION, nlist=default_nlist(size))
+            train_index(index, vectors)
+            index.add(vectors)
+            build_seconds = time.perf_counter() - start
+            per_type[index_type] = {
+                "build_seconds": build_seconds,
+                "settings": {
+                    ",".join(f"{name}={value}" for name, value in row["params"].items()) or "exact": {
+                        "recall_at_k": row["recall_at_k"],
+                        "latency_ms_per_query": row["latency_ms_per_query"],
+                        "qps": row["qps"],
+                    }
+                    for row in recall_report(index, vectors, query_vectors, k=k)
+                },
+            }
+            del index
+        results[str(size)] = per_type
+    return results
+
+
+def _start_server(corpus: int, seed: int):
+    """
+    Start the API in this process over a synthetic in-memory corpus and return (base URL, server, API key).
+    """
+    # Read by app.api.main at import time: no persistence, no answer cache, no per-request logging
+    os.environ["FAISS_PERSIST_DIR"] = ""
+    os.environ["INGEST_JOBS_DIR"] = tempfile.mkdtemp(prefix="bench-jobs-")
+    os.environ["ANSWER_CACHE_SIZE"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import socket
+    import uvicorn
+    from app.api import main
+    from app.embeddings.embedder import generate_embeddings
+
+    texts = synthetic_chunks(corpus, seed=seed)
+    embeddings = generate_embeddings(texts, use_cache=False)
+    metadatas = [
+        {"filename": f"synthetic-{i // 50}.txt", "doc_id": f"synthetic-{i // 50}", "text": text, "chunk_index": i % 50, "page": 1}
+        for i, text in enumerate(texts)
+    ]
+    main.faiss_db.add_embeddings(embeddings, metadatas)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, main.API_KEY
+
+
+def _load(url: str, api_key: str, queries: List[str], concurrency: int) -> dict:
+    """
+    Send `queries` to /query-rag/ from `concurrency` threads, each with its own connection.
+    """
+    import requests
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    next_query = iter(queries)
+
+    def worker():
+        session = requests.Session()
+        session.headers["x-api-key"] = api_key
+        while True:
+            with lock:
+                query = next(next_query, None)
+            if query is None:
+                break
+            start = time.perf_counter()
+            response = session.post(f"{url}/query-rag/", json={"query": query})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not response.ok:
+                    errors.append(response.status_code)
+        session.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict({"requests": len(latencies), "errors": len(errors), "qps": _rate(len(latencies), elapsed)}, **_percentiles(latencies))
+
+
+def run_query(concurrency: List[int], requests_per_level: int, corpus: int, seed: int, url: Optional[str] = None, api_key: Optional[str] = None) -> dict:
+    """
+    Load-test /query-rag/ at each concurrency level with distinct queries.
+    """
+    server = None
+    if url is None:
+        url, server, api_key = _start_server(corpus, seed)
+    # Every query is distinct so neither cache answers it
+    templates = ["What is the capital of France?", "When is the invoice total due?", "Which roll number secured the highest marks?", "മലയാളം ഏത് സംസ്ഥാനത്തെ ഭാഷയാണ്?"]
+    results = {"url": url if server is None else "in-process", "corpus_chunks": corpus if server is not None else None}
+    try:
+        # Warm up the models and connections
+        _load(url, api_key, [f"{templates[0]} warm-up {i}" for i in range(max(concurrency))], max(concurrency))
+        for level in concurrency:
+            queries = [f"{templates[i % len(templates)]} REF{i:07d} c{level}" for i in range(requests_per_level)]
+            results[f"concurrency_{level}"] = _load(url, api_key, queries, level)
+    finally:
+        if server is not None:
+            server.should_exit = True
+    return results
+
+
+def _metadata(args: argparse.Namespace) -> dict:
+    import faiss
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "faiss": faiss.__version__,
+        "args": vars(args),
+    }
+
+
+def _numbers(tree, prefix: str = "") -> Dict[str, float]:
+    """
+    Flatten the numeric leaves of a results tree into {"a.b.c": value}.
+    """
+    if isinstance(tree, dict):
+        flat = {}
+        for key, value in tree.items():
+            flat.update(_numbers(value, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        return {prefix: float(tree)}
+    return {}
+
+
+def compare(results: dict, baseline: dict) -> List[dict]:
+    """
+    Pair every number of `results` with the same number in `baseline` and compute the relative change.
+    """
+    current = _numbers(results.get("stages", {}))
+    previous = _numbers(baseline.get("stages", {}))
+    rows = []
+    for key in sorted(current.keys() & previous.keys()):
+        before, after = previous[key], current[key]
+        change = (after - before) / abs(before) if before else None
+        rows.append({"metric": key, "baseline": before, "current": after, "change": change})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--models", choices=("stub", "real"), default="stub", help="Stand-in or real embedder and generator")
+    parser.add_argument("--generation-seconds", type=float, default=0.0, help="Simulated generation time per prompt of the stub generator")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pages", type=int, default=20, help="Synthetic pages for the OCR stage")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks for the embedding stage")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--vector-sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw", "ivf_flat", "ivf_pq"])
+    parser.add_argument("--recall-queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Queries sent at each concurrency level")
+    parser.add_argument("--query-corpus", type=int, default=10000, help="Chunks indexed by the in-process server")
+    parser.add_argument("--url", help="Benchmark a running API at this base URL instead of an in-process one")
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY", "new_secret_key"), help="API key used with --url")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.models == "stub":
+        from benchmarks.stubs import install_stub_models
+        install_stub_models(seconds_per_prompt=args.generation_seconds)
+
+    results = {"meta": _metadata(args), "stages": {}}
+    for stage in args.stages:
+        print(f"Running {stage} stage...", file=sys.stderr)
+        start = time.perf_counter()
+        if stage == "ocr":
+            result = run_ocr(args.pages, args.seed)
+        elif stage == "embedding":
+            result = run_embedding(args.chunks, args.batch_sizes, args.seed)
+        elif stage == "recall":
+            result = run_recall(args.vector_sizes, args.index_types, args.recall_queries, args.k, args.seed)
+        else:
+            result = run_query(args.concurrency, args.requests, args.query_corpus, args.seed, url=args.url, api_key=args.api_key)
+        result["stage_seconds"] = time.perf_counter() - start
+        results["stages"][stage] = result
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f))
+        for row in results["comparison"]:
+            if row["change"] is not None and abs(row["change"]) >= 0.05:
+                print(f"{row['metric']}: {row['baseline']:.4g} -> {row['current']:.4g} ({row['change']:+.1%})", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
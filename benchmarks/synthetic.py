@@ -0,0 +1,232 @@
+"""
+Synthetic inputs for the benchmarks: scanned-looking pages and embedding-like vector corpora.
+
+Pages are rendered with PIL: English and Malayalam text, skewed pages and
+bar charts, each with the text it should OCR to. Malayalam needs a font
+that covers the script (e.g. Noto Sans Malayalam) and, for correct vowel
+sign placement, a Pillow built with libraqm; pages are skipped when no
+font is found.
+
+Usage (write sample pages for `benchmarks.preprocessing_profiles`):
+    python -m benchmarks.synthetic samples/ --pages 20
+"""
+import argparse
+import glob
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+ENGLISH_SENTENCES = [
+    "The invoice total is due within thirty days of receipt.",
+    "The applicant holds a Bachelor of Science degree from the University of Kerala.",
+    "Quarterly revenue grew by twelve percent compared to the previous year.",
+    "The meeting was rescheduled to Monday morning at nine o'clock.",
+    "Roll number 21BCS045 secured the highest marks in the final examination.",
+    "Please sign the enclosed form and return it before the end of the month.",
+    "The laboratory report confirms that all samples were within normal limits.",
+    "Paris is the capital city of France.",
+]
+
+MALAYALAM_SENTENCES = [
+    "കേരളം ഇന്ത്യയുടെ തെക്കുപടിഞ്ഞാറൻ തീരത്തുള്ള ഒരു സംസ്ഥാനമാണ്.",
+    "തിരുവനന്തപുരം കേരളത്തിന്റെ തലസ്ഥാനമാണ്.",
+    "മലയാളം കേരളത്തിലെ ഔദ്യോഗിക ഭാഷയാണ്.",
+    "പരീക്ഷയുടെ ഫലം അടുത്ത ആഴ്ച പ്രസിദ്ധീകരിക്കും.",
+]
+
+# Page kinds produced by `generate_pages`, in rotation
+PAGE_KINDS = ("english", "malayalam", "skewed", "chart")
+
+# A4 at 150 dpi
+PAGE_SIZE = (1240, 1754)
+
+FONT_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"), "/Library/Fonts", "C:/Windows/Fonts"]
+LATIN_FONTS = ["DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Arial.ttf", "arial.ttf"]
+MALAYALAM_FONTS = ["NotoSansMalayalam-Regular.ttf", "NotoSerifMalayalam-Regular.ttf", "Lohit-Malayalam.ttf", "Meera.ttf", "Rachana.ttf", "Kartika.ttf"]
+
+
+def find_font(names: List[str]) -> Optional[str]:
+    """
+    Return the path of the first installed font with one of the given file names.
+    """
+    for name in names:
+        for directory in FONT_DIRS:
+            matches = glob.glob(os.path.join(directory, "**", name), recursive=True)
+            if matches:
+                return matches[0]
+    return None
+
+
+def _font(path: Optional[str], size: int):
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default()
+
+
+def _scan_noise(image: Image.Image, rng: np.random.Generator) -> Image.Image:
+    """
+    Make a clean rendering look scanned: slight blur and sensor noise.
+    """
+    image = image.filter(ImageFilter.GaussianBlur(radius=0.6))
+    pixels = np.asarray(image, dtype=np.int16) + rng.normal(0, 12, size=(image.height, image.width)).astype(np.int16)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def render_text_page(lines: List[str], font_path: Optional[str], rng: np.random.Generator, skew_degrees: float = 0.0, font_size: int = 30) -> Image.Image:
+    """
+    Render lines of text on a white page, optionally rotated by `skew_degrees`.
+    """
+    page = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    font = _font(font_path, font_size)
+    y = 120
+    for line in lines:
+        draw.text((100, y), line, fill=0, font=font)
+        y += int(font_size * 1.8)
+    if skew_degrees:
+        page = page.rotate(skew_degrees, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    return _scan_noise(page, rng)
+
+
+def render_chart_page(title: str, labels: List[str], values: List[float], font_path: Optional[str], rng: np.random.Generator) -> Image.Image:
+    """
+    Render a bar chart with a title, category labels and value labels.
+    """
+    page = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    font = _font(font_path, 28)
+    draw.text((100, 100), title, fill=0, font=font)
+
+    left, bottom, height = 150, 1100, 800
+    bar_width = 120
+    draw.line([(left, bottom), (left + len(values) * 2 * bar_width, bottom)], fill=0, width=3)
+    draw.line([(left, bottom), (left, bottom - height)], fill=0, width=3)
+    top = max(values)
+    for i, (label, value) in enumerate(zip(labels, values)):
+        x = left + bar_width // 2 + 2 * i * bar_width
+        bar_top = bottom - int(height * value / top)
+        draw.rectangle([x, bar_top, x + bar_width, bottom], fill=90)
+        draw.text((x, bar_top - 40), f"{value:g}", fill=0, font=font)
+        draw.text((x, bottom + 15), label, fill=0, font=font)
+    return _scan_noise(page, rng)
+
+
+def generate_pages(count: int, seed: int = 0, latin_font: Optional[str] = None, malayalam_font: Optional[str] = None) -> List[Dict]:
+    """
+    Generate `count` synthetic pages, rotating through PAGE_KINDS.
+
+    Args:
+        count (int): Number of pages.
+        seed (int): Random seed; the same seed gives the same pages.
+        latin_font (str, optional): Font file for English text. Found automatically when omitted.
+        malayalam_font (str, optional): Font file for Malayalam text. Found automatically when omitted.
+
+    Returns:
+        List[Dict]: One dict per page with "kind", "image" (PIL, grayscale),
+        "text" (the expected text) and "skew" (degrees).
+    """
+    rng = np.random.default_rng(seed)
+    latin_font = latin_font or find_font(LATIN_FONTS)
+    malayalam_font = malayalam_font or find_font(MALAYALAM_FONTS)
+    kinds = [kind for kind in PAGE_KINDS if kind != "malayalam" or malayalam_font]
+
+    pages = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        skew = 0.0
+        if kind == "chart":
+            labels = ["2021", "2022", "2023", "2024"]
+            values = [float(v) for v in rng.integers(10, 100, size=len(labels))]
+            title = "Quarterly revenue (crore)"
+            image = render_chart_page(title, labels, values, latin_font, rng)
+            text = " ".join([title] + [f"{v:g}" for v in values] + labels)
+        else:
+            sentences = MALAYALAM_SENTENCES if kind == "malayalam" else ENGLISH_SENTENCES
+            lines = [sentences[j] for j in rng.permutation(len(sentences))[:min(6, len(sentences))]]
+            if kind == "skewed":
+                skew = float(rng.uniform(2, 6) * rng.choice([-1, 1]))
+            image = render_text_page(lines, malayalam_font if kind == "malayalam" else latin_font, rng, skew_degrees=skew)
+            text = "\n".join(lines)
+        pages.append({"kind": kind, "image": image, "text": text, "skew": skew})
+    return pages
+
+
+def write_pages(pages: List[Dict], out_dir: str) -> List[str]:
+    """
+    Write pages as page-NNN.png with the expected text in page-NNN.txt.
+
+    Returns:
+        List[str]: The image paths, in page order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, page in enumerate(pages, 1):
+        path = os.path.join(out_dir, f"page-{i:03d}-{page['kind']}.png")
+        page["image"].save(path)
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+            f.write(page["text"])
+        paths.append(path)
+    return paths
+
+
+def synthetic_chunks(count: int, seed: int = 0, sentences_per_chunk: int = 4) -> List[str]:
+    """
+    Build chunk texts from the sample sentences, each with a unique identifier term.
+    """
+    rng = np.random.default_rng(seed)
+    sentences = ENGLISH_SENTENCES + MALAYALAM_SENTENCES
+    return [
+        " ".join(sentences[j] for j in rng.integers(0, len(sentences), size=sentences_per_chunk)) + f" REF{i:07d}"
+        for i in range(count)
+    ]
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 0, clusters: Optional[int] = None, spread: float = 2.0, block: int = 100000) -> np.ndarray:
+    """
+    Generate unit vectors grouped in clusters, like sentence embeddings of a topical corpus.
+
+    Uniform random vectors have no neighbourhood structure and understate
+    ANN recall, while tight clusters overstate it. Points are drawn around
+    `clusters` random centres (default about sqrt(count)) with per-dimension
+    noise `spread` times the centres' scale; the default leaves approximate
+    indexes with measurably imperfect recall at low search effort.
+    Generated in blocks to bound peak memory.
+    """
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, int(math.sqrt(count)))
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, block):
+        end = min(count, start + block)
+        assignment = rng.integers(0, clusters, size=end - start)
+        vectors[start:end] = centres[assignment] + spread * rng.standard_normal((end - start, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_queries(base: np.ndarray, count: int, seed: int = 1, noise: float = 0.05) -> np.ndarray:
+    """
+    Queries near random corpus vectors, so every query has true close neighbours.
+    """
+    rng = np.random.default_rng(seed)
+    queries = base[rng.integers(0, len(base), size=count)] + noise * rng.standard_normal((count, base.shape[1]), dtype=np.float32)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir", help="Directory for the page images and their .txt files")
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latin-font", help="Font file for English text")
+    parser.add_argument("--malayalam-font", help="Font file for Malayalam text")
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, seed=args.seed, latin_font=args.latin_font, malayalam_font=args.malayalam_font)
+    paths = write_pages(pages, args.out_dir)
+    print(f"Wrote {len(paths)} pages to {args.out_dir}.")
+
+
+if __name__ == "__main__":
+    main()
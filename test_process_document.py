@@ -1,19 +1,25 @@
+import os
+import sys
+
 import requests
 
 # Define the API endpoint and API key
-url = "http://127.0.0.1:8001/process-document/"
-api_key = "new_secret_key"
+base_url = os.environ.get("API_URL", "http://127.0.0.1:8001")
+url = f"{base_url}/process-document/"
+api_key = os.environ.get("API_KEY", "new_secret_key")
 
 # Path to the document to upload
-file_path = "/home/intern1/files/image2.pdf"  # Replace with the path to your document
+if len(sys.argv) < 2:
+    sys.exit(f"Usage: python {sys.argv[0]} <document.pdf|image>")
+file_path = sys.argv[1]
 
 # Send the POST request
 headers = {"x-api-key": api_key}
-files = {"file": open(file_path, "rb")}
-response = requests.post(url, headers=headers, files=files)
+with open(file_path, "rb") as f:
+    response = requests.post(url, headers=headers, files={"file": f})
 
-# Print the response
-if response.status_code == 200:
+# Print the response; the document is processed in the background (202 Accepted)
+if response.ok:
     print("Response:", response.json())
 else:
     print("Error:", response.status_code, response.text)
@@ -1,11 +1,15 @@
+import os
+import sys
+
 import requests
 
 # Define the API endpoint and API key
-url = "http://127.0.0.1:8001/query-rag/"
-api_key = "new_secret_key"
+base_url = os.environ.get("API_URL", "http://127.0.0.1:8001")
+url = f"{base_url}/query-rag/"
+api_key = os.environ.get("API_KEY", "new_secret_key")
 
 # Define the query
-query = "What is the purpose of a business degree?"
+query = " ".join(sys.argv[1:]) or "What is the purpose of a business degree?"
 
 # Send the POST request
 headers = {"x-api-key": api_key, "Content-Type": "application/json"}
@@ -13,7 +17,7 @@ data = {"query": query}
 response = requests.post(url, headers=headers, json=data)
 
 # Print the response
-if response.status_code == 200:
+if response.ok:
     print("Response:", response.json())
 else:
     print("Error:", response.status_code, response.text)
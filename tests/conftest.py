@@ -0,0 +1,17 @@
+"""
+Shared test setup.
+
+The stand-in models from `benchmarks.stubs` are registered before any test
+module imports the application, so no model is downloaded, and the API
+module keeps its index in memory and its jobs in a temporary directory.
+"""
+import os
+import tempfile
+
+from benchmarks.stubs import install_stub_models
+
+os.environ.setdefault("FAISS_PERSIST_DIR", "")
+os.environ.setdefault("INGEST_JOBS_DIR", tempfile.mkdtemp(prefix="test-jobs-"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+install_stub_models()
@@ -0,0 +1,79 @@
+import time
+
+from app.rag.answer_cache import AnswerCache
+from benchmarks.stubs import StubEmbedder
+
+embedder = StubEmbedder()
+
+
+def embed(text: str):
+    return embedder.encode([text])[0]
+
+
+def response(answer: str) -> dict:
+    return {"query": "q", "answer": answer, "retrieved_contexts": [], "cache": None}
+
+
+def test_exact_hit_after_normalization():
+    cache = AnswerCache(embedder.dimension, similarity=2.0)
+    cache.put("Who signed the letter?", embed("Who signed the letter?"), 1, response("Anand"))
+    hit = cache.get("  Who signed   the letter? ", embed("Who signed the letter?"), 1)
+    assert hit["answer"] == "Anand" and hit["cache"] == "exact"
+    assert hit["query"] == "  Who signed   the letter? "
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_for_a_paraphrase():
+    cache = AnswerCache(embedder.dimension, similarity=0.8)
+    cache.put("who signed the letter", embed("who signed the letter"), 1, response("Anand"))
+    hit = cache.get("the letter was signed by who", embed("the letter was signed by who"), 1)
+    assert hit["answer"] == "Anand" and hit["cache"] == "semantic"
+    assert cache.get("total of the invoice", embed("total of the invoice"), 1) is None
+
+
+def test_semantic_tier_can_be_disabled():
+    cache = AnswerCache(embedder.dimension, similarity=1.5)
+    cache.put("who signed the letter", embed("who signed the letter"), 1, response("Anand"))
+    assert cache.get("the letter was signed by who", embed("the letter was signed by who"), 1) is None
+
+
+def test_new_index_version_invalidates_entries():
+    cache = AnswerCache(embedder.dimension)
+    cache.put("question", embed("question"), 1, response("old"))
+    assert cache.get("question", embed("question"), 2) is None
+    assert cache.stats()["invalidations"] == 1
+    # Answers computed against an older version are not stored
+    cache.put("question", embed("question"), 1, response("stale"))
+    assert cache.get("question", embed("question"), 2) is None
+
+
+def test_scopes_keep_answers_apart():
+    cache = AnswerCache(embedder.dimension)
+    cache.put("question", embed("question"), 1, response("report"), scope='{"filename": "report.pdf"}')
+    assert cache.get("question", embed("question"), 1) is None
+    assert cache.get("question", embed("question"), 1, scope='{"filename": "report.pdf"}')["answer"] == "report"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(embedder.dimension, max_entries=2, similarity=2.0)
+    for text in ("one", "two"):
+        cache.put(text, embed(text), 1, response(text))
+    cache.get("one", embed("one"), 1)
+    cache.put("three", embed("three"), 1, response("three"))
+    assert cache.get("two", embed("two"), 1) is None
+    assert cache.get("one", embed("one"), 1)["answer"] == "one"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = AnswerCache(embedder.dimension, ttl=0.05)
+    cache.put("question", embed("question"), 1, response("answer"))
+    time.sleep(0.1)
+    assert cache.get("question", embed("question"), 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = AnswerCache(embedder.dimension, max_entries=0)
+    cache.put("question", embed("question"), 1, response("answer"))
+    assert cache.get("question", embed("question"), 1) is None
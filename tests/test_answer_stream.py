@@ -0,0 +1,91 @@
+import queue
+import sys
+import threading
+import types
+
+import pytest
+
+from app.rag import rag_agent
+from app.rag.rag_agent import RAGAgent
+from benchmarks.stubs import StubTokenizer
+
+
+class QueueStreamer:
+    """
+    Stand-in for transformers.TextIteratorStreamer: a queue of text pieces ended by None.
+    """
+
+    def __init__(self, tokenizer, skip_prompt=False, timeout=None, **kwargs):
+        self.queue = queue.Queue()
+        self.timeout = timeout
+
+    def put_text(self, text):
+        self.queue.put(text)
+
+    def end(self):
+        self.queue.put(None)
+
+    def __iter__(self):
+        while True:
+            text = self.queue.get(timeout=self.timeout)
+            if text is None:
+                return
+            yield text
+
+
+class StubModel:
+    def __init__(self, pieces, error=None, hang=None):
+        self.pieces = pieces
+        self.error = error
+        self.hang = hang
+
+    def generate(self, streamer=None, **kwargs):
+        for piece in self.pieces:
+            streamer.put_text(piece)
+        if self.hang is not None:
+            self.hang.wait()
+        if self.error is not None:
+            raise self.error
+        streamer.end()
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(TextIteratorStreamer=QueueStreamer))
+    agent = RAGAgent(registry_name="test-stream-generator")
+    generator = types.SimpleNamespace(model=None, tokenizer=StubTokenizer())
+    monkeypatch.setattr(RAGAgent, "generator", property(lambda self: generator))
+    return agent
+
+
+def stream(agent, model):
+    agent.generator.model = model
+    pieces = []
+    try:
+        for text in agent.answer_stream("what is it?", ["some context"]):
+            pieces.append(text)
+    except Exception as e:
+        return pieces, e
+    return pieces, None
+
+
+def test_streams_the_generated_pieces(agent):
+    assert stream(agent, StubModel(["An ", "answer."])) == (["An ", "answer."], None)
+
+
+def test_generation_error_ends_the_stream_and_is_raised(agent):
+    error = RuntimeError("CUDA out of memory")
+    pieces, raised = stream(agent, StubModel(["partial "], error=error))
+    assert pieces == ["partial "]
+    assert raised is error
+
+
+def test_stalled_generation_times_out(agent, monkeypatch):
+    monkeypatch.setattr(rag_agent, "STREAM_TIMEOUT", 0.05)
+    release = threading.Event()
+    try:
+        pieces, raised = stream(agent, StubModel(["slow "], hang=release))
+    finally:
+        release.set()
+    assert pieces == ["slow "]
+    assert isinstance(raised, TimeoutError)
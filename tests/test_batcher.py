@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from app.rag.batcher import MicroBatcher
+
+
+def submit_concurrently(batcher: MicroBatcher, items: list) -> dict:
+    """
+    Submit every item from its own thread and return each item's result or exception.
+    """
+    outcomes = {}
+
+    def run(item):
+        try:
+            outcomes[item] = batcher.submit(item)
+        except Exception as e:
+            outcomes[item] = e
+
+    threads = [threading.Thread(target=run, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return outcomes
+
+
+def test_concurrent_items_are_processed_in_one_batch():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200)
+    outcomes = submit_concurrently(batcher, [1, 2, 3, 4])
+    assert outcomes == {1: 2, 2: 4, 3: 6, 4: 8}
+    assert sorted(len(batch) for batch in batches) == [4]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        time.sleep(0.01)
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=100)
+    outcomes = submit_concurrently(batcher, list(range(7)))
+    assert outcomes == {i: i for i in range(7)}
+    assert max(len(batch) for batch in batches) <= 3
+
+
+def test_exception_result_goes_to_its_caller_only():
+    def process(items):
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200)
+    outcomes = submit_concurrently(batcher, ["a", "bad", "b"])
+    assert outcomes["a"] == "A" and outcomes["b"] == "B"
+    assert isinstance(outcomes["bad"], ValueError)
+
+
+def test_one_bad_item_does_not_poison_its_batch():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        if "bad" in items:
+            raise TypeError("cannot process 'bad'")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200)
+    outcomes = submit_concurrently(batcher, ["a", "bad", "b"])
+    assert outcomes["a"] == "A" and outcomes["b"] == "B"
+    assert isinstance(outcomes["bad"], TypeError)
+    # One failed batch, then each item on its own
+    assert len(batches[0]) == 3 and sorted(map(len, batches[1:])) == [1, 1, 1]
+
+
+def test_single_item_failure_is_raised():
+    def process(items):
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        MicroBatcher(process, max_wait_ms=1).submit("x")
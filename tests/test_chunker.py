@@ -0,0 +1,71 @@
+from app.embeddings.chunker import chunk_pages, chunk_text
+from benchmarks.stubs import StubTokenizer
+
+
+class PieceTokenizer:
+    """
+    Counts one token per started group of three characters, so long words span several tokens.
+    """
+
+    def __call__(self, texts, add_special_tokens=True, **kwargs):
+        return {"input_ids": [list(range((len(text) + 2) // 3)) for text in texts]}
+
+
+def test_chunk_text_windows_do_not_exceed_max_tokens():
+    words = [f"w{i}" for i in range(25)]
+    chunks = chunk_text(" ".join(words), max_tokens=10)
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 5]
+    assert " ".join(chunks).split() == words
+
+
+def test_chunk_text_repeats_overlap_tokens():
+    words = [f"w{i}" for i in range(20)]
+    chunks = chunk_text(" ".join(words), max_tokens=8, overlap=3)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split()[-3:] == current.split()[:3]
+    assert chunks[-1].split()[-1] == "w19"
+
+
+def test_chunk_text_counts_tokenizer_tokens():
+    # "abcdefghi" is 3 tokens, the short words 1 token each
+    text = "a b abcdefghi c d"
+    chunks = chunk_text(text, max_tokens=4, tokenizer=PieceTokenizer())
+    assert chunks == ["a b", "abcdefghi c", "d"]
+
+
+def test_chunk_text_gives_an_oversized_word_its_own_window():
+    chunks = chunk_text("a abcdefghijklmnop b", max_tokens=2, tokenizer=PieceTokenizer())
+    assert chunks == ["a", "abcdefghijklmnop", "b"]
+
+
+def test_chunk_text_of_empty_text():
+    assert chunk_text("   ") == []
+
+
+def test_chunk_pages_keeps_page_boxes_and_source():
+    boxes = [
+        {"text": "one", "x": 10, "y": 10, "width": 20, "height": 10},
+        {"text": "two", "x": 40, "y": 12, "width": 20, "height": 10, "source": "handwriting"},
+        {"text": "three", "x": 70, "y": 30, "width": 30, "height": 12, "source": "handwriting"},
+    ]
+    pages = [
+        {"page": 1, "extracted_text": "one two three", "bounding_boxes": boxes, "route": {"lang": "eng"}},
+        {"page": 2, "extracted_text": "four five", "bounding_boxes": None},
+    ]
+    chunks = chunk_pages(pages, tokenizer=StubTokenizer(), max_tokens=2, overlap=0)
+
+    assert [(c["page"], c["text"]) for c in chunks] == [(1, "one two"), (1, "three"), (2, "four five")]
+    assert [c["chunk_index"] for c in chunks] == [0, 1, 2]
+    assert chunks[0]["bbox"] == {"x": 10, "y": 10, "width": 50, "height": 12}
+    assert chunks[1]["source_type"] == "handwriting"
+    assert chunks[0]["language"] == "eng"
+    assert chunks[2]["bbox"] is None and chunks[2]["language"] is None and chunks[2]["source_type"] == "ocr"
+
+
+def test_chunk_pages_falls_back_to_box_text_when_words_do_not_line_up():
+    boxes = [
+        {"text": "raw", "x": 0, "y": 0, "width": 5, "height": 5},
+        {"text": "words", "x": 6, "y": 0, "width": 5, "height": 5},
+    ]
+    chunks = chunk_pages([{"page": 1, "extracted_text": "corrected into three", "bounding_boxes": boxes}], max_tokens=10)
+    assert [c["text"] for c in chunks] == ["raw words"]
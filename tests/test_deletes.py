@@ -0,0 +1,95 @@
+import pytest
+
+from app.vectordb.faiss_db import LOG_DELETES_FILE
+from tests.test_faiss_persistence import chunks, open_db, vectors
+
+
+def search(db, vector, n_results=10, mode="dense", query="alpha"):
+    return [meta for meta, _, _ in db.search_batch([query], [vector], n_results=n_results, mode=mode)[0]]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(3, seed=1), chunks(["alpha one", "alpha two", "alpha three"], doc_id="a"))
+    db.add_embeddings(vectors(2, seed=2), chunks(["alpha four", "alpha five"], doc_id="b"))
+    return db
+
+
+@pytest.mark.parametrize("mode", ["dense", "sparse", "hybrid", "prefilter"])
+def test_deleted_chunks_are_not_returned(db, mode):
+    assert db.delete_document("a") == 3
+    results = search(db, vectors(1, seed=1)[0], mode=mode)
+    assert {meta["doc_id"] for meta in results} == {"b"}
+    assert not db.has_document("a")
+    # The vectors stay in the index until compaction
+    assert db.ntotal == 5
+
+
+def test_delete_matching_counts_only_live_chunks(db):
+    assert db.delete_matching({"doc_id": "a", "page": {"lte": 2}}) == 2
+    assert db.delete_matching({"doc_id": "a"}) == 1
+    assert db.delete_document("a") == 0
+    assert db.delete_document("missing") == 0
+
+
+def test_upsert_replaces_a_documents_chunks(db):
+    assert db.upsert_document("a", vectors(2, seed=3), chunks(["alpha new one", "alpha new two"])) == 3
+    results = search(db, vectors(1, seed=3)[0])
+    assert sorted(meta["text"] for meta in results if meta["doc_id"] == "a") == ["alpha new one", "alpha new two"]
+    assert len(results) == 4
+
+
+def test_upsert_with_replace_filter_removes_earlier_scans(db):
+    # Document "b" was an earlier scan of the same file, under a different content hash
+    replaced = db.upsert_document("c", vectors(1, seed=4), chunks(["alpha rescanned"]), replace_filter={"filename": "b.pdf"})
+    assert replaced == 2
+    assert {meta["doc_id"] for meta in search(db, vectors(1, seed=4)[0])} == {"a", "c"}
+
+
+def test_compaction_drops_deleted_vectors_and_keeps_chunk_ids(db):
+    db.delete_document("a")
+    assert db.compact()
+    assert db.ntotal == 2
+    assert db.metadata.deleted_count == 0
+    assert [(row["chunk_id"], row["text"]) for row in db.metadata] == [(3, "alpha four"), (4, "alpha five")]
+    for mode in ("dense", "sparse"):
+        assert [meta["text"] for meta in search(db, vectors(2, seed=2)[1], n_results=1, mode=mode, query="five")] == ["alpha five"]
+
+
+def test_compaction_starts_once_enough_chunks_are_deleted(tmp_path):
+    db = open_db(tmp_path, compact_ratio=0.5)
+    db.add_embeddings(vectors(4), chunks(["one", "two", "three", "four"]))
+    db.delete_matching({"page": 1})
+    assert db._compaction is None
+    db.delete_matching({"page": 2})
+    db._compaction.join()
+    assert db.ntotal == 2
+    assert [row["text"] for row in db.metadata] == ["three", "four"]
+
+
+def test_deletes_are_replayed_after_a_restart(db, tmp_path):
+    db.delete_document("a")
+    restarted = open_db(tmp_path)
+    assert restarted.metadata.deleted_count == 3
+    assert {meta["doc_id"] for meta in search(restarted, vectors(1, seed=1)[0])} == {"b"}
+
+
+def test_snapshot_keeps_tombstones_and_clears_the_delete_log(db, tmp_path):
+    db.delete_matching({"doc_id": "a", "page": 1})
+    db.save()
+    assert not (tmp_path / LOG_DELETES_FILE).exists() or (tmp_path / LOG_DELETES_FILE).stat().st_size == 0
+    restarted = open_db(tmp_path)
+    assert restarted.metadata.deleted_count == 1
+    assert "alpha one" not in [meta["text"] for meta in search(restarted, vectors(1, seed=1)[0])]
+
+
+def test_compacted_store_survives_a_restart(db, tmp_path):
+    db.delete_document("b")
+    db.compact()
+    db.add_embeddings(vectors(1, seed=5), chunks(["alpha six"], doc_id="d"))
+    restarted = open_db(tmp_path)
+    assert [(row["chunk_id"], row["text"]) for row in restarted.metadata] == [
+        (0, "alpha one"), (1, "alpha two"), (2, "alpha three"), (5, "alpha six"),
+    ]
+    assert restarted.ntotal == 4
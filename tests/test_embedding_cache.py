@@ -0,0 +1,132 @@
+import multiprocessing
+
+import numpy as np
+
+from app.embeddings.embedding_cache import EmbeddingCache
+from benchmarks.stubs import StubEmbedder
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.embedder = StubEmbedder(dimension=16)
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return self.embedder.encode(texts)
+
+
+def test_only_misses_are_encoded_once():
+    cache = EmbeddingCache("stub")
+    encoder = CountingEncoder()
+    first = cache.encode(["a b", "c d", "a b"], encoder)
+    assert encoder.calls == [["a b", "c d"]]
+    assert np.array_equal(first[0], first[2])
+
+    second = cache.encode(["c d", "e f"], encoder)
+    assert encoder.calls[-1] == ["e f"]
+    assert np.array_equal(second[0], first[1])
+    stats = cache.stats()
+    assert stats["misses"] == 3 and stats["memory_hits"] == 1
+
+
+def test_normalized_text_shares_an_entry():
+    cache = EmbeddingCache("stub")
+    assert cache.key("  hello\n world ") == cache.key("hello world")
+    assert cache.key("hello world") != EmbeddingCache("other-model").key("hello world")
+
+
+def test_memory_tier_is_bounded():
+    cache = EmbeddingCache("stub", max_entries=2)
+    encoder = CountingEncoder()
+    cache.encode(["one", "two", "three"], encoder)
+    assert cache.stats()["memory_entries"] == 2
+    cache.encode(["one"], encoder)
+    assert encoder.calls[-1] == ["one"]
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("stub", cache_dir=str(tmp_path), disk_capacity=8)
+    expected = cache.encode(["persisted text"], encoder)
+    cache.flush()
+
+    reopened = EmbeddingCache("stub", cache_dir=str(tmp_path), disk_capacity=8)
+    vector = reopened.encode(["persisted text"], encoder)
+    assert len(encoder.calls) == 1
+    assert reopened.stats()["disk_hits"] == 1
+    # The disk tier stores float16
+    assert np.allclose(vector, expected, atol=1e-3)
+
+
+def test_disk_tier_overwrites_the_oldest_slot(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("stub", max_entries=1, cache_dir=str(tmp_path), disk_capacity=2)
+    cache.encode(["one", "two", "three"], encoder)
+    cache.flush()
+
+    reopened = EmbeddingCache("stub", max_entries=1, cache_dir=str(tmp_path), disk_capacity=2)
+    reopened.encode(["two", "three"], encoder)
+    assert reopened.stats()["disk_hits"] == 2
+    reopened.encode(["one"], encoder)
+    assert encoder.calls[-1] == ["one"]
+
+
+def test_disk_tier_of_another_model_is_ignored(tmp_path):
+    encoder = CountingEncoder()
+    EmbeddingCache("stub", cache_dir=str(tmp_path)).encode(["text"], encoder)
+    other = EmbeddingCache("other-model", cache_dir=str(tmp_path))
+    other.encode(["text"], encoder)
+    assert len(encoder.calls) == 2 and other.stats()["disk_hits"] == 0
+
+
+def test_generate_embeddings_uses_the_cache():
+    from app.embeddings import embedder
+
+    before = embedder.get_cache_stats()["misses"]
+    embedder.generate_embeddings(["cached sentence for the test"])
+    embedder.generate_embeddings(["cached   sentence for the test"])
+    stats = embedder.get_cache_stats()
+    assert stats["misses"] == before + 1
+    uncached = embedder.generate_embeddings(["cached sentence for the test"], use_cache=False)
+    assert uncached.shape == (1, 384)
+
+
+def test_processes_sharing_a_directory_continue_one_ring(tmp_path):
+    encoder = CountingEncoder()
+    first = EmbeddingCache("stub", max_entries=0, cache_dir=str(tmp_path), disk_capacity=2)
+    first.encode(["one"], encoder)
+    second = EmbeddingCache("stub", max_entries=0, cache_dir=str(tmp_path), disk_capacity=2)
+    # Written after "one" instead of over it, then "three" reuses the oldest slot
+    second.encode(["two", "three"], encoder)
+
+    # The slot of "one" now holds "three", so it is a miss rather than a wrong vector
+    first.encode(["one"], encoder)
+    assert encoder.calls[-1] == ["one"] and first.stats()["disk_hits"] == 0
+    # Re-adding "one" took the oldest slot, that of "two"
+    reopened = EmbeddingCache("stub", max_entries=0, cache_dir=str(tmp_path), disk_capacity=2)
+    vectors = reopened.encode(["three", "one"], encoder)
+    assert reopened.stats()["disk_hits"] == 2
+    assert np.allclose(vectors, encoder.embedder.encode(["three", "one"]), atol=1e-3)
+
+
+def _write_texts(cache_dir, worker):
+    EmbeddingCache("stub", cache_dir=cache_dir, disk_capacity=1000).encode([f"worker {worker} text {i}" for i in range(50)], CountingEncoder())
+
+
+def test_concurrent_writers_do_not_corrupt_the_disk_tier(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_write_texts, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    texts = [f"worker {worker} text {i}" for worker in range(4) for i in range(50)]
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("stub", cache_dir=str(tmp_path), disk_capacity=1000)
+    vectors = cache.encode(texts, encoder)
+    assert encoder.calls == []
+    assert cache.stats()["disk_entries"] == 200
+    assert np.allclose(vectors, encoder.embedder.encode(texts), atol=1e-3)
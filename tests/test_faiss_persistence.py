@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+
+from app.vectordb.faiss_db import FAISSVectorDB
+from app.vectordb.metadata_store import TEXT_BLOB_FILE
+
+DIMENSION = 8
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype("float32")
+
+
+def chunks(texts, doc_id: str = "doc"):
+    return [{"filename": f"{doc_id}.pdf", "doc_id": doc_id, "text": text, "page": i + 1} for i, text in enumerate(texts)]
+
+
+def blob_size(persist_dir) -> int:
+    return os.path.getsize(os.path.join(persist_dir, TEXT_BLOB_FILE))
+
+
+def open_db(persist_dir, **kwargs) -> FAISSVectorDB:
+    kwargs.setdefault("snapshot_every", 0)
+    kwargs.setdefault("compact_ratio", 0)
+    return FAISSVectorDB(DIMENSION, persist_dir=str(persist_dir), **kwargs)
+
+
+def test_log_replay_restores_vectors_and_metadata(tmp_path):
+    db = open_db(tmp_path)
+    data = vectors(3)
+    db.add_embeddings(data, chunks(["alpha", "beta", "gamma"]))
+
+    restarted = open_db(tmp_path)
+    assert restarted.load_stats["replayed_from_log"] == 3
+    assert restarted.ntotal == 3
+    assert [row["text"] for row in restarted.metadata] == ["alpha", "beta", "gamma"]
+    assert [row["chunk_id"] for row in restarted.metadata] == [0, 1, 2]
+    metadata, distance = restarted.query_embeddings(data[1], n_results=1)[0]
+    assert metadata["text"] == "beta" and distance < 1e-4
+
+
+def test_restarts_do_not_grow_the_text_blob(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(2), chunks(["first chunk", "second chunk"]))
+    size = blob_size(tmp_path)
+
+    for _ in range(3):
+        restarted = open_db(tmp_path)
+        assert blob_size(tmp_path) == size
+        assert [row["text"] for row in restarted.metadata] == ["first chunk", "second chunk"]
+
+    restarted.add_embeddings(vectors(1, seed=1), chunks(["third"], doc_id="other"))
+    assert blob_size(tmp_path) == size + len("third")
+    assert [row["text"] for row in open_db(tmp_path).metadata] == ["first chunk", "second chunk", "third"]
+
+
+def test_snapshot_then_log_replay_keeps_the_blob_size(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(2), chunks(["saved one", "saved two"]))
+    db.save()
+    db.add_embeddings(vectors(2, seed=1), chunks(["logged one", "logged two"], doc_id="later"))
+    size = blob_size(tmp_path)
+
+    for _ in range(2):
+        restarted = open_db(tmp_path)
+        assert restarted.load_stats["replayed_from_log"] == 2
+        assert blob_size(tmp_path) == size
+    assert [row["text"] for row in restarted.metadata] == ["saved one", "saved two", "logged one", "logged two"]
+
+
+def test_snapshot_truncates_the_log(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(4), chunks(["a", "b", "c", "d"]))
+    db.save()
+
+    restarted = open_db(tmp_path)
+    assert restarted.generation == 1
+    assert restarted.load_stats["replayed_from_log"] == 0
+    assert restarted.ntotal == 4
+    assert restarted.metadata[3]["text"] == "d"
+
+
+def test_automatic_snapshot_every_n_vectors(tmp_path):
+    db = open_db(tmp_path, snapshot_every=3)
+    db.add_embeddings(vectors(2), chunks(["a", "b"]))
+    assert db.generation == 0
+    db.add_embeddings(vectors(2, seed=1), chunks(["c", "d"], doc_id="second"))
+    assert db.generation == 1
+
+    restarted = open_db(tmp_path)
+    assert restarted.ntotal == 4 and restarted.load_stats["replayed_from_log"] == 0
+
+
+def test_torn_log_record_is_ignored(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(2), chunks(["kept", "torn"]))
+    # A crash in the middle of the second vector record
+    path = os.path.join(tmp_path, "log.vectors")
+    os.truncate(path, os.path.getsize(path) - 4)
+
+    restarted = open_db(tmp_path)
+    assert restarted.ntotal == 1
+    assert [row["text"] for row in restarted.metadata] == ["kept"]
+    assert blob_size(tmp_path) == len("kept")
+
+
+def test_memory_mapped_load_is_copied_before_writing(tmp_path):
+    db = open_db(tmp_path)
+    db.add_embeddings(vectors(3), chunks(["a", "b", "c"]))
+    db.save()
+
+    mapped = open_db(tmp_path, mmap=True)
+    assert mapped.load_stats["mmap"]
+    mapped.add_embeddings(vectors(1, seed=1), chunks(["d"], doc_id="more"))
+    assert mapped.ntotal == 4 and not mapped._mapped
+
+
+def test_writer_can_change_a_memory_mapped_ivf_index_after_a_restart(tmp_path):
+    options = {"index_type": "ivf_flat", "nlist": 4, "mmap": True}
+    db = open_db(tmp_path, **options)
+    data = vectors(300)
+    db.add_embeddings(data, chunks([f"chunk {i}" for i in range(300)]))
+    assert db.active_index_type == "ivf_flat"
+    db.save()
+
+    restarted = open_db(tmp_path, **options)
+    assert restarted.load_stats["mmap"]
+    restarted.add_embeddings(vectors(1, seed=1), chunks(["added after restart"], doc_id="new"))
+    restarted.upsert_document("new", vectors(1, seed=2), chunks(["upserted"]))
+    restarted.delete_matching({"doc_id": "doc", "page": {"lte": 100}})
+    assert restarted.compact()
+    assert restarted.ntotal == 201
+
+    reopened = open_db(tmp_path, **options)
+    assert reopened.ntotal == 201
+    reopened.set_search_params(nprobe=4)
+    metadata, distance = reopened.query_embeddings(vectors(1, seed=2)[0], n_results=1)[0]
+    assert metadata["text"] == "upserted" and distance < 1e-4
+
+
+def test_compaction_of_a_memory_mapped_index_after_a_restart(tmp_path):
+    options = {"index_type": "ivf_flat", "nlist": 4, "mmap": True}
+    db = open_db(tmp_path, **options)
+    db.add_embeddings(vectors(300), chunks([f"chunk {i}" for i in range(300)]))
+    db.delete_matching({"page": {"gt": 200}})
+    db.save()
+
+    restarted = open_db(tmp_path, **options)
+    assert restarted.compact()
+    assert restarted.ntotal == 200
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.vectordb.faiss_db import FAISSVectorDB
+from app.vectordb.metadata_store import RANGE_OPERATORS, MetadataStore, validate_filters
+from benchmarks.stubs import StubEmbedder
+
+embedder = StubEmbedder()
+
+# Three documents of four pages; page p of document d mentions both
+ROWS = [
+    {
+        "filename": f"doc{d}.pdf", "doc_id": f"doc{d}", "page": page, "chunk_index": page - 1,
+        "language": "mal" if d == 2 else "eng", "source_type": "handwriting" if page == 4 else "ocr",
+        "uploaded_at": 1000.0 + d, "text": f"document {d} page {page} shared words",
+    }
+    for d in range(3) for page in range(1, 5)
+]
+
+
+@pytest.fixture
+def store() -> MetadataStore:
+    store = MetadataStore()
+    store.extend(ROWS)
+    return store
+
+
+@pytest.fixture(scope="module")
+def db() -> FAISSVectorDB:
+    db = FAISSVectorDB(embedder.dimension, retrieval_mode="hybrid", compact_ratio=0)
+    db.add_embeddings(embedder.encode([row["text"] for row in ROWS]), ROWS)
+    return db
+
+
+def rows_of(store, filters):
+    return [(store[row]["doc_id"], store[row]["page"]) for row in store.select(filters)]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"doc_id": "doc1"}, [("doc1", p) for p in range(1, 5)]),
+    ({"filename": ["doc0.pdf", "doc2.pdf"], "page": 1}, [("doc0", 1), ("doc2", 1)]),
+    ({"language": "mal", "page": {"gt": 2}}, [("doc2", 3), ("doc2", 4)]),
+    ({"doc_id": "doc0", "page": {"gte": 2, "lt": 4}}, [("doc0", 2), ("doc0", 3)]),
+    ({"doc_id": "doc0", "page": {"lte": 1}}, [("doc0", 1)]),
+    ({"source_type": "handwriting", "uploaded_at": {"gte": 1001.0}}, [("doc1", 4), ("doc2", 4)]),
+    ({"chunk_index": [0, 3], "doc_id": "doc1"}, [("doc1", 1), ("doc1", 4)]),
+    ({"doc_id": "missing"}, []),
+])
+def test_select(store, filters, expected):
+    assert rows_of(store, filters) == expected
+
+
+def test_select_skips_deleted_rows(store):
+    store.mark_deleted([0, 1])
+    assert rows_of(store, {"doc_id": "doc0"}) == [("doc0", 3), ("doc0", 4)]
+    assert len(store.select(None)) == len(ROWS) - 2
+
+
+@pytest.mark.parametrize("mode", ["dense", "sparse", "hybrid", "prefilter"])
+def test_filtered_search_returns_only_matching_rows(db, mode):
+    query = "document 1 page 2"
+    filters = {"doc_id": "doc2", "page": {"gte": 2}}
+    results = db.search_batch([query], embedder.encode([query]), n_results=5, mode=mode, filters=[filters])[0]
+    assert results
+    assert all(meta["doc_id"] == "doc2" and meta["page"] >= 2 for meta, _, _ in results)
+
+
+def test_filtered_search_fills_n_results_without_overfetching(db):
+    # The query is closest to doc0, yet all three doc1 pages in range are returned
+    query = "document 0 page 1"
+    results = db.search_batch([query], embedder.encode([query]), n_results=3, mode="dense", filters=[{"doc_id": "doc1", "page": {"lte": 3}}])[0]
+    assert sorted(meta["page"] for meta, _, _ in results) == [1, 2, 3]
+
+
+def test_filters_apply_per_query_in_a_batch(db):
+    queries = ["shared words", "shared words"]
+    results = db.search_batch(queries, embedder.encode(queries), n_results=4, mode="dense", filters=[{"doc_id": "doc0"}, None])
+    assert {meta["doc_id"] for meta, _, _ in results[0]} == {"doc0"}
+    assert len(results[1]) == 4
+
+
+@pytest.mark.parametrize("operator", RANGE_OPERATORS)
+@pytest.mark.parametrize("value", ["abc", None, True, [2], {"gte": 1}])
+def test_range_operators_require_numbers(operator, value):
+    with pytest.raises(ValueError, match="must be numbers"):
+        validate_filters({"page": {operator: value}})
+
+
+@pytest.mark.parametrize("operator", RANGE_OPERATORS)
+def test_range_operators_accept_numbers(operator, store):
+    validate_filters({"page": {operator: 2}, "uploaded_at": {operator: 1001.5}})
+    assert store.select({"page": {operator: 2}}).dtype == np.int64
+
+
+@pytest.mark.parametrize("filters", [
+    {"page": "abc"},
+    {"page": None},
+    {"page": [1, "2"]},
+    {"chunk_index": False},
+    {"doc_id": 7},
+    {"filename": None},
+    {"source_type": ["ocr", 1]},
+    {"language": {"gte": "a"}},
+    {"page": {}},
+    {"page": {"between": [1, 2]}},
+    {"author": "someone"},
+])
+def test_invalid_filters_are_rejected(filters):
+    with pytest.raises(ValueError):
+        validate_filters(filters)
+
+
+@pytest.mark.parametrize("filters", [
+    {"page": {"gte": "abc"}},
+    {"page": {"gte": None}},
+    {"page": "abc"},
+])
+def test_query_api_answers_bad_filter_values_with_400(filters):
+    from app.api import main
+
+    with pytest.raises(HTTPException) as error:
+        main.query_rag(main.QueryRequest(query="anything", filters=filters), x_api_key=main.API_KEY)
+    assert error.value.status_code == 400
@@ -0,0 +1,158 @@
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from app.api.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, JobQueue, QueueFullError
+
+
+def wait_for(job, states=(COMPLETED, FAILED, CANCELLED), timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while job.status not in states:
+        assert time.monotonic() < deadline, f"job stayed {job.status}"
+        time.sleep(0.01)
+    return job
+
+
+class SlowUpload(io.RawIOBase):
+    """
+    Upload stream that blocks after its first chunk until released.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def read(self, size=-1) -> bytes:
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            return self.data
+        self.release.wait(5)
+        return b""
+
+
+def test_job_runs_and_records_the_content_hash(tmp_path):
+    seen = []
+
+    def handler(job):
+        with open(job.upload_path, "rb") as f:
+            seen.append(f.read())
+        return {"chunks": 3}
+
+    jobs = JobQueue(handler, str(tmp_path), workers=1)
+    job = jobs.submit("Scan.PDF", io.BytesIO(b"%PDF-1.4 data"))
+    wait_for(job)
+
+    assert job.status == COMPLETED and job.result == {"chunks": 3}
+    assert job.content_hash == hashlib.sha256(b"%PDF-1.4 data").hexdigest()
+    assert seen == [b"%PDF-1.4 data"] and job.upload_path.endswith("upload.pdf")
+    # The upload is removed once the job has finished; its state is kept
+    assert not os.path.exists(job.upload_path)
+    assert jobs.get(job.id).to_dict()["status"] == COMPLETED
+
+
+def test_failed_handler_marks_the_job_failed(tmp_path):
+    def handler(job):
+        raise RuntimeError("OCR failed")
+
+    job = JobQueue(handler, str(tmp_path), workers=1).submit("a.png", io.BytesIO(b"png"))
+    wait_for(job)
+    assert job.status == FAILED and job.error == "OCR failed"
+
+
+def test_full_queue_refuses_uploads(tmp_path):
+    jobs = JobQueue(lambda job: {}, str(tmp_path), workers=0, max_queued=2)
+    jobs.submit("a.png", io.BytesIO(b"a"))
+    jobs.submit("b.png", io.BytesIO(b"b"))
+    with pytest.raises(QueueFullError):
+        jobs.submit("c.png", io.BytesIO(b"c"))
+    # The refused upload leaves no job directory behind
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_cancelling_queued_jobs_frees_capacity(tmp_path):
+    jobs = JobQueue(lambda job: {}, str(tmp_path), workers=0, max_queued=2)
+    first = jobs.submit("a.png", io.BytesIO(b"a"))
+    jobs.submit("b.png", io.BytesIO(b"b"))
+    jobs.cancel(first.id)
+    # The cancelled job is still in the queue until a worker skips it
+    assert jobs.submit("c.png", io.BytesIO(b"c")).status == QUEUED
+    with pytest.raises(QueueFullError):
+        jobs.submit("d.png", io.BytesIO(b"d"))
+
+
+def test_slow_upload_does_not_block_other_uploads(tmp_path):
+    jobs = JobQueue(lambda job: {}, str(tmp_path), workers=0)
+    slow = SlowUpload(b"slow bytes")
+    submitted = []
+    thread = threading.Thread(target=lambda: submitted.append(jobs.submit("slow.pdf", slow)))
+    thread.start()
+    assert slow.started.wait(5)
+
+    start = time.monotonic()
+    fast = jobs.submit("fast.pdf", io.BytesIO(b"fast bytes"))
+    assert time.monotonic() - start < 1.0
+    assert jobs.get(fast.id).status == QUEUED
+    assert jobs.cancel(fast.id).status == CANCELLED
+
+    slow.release.set()
+    thread.join(5)
+    assert submitted[0].content_hash == hashlib.sha256(b"slow bytes").hexdigest()
+
+
+def test_cancelled_queued_job_never_runs(tmp_path):
+    ran = []
+    release = threading.Event()
+
+    def handler(job):
+        ran.append(job.filename)
+        release.wait(5)
+        return {}
+
+    jobs = JobQueue(handler, str(tmp_path), workers=1)
+    first = jobs.submit("first.png", io.BytesIO(b"1"))
+    second = jobs.submit("second.png", io.BytesIO(b"2"))
+    assert jobs.cancel(second.id).status == CANCELLED
+    release.set()
+    wait_for(first)
+    time.sleep(0.05)
+    assert ran == ["first.png"] and second.status == CANCELLED
+
+
+def test_cancel_racing_the_worker_has_one_winner(tmp_path):
+    for _ in range(20):
+        jobs = JobQueue(lambda job: {}, str(tmp_path / str(time.monotonic_ns())), workers=1)
+        job = jobs.submit("race.png", io.BytesIO(b"x"))
+        jobs.cancel(job.id)
+        wait_for(job)
+        # Either the worker started it (and it completed) or the cancel won
+        assert job.status in (COMPLETED, CANCELLED)
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    JobQueue(lambda job: {}, str(tmp_path), workers=0).submit("a.png", io.BytesIO(b"a"))
+    # An upload cut short before its job was registered
+    os.makedirs(tmp_path / "partial")
+
+    resumed = JobQueue(lambda job: {"pages": job.load_checkpoints()}, str(tmp_path), workers=1)
+    (job,) = resumed.jobs.values()
+    wait_for(job)
+    assert job.status == COMPLETED
+    assert not os.path.exists(tmp_path / "partial")
+
+
+def test_page_checkpoints_are_kept_until_the_job_finishes(tmp_path):
+    jobs = JobQueue(lambda job: {}, str(tmp_path), workers=0)
+    job = jobs.submit("doc.pdf", io.BytesIO(b"pdf"))
+    job.update(pages_total=2)
+    job.page_done({"page": 1, "text": "one"})
+    job.page_done({"page": 2, "error": "blank"})
+    assert set(job.load_checkpoints()) == {1, 2}
+    assert job.to_dict()["pages_done"] == 2
+    assert job.failed_pages == [{"page": 2, "error": "blank"}]
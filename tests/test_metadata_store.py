@@ -0,0 +1,72 @@
+import pickle
+
+from app.vectordb.metadata_store import MetadataStore
+
+
+def rows():
+    return [
+        {"filename": "a.pdf", "doc_id": "a", "text": "first page", "page": 1, "chunk_index": 0,
+         "bbox": {"x": 1, "y": 2, "width": 3, "height": 4}, "language": "eng", "source_type": "ocr"},
+        {"filename": "a.pdf", "doc_id": "a", "text": "മലയാളം text", "page": 2, "chunk_index": 1, "custom": {"k": 1}},
+        {"filename": "b.png", "uploaded_at": 1700000000.5},
+    ]
+
+
+def test_rows_read_back_as_dicts():
+    store = MetadataStore()
+    store.extend(rows())
+    assert len(store) == 3
+    assert store[0] == dict(rows()[0], chunk_id=0)
+    assert store[1] == dict(rows()[1], chunk_id=1)
+    assert store[-1] == {"filename": "b.png", "uploaded_at": 1700000000.5, "chunk_id": 2}
+    assert "text" not in store.get(0, with_text=False)
+    assert [row["chunk_id"] for row in store] == [0, 1, 2]
+
+
+def test_repeated_strings_are_interned():
+    store = MetadataStore()
+    store.extend(rows())
+    assert store.filenames.values == ["a.pdf", "b.png"]
+    assert list(store.filename_col) == [0, 0, 1]
+    assert store.text_bytes == len("first page".encode("utf-8")) + len("മലയാളം text".encode("utf-8"))
+
+
+def test_texts_live_in_the_blob_file(tmp_path):
+    store = MetadataStore(str(tmp_path))
+    store.extend(rows())
+    store.sync()
+    assert (tmp_path / "texts.bin").read_bytes().decode("utf-8") == "first pageമലയാളം text"
+
+    # Pickling keeps the columns only; the texts are read from the blob after attaching
+    loaded = pickle.loads(pickle.dumps(store))
+    store.close()
+    loaded.attach(str(tmp_path))
+    assert [row.get("text") for row in loaded] == ["first page", "മലയാളം text", None]
+    assert loaded.select({"filename": "a.pdf"}).tolist() == [0, 1]
+
+
+def test_in_memory_store_pickles_its_texts():
+    store = MetadataStore()
+    store.extend(rows())
+    loaded = pickle.loads(pickle.dumps(store))
+    assert loaded[1]["text"] == "മലയാളം text"
+    assert loaded[1]["custom"] == {"k": 1}
+
+
+def test_explicit_chunk_ids_advance_the_next_id():
+    store = MetadataStore()
+    store.append({"chunk_id": 10, "text": "x"})
+    store.append({"text": "y"})
+    assert [row["chunk_id"] for row in store] == [10, 11]
+    assert store.rows_of_chunk_ids([11, 10, 5]).tolist() == [0, 1]
+
+
+def test_truncate_texts_drops_the_tail(tmp_path):
+    store = MetadataStore(str(tmp_path))
+    store.append({"text": "keep"})
+    size = store.text_bytes
+    store.append({"text": "drop"})
+    store.truncate_texts(size)
+    assert (tmp_path / "texts.bin").read_bytes() == b"keep"
+    store.truncate_texts(size + 100)
+    assert store.text_bytes == size
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api import main
+from app.embeddings.embedder import generate_embeddings
+
+API_KEY = main.API_KEY
+
+TEXTS = [
+    "The invoice total is 4200 rupees.",
+    "Kochi is a port city in Kerala.",
+    "The meeting moved to Friday afternoon.",
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def corpus():
+    metadatas = [
+        {"filename": "notes.pdf", "doc_id": "notes", "text": text, "page": page, "chunk_index": page - 1, "source_type": "ocr"}
+        for page, text in enumerate(TEXTS, start=1)
+    ]
+    main.faiss_db.add_embeddings(generate_embeddings(TEXTS), metadatas)
+    yield
+    main.faiss_db.delete_document("notes")
+
+
+def test_query_returns_answer_and_contexts():
+    response = main.query_rag(main.QueryRequest(query="Which city is a port in Kerala?"), x_api_key=API_KEY)
+    assert response["retrieved_contexts"][0]["metadata"]["text"] == TEXTS[1]
+    assert response["answer"]
+    assert "timings" not in response
+
+
+def test_failed_query_does_not_fail_its_batch(monkeypatch):
+    search_batch = main.faiss_db.search_batch
+
+    def fail_on_bad_filter(queries, embeddings, n_results=5, filters=None, **kwargs):
+        if any(f and f.get("doc_id") == "poison" for f in filters or []):
+            raise TypeError("unsupported filter value")
+        return search_batch(queries, embeddings, n_results=n_results, filters=filters, **kwargs)
+
+    monkeypatch.setattr(main.faiss_db, "search_batch", fail_on_bad_filter)
+    results = main.answer_queries(
+        ["When is the meeting?", "What is the invoice total?", "Kochi?"],
+        [None, {"doc_id": "poison"}, {"page": {"gte": 2}}],
+    )
+    assert results[0]["retrieved_contexts"] and results[0]["answer"]
+    assert isinstance(results[1], TypeError)
+    assert all(ctx["metadata"]["page"] >= 2 for ctx in results[2]["retrieved_contexts"])
+
+
+def test_batch_endpoint_answers_every_query():
+    request = main.BatchQueryRequest(queries=["invoice total", "meeting day"], filters={"doc_id": "notes"}, timings=True)
+    results = main.query_rag_batch(request, x_api_key=API_KEY)["results"]
+    assert len(results) == 2 and all(result["retrieved_contexts"] for result in results)
+    assert results[0]["timings"]["batch_size"] == 2
+
+
+def test_wrong_api_key_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        main.query_rag(main.QueryRequest(query="anything"), x_api_key="wrong")
+    assert error.value.status_code == 401
+
+
+def test_batch_endpoint_reports_a_failed_query_and_keeps_the_others(monkeypatch):
+    search_batch = main.faiss_db.search_batch
+
+    def fail_on_meeting(queries, embeddings, n_results=5, filters=None, **kwargs):
+        if any("meeting" in query for query in queries):
+            raise RuntimeError("search failed")
+        return search_batch(queries, embeddings, n_results=n_results, filters=filters, **kwargs)
+
+    monkeypatch.setattr(main.faiss_db, "search_batch", fail_on_meeting)
+    request = main.BatchQueryRequest(queries=["invoice amount", "meeting time", "port city"], filters={"doc_id": "notes"})
+    results = main.query_rag_batch(request, x_api_key=API_KEY)["results"]
+    assert [result["query"] for result in results] == request.queries
+    assert results[1] == {"query": "meeting time", "answer": None, "retrieved_contexts": [], "error": "search failed"}
+    for result in (results[0], results[2]):
+        assert result["answer"] and result["retrieved_contexts"] and "error" not in result and "timings" not in result
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from app.ocr import english_handwritten
+from app.ocr.layout import HANDWRITTEN, PRINTED, analyze_layout, encode_crop
+from app.ocr.region_router import route_regions
+from app.ocr.script_detection import text_script
+
+PAGE = np.full((200, 400), 255, dtype=np.uint8)
+
+
+def tesseract_data(lines):
+    """
+    Build image_to_data output with one block line per (words, confidence) entry.
+    """
+    data = {key: [] for key in ("text", "block_num", "par_num", "line_num", "left", "top", "width", "height", "conf")}
+    for line_num, (words, confidence) in enumerate(lines, start=1):
+        for i, word in enumerate(words):
+            data["text"].append(word)
+            data["block_num"].append(1)
+            data["par_num"].append(1)
+            data["line_num"].append(line_num)
+            data["left"].append(10 + 60 * i)
+            data["top"].append(30 * line_num)
+            data["width"].append(50)
+            data["height"].append(20)
+            data["conf"].append(confidence)
+    return data
+
+
+def handwritten_page(words, confidence=40.0):
+    bbox = {"x": 10, "y": 30, "width": 170, "height": 20}
+    boxes = [dict(bbox, x=10 + 60 * i, width=50, text=word) for i, word in enumerate(words)]
+    region = {"type": HANDWRITTEN, "bbox": bbox, "words": boxes, "confidence": confidence, "image": encode_crop(PAGE, bbox)}
+    return {"page": 1, "extracted_text": " ".join(words), "bounding_boxes": boxes, "regions": [region]}
+
+
+@pytest.fixture
+def trocr(monkeypatch):
+    """
+    Replace TrOCR with a stand-in returning a fixed (text, confidence) for every line.
+    """
+    output = {"text": "", "confidence": 0.0, "calls": 0}
+
+    def recognize(images):
+        output["calls"] += 1
+        return [(output["text"], output["confidence"])] * len(images)
+
+    monkeypatch.setattr(english_handwritten, "trocr_recognize_batch", recognize)
+    return output
+
+
+@pytest.mark.parametrize("lang, expected", [("eng", HANDWRITTEN), ("mal", PRINTED), ("eng+mal", PRINTED)])
+def test_only_latin_pages_have_handwritten_lines(lang, expected):
+    regions = analyze_layout(PAGE, tesseract_data([(["low", "confidence"], 30)]), lang=lang)
+    assert [region["type"] for region in regions] == [expected]
+    assert regions[0]["confidence"] == 30
+    assert ("image" in regions[0]) == (expected == HANDWRITTEN)
+
+
+def test_confident_lines_stay_printed():
+    regions = analyze_layout(PAGE, tesseract_data([(["clear", "print"], 95), (["messy"], 20)]), lang="eng")
+    assert [region["type"] for region in regions] == [PRINTED, HANDWRITTEN]
+
+
+def test_confident_trocr_text_replaces_tesseract(trocr):
+    trocr.update(text="Anand Kumar", confidence=85.0)
+    page = handwritten_page(["Aneml", "Kumsr"], confidence=40.0)
+    route_regions([page])
+    assert page["extracted_text"] == "Anand Kumar"
+    assert page["regions"][0]["engine"] == "trocr"
+    assert all(box["source"] == "handwriting" for box in page["bounding_boxes"])
+
+
+def test_less_confident_trocr_text_is_ignored(trocr):
+    trocr.update(text="And Kim", confidence=30.0)
+    page = handwritten_page(["Anand", "Kumar"], confidence=55.0)
+    route_regions([page])
+    assert page["extracted_text"] == "Anand Kumar"
+    assert page["regions"][0]["engine"] == "tesseract"
+
+
+def test_trocr_text_in_another_script_is_ignored(trocr):
+    trocr.update(text="the road was", confidence=99.0)
+    page = handwritten_page(["കേരളം", "റോഡ്"], confidence=20.0)
+    route_regions([page])
+    assert page["extracted_text"] == "കേരളം റോഡ്"
+    assert page["regions"][0]["engine"] == "tesseract"
+
+
+def test_empty_trocr_output_keeps_tesseract(trocr):
+    trocr.update(text="  ", confidence=90.0)
+    page = handwritten_page(["faint"])
+    route_regions([page])
+    assert page["extracted_text"] == "faint"
+
+
+def test_pages_without_handwriting_do_not_call_trocr(trocr):
+    regions = analyze_layout(PAGE, tesseract_data([(["low", "confidence"], 30)]), lang="mal")
+    page = {"page": 1, "extracted_text": "low confidence", "bounding_boxes": [], "regions": regions}
+    route_regions([page])
+    assert trocr["calls"] == 0
+    assert page["extracted_text"] == "low confidence"
+
+
+def test_text_script():
+    assert text_script("Hello, world") == "Latin"
+    assert text_script("മലയാളം text") == "Malayalam"
+    assert text_script("12 + 7") is None
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from app.models.registry import ModelRegistry
+
+
+class Loader:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+def test_models_load_on_first_use_only():
+    registry = ModelRegistry()
+    loader = Loader()
+    registry.register("model", loader)
+    assert loader.calls == 0 and not registry.is_loaded("model")
+
+    model = registry.get("model")
+    assert registry.get("model") is model
+    assert loader.calls == 1
+    assert registry.status()["model"]["loads"] == 1
+
+
+def test_first_registration_wins():
+    registry = ModelRegistry()
+    registry.register("model", lambda: "first")
+    registry.register("model", lambda: "second")
+    assert registry.get("model") == "first"
+
+
+def test_concurrent_first_use_loads_once():
+    registry = ModelRegistry()
+    loader = Loader(delay=0.05)
+    registry.register("model", loader)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("model"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1 and len({id(model) for model in models}) == 1
+
+
+def test_evicted_model_is_reloaded():
+    registry = ModelRegistry()
+    loader = Loader()
+    registry.register("model", loader)
+    first = registry.get("model")
+    registry.evict("model")
+    assert not registry.is_loaded("model")
+    assert registry.get("model") is not first and loader.calls == 2
+
+
+def test_warm_up_loads_preloaded_models_only():
+    registry = ModelRegistry(preload=["embedder"])
+    embedder, generator = Loader(), Loader()
+    registry.register("embedder", embedder)
+    registry.register("generator", generator)
+    assert not registry.ready()
+
+    registry.warm_up(background=False)
+    assert registry.ready()
+    assert embedder.calls == 1 and generator.calls == 0
+
+
+def test_load_errors_are_reported_and_retried():
+    registry = ModelRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("download failed")
+        return "model"
+
+    registry.register("model", flaky)
+    with pytest.raises(OSError):
+        registry.get("model")
+    assert registry.status()["model"]["error"] == "download failed"
+    assert registry.get("model") == "model"
+    assert registry.status()["model"]["error"] is None
+
+
+def test_idle_models_are_evicted():
+    registry = ModelRegistry()
+    registry.register("model", Loader(), idle_timeout=0.01)
+    registry.get("model")
+    deadline = time.monotonic() + 5
+    while registry.is_loaded("model"):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
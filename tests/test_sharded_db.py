@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.vectordb.faiss_db import FAISSVectorDB
+from app.vectordb.sharded_db import ShardedVectorDB
+from benchmarks.stubs import StubEmbedder
+
+embedder = StubEmbedder()
+
+DOCS = {f"doc{d}": [f"document {d} section {s} topic {(d + s) % 4}" for s in range(5)] for d in range(6)}
+QUERIES = ["document 2 section 1", "topic 3", "section 4 topic 0", "document 5"]
+
+
+def add_document(db, doc_id, texts):
+    metadatas = [{"filename": f"{doc_id}.pdf", "page": i + 1, "text": text} for i, text in enumerate(texts)]
+    return db.upsert_document(doc_id, embedder.encode(texts), metadatas)
+
+
+def dense_results(db, filters=None):
+    results = db.search_batch(QUERIES, embedder.encode(QUERIES), n_results=6, mode="dense", filters=filters and [filters] * len(QUERIES))
+    ranked = []
+    for query_results in results:
+        hits = [(round(distance, 4), meta["text"]) for meta, distance, _ in query_results]
+        # Chunks tied at the cut-off distance may differ; ties above it may come in any order
+        cutoff = hits[-1][0]
+        ranked.append(([distance for distance, _ in hits], sorted(hit for hit in hits if hit[0] < cutoff)))
+    return ranked
+
+
+@pytest.fixture(scope="module")
+def stores():
+    single = FAISSVectorDB(embedder.dimension, compact_ratio=0)
+    sharded = ShardedVectorDB(embedder.dimension, 3, compact_ratio=0)
+    try:
+        for db in (single, sharded):
+            for doc_id, texts in DOCS.items():
+                add_document(db, doc_id, texts)
+        yield single, sharded
+    finally:
+        sharded.close()
+
+
+def test_documents_are_spread_over_shards(stores):
+    _, sharded = stores
+    assert len({sharded.shard_of(doc_id) for doc_id in DOCS}) > 1
+    assert sharded.ntotal == sum(len(texts) for texts in DOCS.values())
+
+
+def test_search_matches_a_single_store(stores):
+    single, sharded = stores
+    assert dense_results(sharded) == dense_results(single)
+    assert dense_results(sharded, {"page": {"lte": 2}}) == dense_results(single, {"page": {"lte": 2}})
+
+
+def test_results_carry_their_shard(stores):
+    _, sharded = stores
+    for meta, _, _ in sharded.search_batch(QUERIES[:1], embedder.encode(QUERIES[:1]), n_results=5, mode="dense")[0]:
+        assert meta["shard"] == sharded.shard_of(meta["doc_id"])
+
+
+def test_upsert_and_delete_match_a_single_store(stores):
+    single, sharded = stores
+    texts = ["document 2 rewritten", "document 2 appendix topic 3"]
+    assert add_document(sharded, "doc2", texts) == add_document(single, "doc2", texts) == 5
+    assert sharded.delete_document("doc4") == single.delete_document("doc4") == 5
+    assert sharded.delete_matching({"page": 5}) == single.delete_matching({"page": 5}) == 4
+    assert not sharded.has_document("doc4")
+    assert dense_results(sharded) == dense_results(single)
+
+
+def test_add_embeddings_returns_shard_and_chunk_id(stores):
+    _, sharded = stores
+    metadatas = [{"doc_id": "doc0", "text": "extra"}, {"text": "unassigned"}]
+    ids = sharded.add_embeddings(np.asarray(embedder.encode(["extra", "unassigned"])), metadatas)
+    assert ids[0][0] == sharded.shard_of("doc0")
+    for shard, chunk_id in ids:
+        assert 0 <= shard < sharded.shards and isinstance(chunk_id, int)
+
+
+def test_reader_asks_the_shards_for_updates_at_most_once_per_interval(tmp_path):
+    writer = ShardedVectorDB(embedder.dimension, 2, persist_dir=str(tmp_path), snapshot_every=0)
+    reader = ShardedVectorDB(embedder.dimension, 2, persist_dir=str(tmp_path), read_only=True, refresh_interval=0.2)
+    try:
+        add_document(writer, "doc0", DOCS["doc0"])
+        writer.save()
+
+        scattered = []
+        scatter = reader._scatter
+        reader._scatter = lambda method, *args, **kwargs: scattered.append(method) or scatter(method, *args, **kwargs)
+        reader.refresh()
+        reader.refresh()
+        assert scattered == []
+
+        time.sleep(0.25)
+        assert reader.refresh()
+        assert scattered == ["refresh", "version"]
+        assert reader.has_document("doc0")
+        assert reader.version > 0
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_writer_never_asks_the_shards_to_refresh(stores):
+    _, sharded = stores
+    scatter = sharded._scatter
+    scattered = []
+    sharded._scatter = lambda method, *args, **kwargs: scattered.append(method) or scatter(method, *args, **kwargs)
+    try:
+        assert not sharded.refresh()
+        assert scattered == []
+    finally:
+        del sharded._scatter